@@ -0,0 +1,68 @@
+"""
+Auslieferung von /static aus der Ablage (services/storage.py).
+
+Dateien werden in Blöcken gestreamt, Range-Anfragen (ein Bereich) mit 206 beantwortet,
+If-None-Match mit 304. Das ETag ist die Version der Datei; stimmt ?v= mit ihr überein
+(URLs aus versioned_url), wird die Antwort als unveränderlich gecacht, sonst muss der
+Browser vor jeder Verwendung per ETag nachfragen.
+"""
+import mimetypes
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+
+from services.storage import get_storage, is_safe_key, parse_range, version
+
+
+router = APIRouter(prefix="/static", tags=["static"])
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+
+def etag_matches(header, etag):
+    return any(tag.strip().removeprefix("W/") in (etag, "*") for tag in header.split(","))
+
+
+@router.api_route("/{key:path}", methods=["GET", "HEAD"])
+def get_static_file(key: str, request: Request):
+    if not is_safe_key(key):
+        raise HTTPException(status_code=404, detail="Datei nicht gefunden")
+    storage = get_storage()
+    try:
+        info = storage.stat(key)
+    except ValueError:
+        # Symbolischer Link, der aus STATIC_DIR hinauszeigt
+        info = None
+    if info is None:
+        raise HTTPException(status_code=404, detail="Datei nicht gefunden")
+
+    file_version = version(info["size"], info["mtime"])
+    etag = f'"{file_version}"'
+    immutable = request.query_params.get("v") == file_version
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL,
+    }
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    media_type = mimetypes.guess_type(key)[0] or "application/octet-stream"
+    size = info["size"]
+    try:
+        byte_range = parse_range(request.headers.get("range"), size)
+    except ValueError:
+        return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+
+    status_code = 200
+    start, end = 0, size - 1
+    if byte_range is not None:
+        status_code = 206
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    if request.method == "HEAD" or size == 0:
+        return Response(status_code=status_code, headers=headers, media_type=media_type)
+    return StreamingResponse(storage.iter_range(key, start, end), status_code=status_code,
+                             headers=headers, media_type=media_type)
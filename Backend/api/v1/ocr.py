@@ -1,16 +1,36 @@
 from fastapi import APIRouter, Depends, Query, HTTPException, Body
+from fastapi.responses import StreamingResponse, FileResponse
 from typing import List, Optional
 from pydantic import BaseModel
-from config import TESSERACT_CMD, VOICES_EXPORT_DIR, STATIC_DIR
-import zipfile
-from xml.etree.ElementTree import Element, SubElement, tostring
-from pytesseract import Output
-import json
+from config import HEADER_CUTOFF_RATIO
 import os
-import numpy as np
-import pytesseract
 from PIL import Image
-from sc_base_backend import get_current_user
+from sc_base_backend import get_current_user as _get_current_user
+from sc_base_backend import get_pg_connection
+from services import storage
+from services.box_store import TEMPLATE_PAGE, get_page, save_page, update_box_texts
+from services.header_ocr import load_page_words
+from services.ocr_layout import group_words
+from services.voice_detection import detect_voice_starts
+from services.voice_export import (
+    list_page_files, parse_voice_starts, compute_voice_ranges,
+    build_noten_index_xml, export_voices, stream_voices_zip, get_zip_filename, EXPORT_MODES,
+    make_export_profile,
+)
+from services.export_jobs import (
+    create_export_job, update_export_job, get_export_job, request_cancel, run_export_job,
+)
+from services.job_queue import get_job_queue
+from services.storage import task_dir
+from services.tesseract import TesseractTimeout, image_to_data, image_to_string
+from services.tracing import span, traced_dependency
+from services.speculative_export import (
+    is_speculative_export_enabled, start_speculative_export, take_prerendered,
+)
+from services.export_cache import (
+    pages_signature, export_key, get_variant_dir, get_artifact_url, artifact_path,
+    load_manifest, update_manifest, evict, tee_to_cache,
+)
 
 
 def calculate_suggestions(boxes, width):
@@ -58,7 +78,8 @@ def calculate_suggestions(boxes, width):
     return suggestions
 
 
-pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
+# Authentifizierung als eigener Span im Request-Trace
+get_current_user = traced_dependency("auth", _get_current_user)
 router = APIRouter(prefix="/ocr")
 
 
@@ -89,26 +110,33 @@ async def extract_text_for_boxes(
     user: dict = Depends(get_current_user)
 ):
     page_num_str = str(data.page).zfill(5)
-    image_path = os.path.join(STATIC_DIR, data.task_id,
+    image_path = os.path.join(task_dir(data.task_id),
                               "pages", f"{data.task_id}_page_{page_num_str}.png")
-    if not os.path.exists(image_path):
+    if not storage.fetch(image_path):
         raise HTTPException(
             status_code=404, detail=f"Seite {data.page} für Task {data.task_id} nicht gefunden")
     try:
-        image = Image.open(image_path)
+        with span("image.open"):
+            image = Image.open(image_path)
+            image.load()
         try:
             task_id = data.task_id
-            stored_boxes = load_boxes(task_id)
-            all_boxes = stored_boxes.get("template", {}).get("boxes", [])
             results = []
+            timeouts = []
             for box in data.boxes:
                 left = int(box.x)
                 upper = int(box.y)
                 right = int(box.x + box.width)
                 lower = int(box.y + box.height)
                 cropped = image.crop((left, upper, right, lower))
-                text = pytesseract.image_to_string(
-                    cropped, lang="deu", config="--psm 6").strip()
+                try:
+                    with span("ocr.tesseract", mode="image_to_string"):
+                        text = image_to_string(
+                            cropped, lang="deu", config="--psm 6").strip()
+                except TesseractTimeout:
+                    # Übrige Boxen trotzdem erkennen, betroffene Box bleibt leer
+                    timeouts.append(len(results))
+                    text = ""
                 results.append({
                     "x": box.x,
                     "y": box.y,
@@ -116,21 +144,12 @@ async def extract_text_for_boxes(
                     "height": box.height,
                     "text": text
                 })
-            for i, box in enumerate(all_boxes):
-                for res in results:
-                    if (
-                        int(box["x"]) == int(res["x"]) and
-                        int(box["y"]) == int(res["y"]) and
-                        int(box["width"]) == int(res["width"]) and
-                        int(box["height"]) == int(res["height"])
-                    ):
-                        box["text"] = res["text"]
             width = image.width
-            suggestions = calculate_suggestions(all_boxes, width)
-            stored_boxes["template"] = {
-                "boxes": all_boxes, "suggestions": suggestions}
-            save_boxes(task_id, stored_boxes)
-            return {"boxes": results, "suggestions": suggestions}
+            with span("box_store.update_box_texts"):
+                suggestions = update_box_texts(
+                    get_pg_connection(), task_id, data.page, results,
+                    lambda all_boxes: calculate_suggestions(all_boxes, width))
+            return {"boxes": results, "suggestions": suggestions, "ocr_timeouts": timeouts}
         finally:
             image.close()
     except Exception as e:
@@ -138,38 +157,9 @@ async def extract_text_for_boxes(
             status_code=500, detail=f"Fehler bei der Texterkennung: {e}")
 
 
-def get_boxes_path(task_id):
-    return os.path.join(STATIC_DIR, task_id, "boxes.json")
-
-
-def load_boxes(task_id):
-    path = get_boxes_path(task_id)
-    if os.path.exists(path):
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return {}
-
-
-def save_boxes(task_id, data):
-    import traceback
-    path = get_boxes_path(task_id)
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    try:
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-    except PermissionError as e:
-        print(
-            f"[PermissionError] Zugriff verweigert beim Schreiben von {path}:")
-        print(traceback.format_exc())
-        raise
-    except Exception as e:
-        print(f"[save_boxes] Fehler beim Schreiben von {path}:")
-        print(traceback.format_exc())
-        raise
-
-
 class SaveBoxesRequest(BaseModel):
     task_id: str
+    page: Optional[int] = None
     boxes: list
     suggestions: dict = {}
     labels: dict = {}
@@ -180,14 +170,10 @@ async def save_ocr_boxes(
     data: SaveBoxesRequest,
     user: dict = Depends(get_current_user)
 ):
-    task_id = data.task_id
-    stored_boxes = load_boxes(task_id)
-    stored_boxes["template"] = {
-        "boxes": data.boxes,
-        "suggestions": data.suggestions,
-        "labels": data.labels if hasattr(data, "labels") else {}
-    }
-    save_boxes(task_id, stored_boxes)
+    page = data.page if data.page is not None else TEMPLATE_PAGE
+    with span("box_store.save_page"):
+        save_page(get_pg_connection(), data.task_id, page,
+                  data.boxes, data.suggestions, data.labels)
     return {"status": "success"}
 
 
@@ -201,112 +187,58 @@ async def get_ocr_boxes(
 
     page_num_str = str(page).zfill(5)
     image_path = os.path.join(
-        STATIC_DIR, task_id, "pages", f"{task_id}_page_{page_num_str}.png")
-    stored_boxes = load_boxes(task_id)
+        task_dir(task_id), "pages", f"{task_id}_page_{page_num_str}.png")
+    conn = get_pg_connection()
     if not trigger_ocr:
-        if "template" in stored_boxes:
-            template = stored_boxes["template"]
-            return {
-                "boxes": template.get("boxes", []),
-                "suggestions": template.get("suggestions", {}),
-                "labels": template.get("labels", {})
-            }
-        if not os.path.exists(image_path):
+        with span("box_store.get_page"):
+            stored = get_page(conn, task_id, page)
+        if stored is not None:
+            return stored
+        if not storage.exists(image_path):
             raise HTTPException(
                 status_code=404, detail=f"Seite {page} für Task {task_id} nicht gefunden")
         return {"message": "No stored boxes", "boxes": [], "suggestions": {}, "labels": {}}
 
-    image = Image.open(image_path)
+    # Vorberechnete Kopfzeilen-OCR aus der PDF-Verarbeitung bevorzugen
+    with span("header_ocr.load"):
+        precomputed = load_page_words(task_id, page)
+    image = None
     try:
-        img_arr = np.array(image)
-        data = pytesseract.image_to_data(
-            img_arr,
-            lang="deu",
-            config="--psm 6",
-            output_type=Output.DICT
-        )
-
-        height, width = img_arr.shape[:2]
-        cutoff_y = 0.25 * height
-        min_confidence = 70
-
-        boxes = []
-        n_boxes = len(data["level"])
-        groups = {}
-        for i in range(n_boxes):
-            conf = data["conf"][i]
+        if precomputed is not None:
+            data = precomputed["words"]
+            height, width = precomputed["height"], precomputed["width"]
+        else:
+            if not storage.fetch(image_path):
+                raise HTTPException(
+                    status_code=404, detail=f"Seite {page} für Task {task_id} nicht gefunden")
+            import numpy as np
+            with span("image.open"):
+                image = Image.open(image_path)
+                img_arr = np.array(image)
             try:
-                conf = int(conf)
-            except:
-                conf = -1
-            x, y, w, h = data["left"][i], data["top"][i], data["width"][i], data["height"][i]
-            if y > cutoff_y or conf < min_confidence:
-                continue
-            if not data["text"][i].strip():
-                continue
-            key = (data["block_num"][i], data["par_num"]
-                   [i], data["line_num"][i])
-            groups.setdefault(key, []).append(i)
-
-        for key, indices in groups.items():
-            sorted_indices = sorted(indices, key=lambda i: data["left"][i])
-            subgroups = []
-            current_group = []
-            distance_threshold = 40
-            for idx in sorted_indices:
-                if not current_group:
-                    current_group.append(idx)
-                else:
-                    prev = current_group[-1]
-                    gap = data["left"][idx] - \
-                        (data["left"][prev] + data["width"][prev])
-                    avg_word_width = sum(
-                        data["width"][j] for j in sorted_indices) / len(sorted_indices)
-                    dynamic_threshold = max(
-                        distance_threshold, 1.5 * avg_word_width)
-                    ref_h = data["height"][current_group[0]]
-                    height_diff = abs(data["height"][idx] - ref_h)
-                    if gap > dynamic_threshold or (height_diff / ref_h > 0.3):
-                        subgroups.append(current_group)
-                        current_group = [idx]
-                    else:
-                        current_group.append(idx)
-            if current_group:
-                subgroups.append(current_group)
-            for subgroup in subgroups:
-                words = [data["text"][i].strip()
-                         for i in subgroup if data["text"][i].strip()]
-                if not words:
-                    continue
-                block_text = " ".join(words)
-                lefts = [data["left"][i] for i in subgroup]
-                tops = [data["top"][i] for i in subgroup]
-                rights = [data["left"][i] + data["width"][i] for i in subgroup]
-                bottoms = [data["top"][i] + data["height"][i]
-                           for i in subgroup]
-                grp_left = min(lefts)
-                grp_top = min(tops)
-                grp_right = max(rights)
-                grp_bottom = max(bottoms)
-                grp_width = grp_right - grp_left
-                grp_height = grp_bottom - grp_top
-                boxes.append({
-                    "x": grp_left,
-                    "y": grp_top,
-                    "width": grp_width,
-                    "height": grp_height,
-                    "text": block_text,
-                    "selected": False
-                })
-        suggestions = calculate_suggestions(boxes, width)
-        labels = stored_boxes.get("template", {}).get("labels", {})
-        stored_boxes["template"] = {"boxes": boxes,
-                                    "suggestions": suggestions, "labels": labels}
-        save_boxes(task_id, stored_boxes)
+                with span("ocr.tesseract", mode="image_to_data"):
+                    data = image_to_data(
+                        img_arr,
+                        lang="deu",
+                        config="--psm 6"
+                    )
+            except TesseractTimeout as e:
+                raise HTTPException(
+                    status_code=504, detail=f"Texterkennung für Seite {page} abgebrochen: {e}")
+            height, width = img_arr.shape[:2]
+
+        cutoff_y = HEADER_CUTOFF_RATIO * height
+        min_confidence = 70
 
-        return {"boxes": boxes, "suggestions": suggestions, "labels": labels}
+        with span("ocr.group_words"):
+            boxes = group_words(data, cutoff_y=cutoff_y,
+                                min_confidence=min_confidence)
+            suggestions = calculate_suggestions(boxes, width)
+        with span("box_store.save_page"):
+            return save_page(conn, task_id, page, boxes, suggestions)
     finally:
-        image.close()
+        if image is not None:
+            image.close()
 
 
 @router.post("/voices")
@@ -314,72 +246,14 @@ def detect_voices(
     task_id: str = Body(...),
     title_box: dict = Body(...),
     voice_box: dict = Body(...),
+    page: int = Body(1),
     user: dict = Depends(get_current_user)
 ):
-    pages_dir = os.path.join(STATIC_DIR, task_id, "pages")
-    files = []
-    if os.path.isdir(pages_dir):
-        files = sorted(f for f in os.listdir(pages_dir) if f.endswith(".png"))
-    results = []
-    for idx, fname in enumerate(files):
-        img_path = os.path.join(pages_dir, fname)
-        img = Image.open(img_path)
-        try:
-            img_width, img_height = img.size
-
-            tx = max(0, title_box["x"] - 0.1 * title_box["width"])
-            ty = max(0, title_box["y"] - 0.1 * title_box["height"])
-            tw = title_box["width"] * 1.2
-            th = title_box["height"] * 1.2
-            t_right = min(img_width, tx + tw)
-            t_bottom = min(img_height, ty + th)
-            title_region = img.crop((tx, ty, t_right, t_bottom))
-            title_text = pytesseract.image_to_string(
-                title_region, lang="deu").strip()
-
-            vx = max(0, voice_box["x"] - 0.3 * voice_box["width"])
-            vy = max(0, voice_box["y"] - 0.3 * voice_box["height"])
-            vw = voice_box["width"] * 1.6
-            vh = voice_box["height"] * 1.6
-            min_voice_width = 0.3 * img_width
-            if vw < min_voice_width:
-                vw = min_voice_width
-            v_right = min(img_width, vx + vw)
-            v_bottom = min(img_height, vy + vh)
-            voice_region = img.crop((vx, vy, v_right, v_bottom))
-            voice_text = pytesseract.image_to_string(
-                voice_region, lang="deu").strip()
-
-            results.append({
-                "page": idx + 1,
-                "title": title_text,
-                "voice": voice_text
-            })
-        finally:
-            img.close()
-
-    voice_indices = [
-        i for i, v in enumerate(results)
-        if v["voice"].strip() != ""
-    ]
-    for i, v in enumerate(results):
-        v["num_pages"] = 0
-
-    for idx, start_idx in enumerate(voice_indices):
-        end_idx = voice_indices[idx + 1] if idx + \
-            1 < len(voice_indices) else len(results)
-        num_pages = end_idx - start_idx
-        results[start_idx]["num_pages"] = num_pages
-
-    voices_with_pages = [
-        {
-            "page": v["page"],
-            "title": v["title"],
-            "voice": v["voice"],
-            "num_pages": v["num_pages"]
-        }
-        for v in results if v["voice"].strip() != ""
-    ]
+    # page: Seite, auf der die Boxen markiert wurden
+    voices_with_pages = detect_voice_starts(task_id, title_box, voice_box, template_page=page)
+    if is_speculative_export_enabled():
+        # Export der erkannten Stimmen im Hintergrund vorbereiten
+        start_speculative_export(task_id, parse_voice_starts(voices_with_pages))
     return {"voices": voices_with_pages}
 
 
@@ -396,6 +270,32 @@ class SplitVoicesRequest(BaseModel):
     arrangeur: Optional[str] = ""
     start_page: Optional[int] = None
     end_page: Optional[int] = None
+    export_mode: Optional[str] = "auto"
+    profile: Optional[str] = "color"
+    jpeg_quality: Optional[int] = None
+    target_dpi: Optional[int] = None
+
+
+def _prepare_export(task_id, voices, title, genre, komponist, arrangeur, export_mode,
+                    start_page=None, end_page=None, profile_name="color", jpeg_quality=None,
+                    target_dpi=None):
+    if export_mode not in EXPORT_MODES:
+        raise HTTPException(
+            status_code=400, detail=f"Unbekannter Exportmodus: {export_mode}")
+    try:
+        profile = make_export_profile(profile_name or "color", jpeg_quality, target_dpi)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    page_files = list_page_files(task_id)
+    voices_ranges = compute_voice_ranges(
+        parse_voice_starts(voices), len(page_files), start_page, end_page)
+    # Schlüssel der Export-Variante: gleiche Anfrage auf unveränderten Seiten = gleiche Artefakte
+    pages_sig = pages_signature(task_id, page_files)
+    metadata = {"title": title, "genre": genre,
+                "komponist": komponist, "arrangeur": arrangeur}
+    key = export_key(voices_ranges, metadata,
+                     {"export_mode": export_mode, "profile": profile}, pages_sig)
+    return page_files, voices_ranges, pages_sig, key, profile
 
 
 @router.post("/voices/split")
@@ -404,110 +304,47 @@ def split_voices(
     data: SplitVoicesRequest = Body(...),
     user: dict = Depends(get_current_user)
 ):
-    voices = data.voices
     title = data.title
-    genre = data.genre
-    komponist = data.komponist
-    arrangeur = data.arrangeur
-    start_page = data.start_page
-    end_page = data.end_page
-    from pdf2image import convert_from_path
-    from PIL import Image
-
-    export_dir = VOICES_EXPORT_DIR
-    os.makedirs(export_dir, exist_ok=True)
-
-    pages_dir = os.path.join(STATIC_DIR, task_id, "pages")
-    files = []
-    if os.path.isdir(pages_dir):
-        files = sorted(f for f in os.listdir(pages_dir) if f.endswith(".png"))
-    pages = []
-    for f in files:
-        img = Image.open(os.path.join(pages_dir, f))
-        pages.append(img)
-
-    voice_starts = []
-    for v in voices:
-        try:
-            page_index = int(v["page"]) - 1
-            voice_text = v["voice"].strip()
-            if voice_text:
-                voice_starts.append((page_index, voice_text))
-        except Exception:
-            continue
-    voice_starts.sort(key=lambda x: x[0])
-
-    voices_ranges = []
-    if start_page is not None and end_page is not None and len(voice_starts) == 1:
-        voices_ranges.append(
-            (start_page - 1, end_page - 1, voice_starts[0][1]))
+    export_mode = data.export_mode or "auto"
+    page_files, voices_ranges, pages_sig, key, profile = _prepare_export(
+        task_id, data.voices, title, data.genre, data.komponist, data.arrangeur,
+        export_mode, data.start_page, data.end_page, data.profile, data.jpeg_quality,
+        data.target_dpi)
+    export_dir = get_variant_dir(task_id, key)
+
+    manifest = load_manifest(task_id, key)
+    cached = manifest is not None and "pdf_files" in manifest and all(
+        os.path.exists(artifact_path(task_id, key, f)) for f in manifest["pdf_files"])
+    if cached:
+        pdf_files = manifest["pdf_files"]
+        timings = manifest.get("timings", [])
     else:
-        for i, (start_page_idx, voice_text) in enumerate(voice_starts):
-            if len(voice_starts) == 1:
-                end_page_idx = len(pages) - 1
-            else:
-                end_page_idx = voice_starts[i+1][0] - 1 if i + \
-                    1 < len(voice_starts) else len(pages) - 1
-            voices_ranges.append((start_page_idx, end_page_idx, voice_text))
-
-    pdf_files = []
-    for (start, end, voice_text) in voices_ranges:
-        voice_filename_part = voice_text.replace(".", "")
-        filename = f"{title} - {voice_filename_part}.pdf"
-        output_path = os.path.join(export_dir, filename)
-        selected_pages = pages[start:end+1]
-        if selected_pages:
-            pages_rgb = [p.convert("RGB") for p in selected_pages]
-            try:
-                pages_rgb[0].save(output_path, "PDF", resolution=100.0,
-                                  save_all=True, append_images=pages_rgb[1:])
-                pdf_files.append(filename)
-            finally:
-                for p in selected_pages:
-                    p.close()
-
-    if len(voices) > 1:
-        root_elem = Element("NotenIndex")
-        stueck_elem = SubElement(root_elem, "Stueck")
-        for key, value in [("Titel", title), ("Genre", genre), ("Komponist", komponist), ("Arrangeur", arrangeur)]:
-            sub_elem = SubElement(stueck_elem, key)
-            sub_elem.text = value
-        stimmen_container = SubElement(root_elem, "Stimmen")
-        for (start, end, voice_text) in voices_ranges:
-            voice_filename_part = voice_text.replace(".", "")
-            filename = f"{title} - {voice_filename_part}.pdf"
-            stimme_elem = SubElement(stimmen_container, "Stimme")
-            designation_elem = SubElement(stimme_elem, "Stimmenbezeichnung")
-            designation_elem.text = voice_text
-            file_elem = SubElement(stimme_elem, "Dateiname")
-            file_elem.text = filename
-            start_elem = SubElement(stimme_elem, "StartSeite")
-            start_elem.text = str(start + 1)
-            end_elem = SubElement(stimme_elem, "EndSeite")
-            end_elem.text = str(end + 1)
-
-        def indent(elem, level=0):
-            i = "\n" + level * "  "
-            if len(elem):
-                if not elem.text or not elem.text.strip():
-                    elem.text = i + "  "
-                for child in elem:
-                    indent(child, level + 1)
-                if not child.tail or not child.tail.strip():
-                    child.tail = i
-            else:
-                if level and (not elem.tail or not elem.tail.strip()):
-                    elem.tail = i
-        indent(root_elem)
-        xml_str = tostring(root_elem, encoding="unicode")
-        xml_output_path = os.path.join(export_dir, "NotenIndex.xml")
-        with open(xml_output_path, "w", encoding="utf-8") as f:
-            f.write(xml_str)
+        os.makedirs(export_dir, exist_ok=True)
+        # Stimmen parallel erzeugen, Reihenfolge und Dauer pro Stimme bleiben erhalten
+        prerendered = take_prerendered(task_id, voices_ranges, export_mode, profile, pages_sig)
+        timings = export_voices(task_id, page_files, voices_ranges,
+                                title, export_dir, export_mode, profile=profile,
+                                prerendered=prerendered)
+        pdf_files = [t["filename"] for t in timings]
+
+        if len(data.voices) > 1:
+            xml_str = build_noten_index_xml(
+                title, data.genre, data.komponist, data.arrangeur, voices_ranges)
+            xml_output_path = os.path.join(export_dir, "NotenIndex.xml")
+            with open(xml_output_path, "w", encoding="utf-8") as f:
+                f.write(xml_str)
+
+        update_manifest(task_id, key, pages_sig,
+                        pdf_files=pdf_files, timings=timings)
+        evict(task_id, pages_sig, keep_key=key)
 
     return {
         "status": "success",
         "pdf_files": pdf_files,
-        "export_dir": export_dir
+        "pdf_urls": [get_artifact_url(task_id, key, f) for f in pdf_files],
+        "export_dir": export_dir,
+        "timings": timings,
+        "cached": cached
     }
 
 
@@ -519,113 +356,149 @@ def split_voices_zip(
     genre: str = Body(default=""),
     komponist: str = Body(default=""),
     arrangeur: str = Body(default=""),
+    export_mode: str = Body(default="auto"),
+    profile: str = Body(default="color"),
+    jpeg_quality: Optional[int] = Body(default=None),
+    target_dpi: Optional[int] = Body(default=None),
     user: dict = Depends(get_current_user)
 ):
-    from pdf2image import convert_from_path
-    from PIL import Image
-
-    export_dir = VOICES_EXPORT_DIR
-    os.makedirs(export_dir, exist_ok=True)
-
-    pages_dir = os.path.join(STATIC_DIR, task_id, "pages")
-    files = []
-    if os.path.isdir(pages_dir):
-        files = sorted(f for f in os.listdir(pages_dir) if f.endswith(".png"))
-    pages = []
-    for f in files:
-        img = Image.open(os.path.join(pages_dir, f))
-        pages.append(img)
-
-    voice_starts = []
-    for v in voices:
+    page_files, voices_ranges, pages_sig, key, profile = _prepare_export(
+        task_id, voices, title, genre, komponist, arrangeur, export_mode,
+        profile_name=profile, jpeg_quality=jpeg_quality, target_dpi=target_dpi)
+    zip_filename_safe = get_zip_filename(title)
+
+    manifest = load_manifest(task_id, key)
+    cached = manifest is not None and manifest.get("zip") == zip_filename_safe and \
+        os.path.exists(artifact_path(task_id, key, zip_filename_safe))
+    if cached:
+        timings = manifest.get("zip_timings", [])
+    else:
+        # PDFs und NotenIndex.xml direkt ins Archiv schreiben, ohne Zwischendateien
+        timings = []
+        prerendered = take_prerendered(task_id, voices_ranges, export_mode, profile, pages_sig)
         try:
-            page_index = int(v["page"]) - 1
-            voice_text = v["voice"].strip()
-            if voice_text:
-                voice_starts.append((page_index, voice_text))
-        except Exception:
-            continue
-    voice_starts.sort(key=lambda x: x[0])
-
-    voices_ranges = []
-    for i, (start_page, voice_text) in enumerate(voice_starts):
-        if len(voice_starts) == 1:
-            end_page = len(pages) - 1
-        else:
-            end_page = voice_starts[i+1][0] - 1 if i + \
-                1 < len(voice_starts) else len(pages) - 1
-        voices_ranges.append((start_page, end_page, voice_text))
-
-    pdf_files = []
-    for (start, end, voice_text) in voices_ranges:
-        voice_filename_part = voice_text.replace(".", "")
-        filename = f"{title} - {voice_filename_part}.pdf"
-        output_path = os.path.join(export_dir, filename)
-        selected_pages = pages[start:end+1]
-        if selected_pages:
-            pages_rgb = [p.convert("RGB") for p in selected_pages]
-            try:
-                pages_rgb[0].save(output_path, "PDF", resolution=100.0,
-                                  save_all=True, append_images=pages_rgb[1:])
-                pdf_files.append(filename)
-            finally:
-                for p in selected_pages:
-                    p.close()
-
-    root_elem = Element("NotenIndex")
-    stueck_elem = SubElement(root_elem, "Stueck")
-    for key, value in [("Titel", title), ("Genre", genre), ("Komponist", komponist), ("Arrangeur", arrangeur)]:
-        sub_elem = SubElement(stueck_elem, key)
-        sub_elem.text = value
-    stimmen_container = SubElement(root_elem, "Stimmen")
-    for (start, end, voice_text) in voices_ranges:
-        voice_filename_part = voice_text.replace(".", "")
-        filename = f"{title} - {voice_filename_part}.pdf"
-        stimme_elem = SubElement(stimmen_container, "Stimme")
-        designation_elem = SubElement(stimme_elem, "Stimmenbezeichnung")
-        designation_elem.text = voice_text
-        file_elem = SubElement(stimme_elem, "Dateiname")
-        file_elem.text = filename
-        start_elem = SubElement(stimme_elem, "StartSeite")
-        start_elem.text = str(start + 1)
-        end_elem = SubElement(stimme_elem, "EndSeite")
-        end_elem.text = str(end + 1)
-
-    def indent(elem, level=0):
-        i = "\n" + level * "  "
-        if len(elem):
-            if not elem.text or not elem.text.strip():
-                elem.text = i + "  "
-            for child in elem:
-                indent(child, level + 1)
-            if not child.tail or not child.tail.strip():
-                child.tail = i
-        else:
-            if level and (not elem.tail or not elem.tail.strip()):
-                elem.tail = i
-    indent(root_elem)
-    xml_str = tostring(root_elem, encoding="unicode")
-    xml_output_path = os.path.join(export_dir, "NotenIndex.xml")
-    with open(xml_output_path, "w", encoding="utf-8") as f:
-        f.write(xml_str)
-
-    if not os.path.exists(xml_output_path):
-        raise HTTPException(
-            status_code=500, detail="ZIP-Datei konnte nicht erstellt werden.")
+            for _ in tee_to_cache(
+                    stream_voices_zip(task_id, page_files, voices_ranges, title, genre,
+                                      komponist, arrangeur, export_mode, timings=timings,
+                                      profile=profile, prerendered=prerendered),
+                    task_id, key, zip_filename_safe):
+                pass
+        except Exception as e:
+            raise HTTPException(
+                status_code=500, detail=f"ZIP-Datei konnte nicht erstellt werden: {e}")
+        update_manifest(task_id, key, pages_sig,
+                        zip=zip_filename_safe, zip_timings=timings)
+        evict(task_id, pages_sig, keep_key=key)
 
+    zip_url = get_artifact_url(task_id, key, zip_filename_safe)
+    return {"zip_url": zip_url, "timings": timings, "cached": cached}
+
+
+@router.post("/voices/split_zip/stream")
+def split_voices_zip_stream(
+    task_id: str = Body(...),
+    voices: list = Body(...),
+    title: str = Body(...),
+    genre: str = Body(default=""),
+    komponist: str = Body(default=""),
+    arrangeur: str = Body(default=""),
+    export_mode: str = Body(default="auto"),
+    profile: str = Body(default="color"),
+    jpeg_quality: Optional[int] = Body(default=None),
+    target_dpi: Optional[int] = Body(default=None),
+    user: dict = Depends(get_current_user)
+):
+    page_files, voices_ranges, pages_sig, key, profile = _prepare_export(
+        task_id, voices, title, genre, komponist, arrangeur, export_mode,
+        profile_name=profile, jpeg_quality=jpeg_quality, target_dpi=target_dpi)
     from urllib.parse import quote
-    zip_filename = f"{title}.zip" if title else "stimmen_export.zip"
-    zip_filename_safe = zip_filename.replace(" ", "_").replace("/", "_")
-    zip_path = os.path.join(export_dir, zip_filename_safe)
-    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zipf:
-        for pdf in pdf_files:
-            pdf_path = os.path.join(export_dir, pdf)
-            zipf.write(pdf_path, arcname=pdf)
-        zipf.write(xml_output_path, arcname="NotenIndex.xml")
-
-    if not os.path.exists(zip_path):
-        raise HTTPException(
-            status_code=500, detail="ZIP-Datei konnte nicht erstellt werden.")
+    zip_filename_safe = get_zip_filename(title)
+    headers = {
+        "Content-Disposition": f"attachment; filename*=UTF-8''{quote(zip_filename_safe)}"
+    }
 
-    zip_url = f"/static/voices_export/{quote(zip_filename_safe)}"
-    return {"zip_url": zip_url}
+    manifest = load_manifest(task_id, key)
+    zip_path = artifact_path(task_id, key, zip_filename_safe)
+    if manifest is not None and manifest.get("zip") == zip_filename_safe and os.path.exists(zip_path):
+        return FileResponse(zip_path, media_type="application/zip", headers=headers)
+
+    # Der Client erhält die ersten Bytes, sobald die erste Stimme fertig ist;
+    # parallel wird das Archiv für wiederholte Anfragen abgelegt.
+    timings = []
+    prerendered = take_prerendered(task_id, voices_ranges, export_mode, profile, pages_sig)
+
+    def on_complete():
+        update_manifest(task_id, key, pages_sig,
+                        zip=zip_filename_safe, zip_timings=timings)
+        evict(task_id, pages_sig, keep_key=key)
+
+    return StreamingResponse(
+        tee_to_cache(
+            stream_voices_zip(task_id, page_files, voices_ranges, title, genre,
+                              komponist, arrangeur, export_mode, timings=timings,
+                              profile=profile, prerendered=prerendered),
+            task_id, key, zip_filename_safe, on_complete),
+        media_type="application/zip",
+        headers=headers
+    )
+
+
+@router.post("/voices/export_jobs")
+def start_export_job(
+    task_id: str = Body(...),
+    voices: list = Body(...),
+    title: str = Body(...),
+    genre: str = Body(default=""),
+    komponist: str = Body(default=""),
+    arrangeur: str = Body(default=""),
+    export_mode: str = Body(default="auto"),
+    profile: str = Body(default="color"),
+    jpeg_quality: Optional[int] = Body(default=None),
+    target_dpi: Optional[int] = Body(default=None),
+    user: dict = Depends(get_current_user)
+):
+    page_files, voices_ranges, pages_sig, key, profile = _prepare_export(
+        task_id, voices, title, genre, komponist, arrangeur, export_mode,
+        profile_name=profile, jpeg_quality=jpeg_quality, target_dpi=target_dpi)
+    zip_filename_safe = get_zip_filename(title)
+    pages_total = sum(end - start + 1 for start, end, _ in voices_ranges)
+    conn = get_pg_connection()
+    job_id = create_export_job(
+        conn, task_id, user.get('user_id'), len(voices_ranges), pages_total)
+
+    manifest = load_manifest(task_id, key)
+    if manifest is not None and manifest.get("zip") == zip_filename_safe and \
+            os.path.exists(artifact_path(task_id, key, zip_filename_safe)):
+        # Bereits exportiert: Auftrag sofort abschließen
+        update_export_job(conn, job_id, status="done",
+                          voices_done=len(voices_ranges),
+                          pages_done=pages_total,
+                          result_url=get_artifact_url(task_id, key, zip_filename_safe))
+    else:
+        get_job_queue().submit(
+            run_export_job, job_id, task_id, page_files, voices_ranges, title, genre,
+            komponist, arrangeur, export_mode, pages_sig, key, zip_filename_safe, profile,
+            take_prerendered(task_id, voices_ranges, export_mode, profile, pages_sig),
+            kind="export", owner=user.get('user_id'))
+    return get_export_job(conn, job_id, user.get('user_id'))
+
+
+@router.get("/voices/export_jobs/{job_id}")
+def get_export_job_status(job_id: str, user: dict = Depends(get_current_user)):
+    conn = get_pg_connection()
+    job = get_export_job(conn, job_id, user.get('user_id'))
+    if not job:
+        raise HTTPException(status_code=404, detail="Export-Auftrag nicht gefunden")
+    return job
+
+
+@router.delete("/voices/export_jobs/{job_id}")
+def cancel_export_job(job_id: str, user: dict = Depends(get_current_user)):
+    conn = get_pg_connection()
+    if not request_cancel(conn, job_id, user.get('user_id')):
+        job = get_export_job(conn, job_id, user.get('user_id'))
+        if not job:
+            raise HTTPException(status_code=404, detail="Export-Auftrag nicht gefunden")
+        # Bereits abgeschlossen, abgebrochen oder fehlgeschlagen
+        return job
+    return get_export_job(conn, job_id, user.get('user_id'))
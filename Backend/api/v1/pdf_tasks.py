@@ -1,26 +1,40 @@
 from pydantic import BaseModel
-from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, BackgroundTasks
-from fastapi.responses import JSONResponse
-from sc_base_backend import get_current_user
+from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, Query, Request
+from fastapi.responses import JSONResponse, Response
+from sc_base_backend import get_current_user as _get_current_user
 from sc_base_backend import get_pg_connection
-from typing import List
+from typing import List, Optional
 import os
 import uuid
 import shutil
-from config import POPLER_PATH, STATIC_DIR, PAGES_DIR
+import zipfile
+from config import STATIC_DIR
+from services import storage
 from sc_base_backend import get_settings
-from pdf2image import convert_from_path
 from PIL import Image
-import cv2
-import numpy as np
 import logging
-from scipy.signal import find_peaks
 import datetime
-from skimage.measure import label, regionprops
+from services.header_ocr import is_header_ocr_enabled, precompute_header_ocr, delete_page_words
+from services.page_meta import update_page_meta, load_page_meta, failed_pages
+from services.deskew import is_debug_mode, is_debug_process_pdf_image
+from services.pipeline import render_pages
+from services.admission import Overloaded, estimate_pdf_cost, get_ingest_admission
+from services.tracing import span, traced_dependency
+from services.renditions import FORMATS, MIN_WIDTH, page_version, get_page_rendition
+from api.static_files import IMMUTABLE_CACHE_CONTROL, REVALIDATE_CACHE_CONTROL, etag_matches
 
 
 router = APIRouter(prefix="/pdf_tasks", tags=["pdf_tasks"])
 
+# Authentifizierung als eigener Span im Request-Trace
+get_current_user = traced_dependency("auth", _get_current_user)
+
+
+def _page_url(image_path, file_version=None):
+    base_url = get_settings().frontend_url or os.getenv(
+        "SERVER_URL", "http://localhost:8000")
+    return base_url + storage.versioned_url(image_path, file_version)
+
 
 class DeskewRequest(BaseModel):
     task_id: str
@@ -35,7 +49,7 @@ async def deskew_page(
 ):
     # Prüfe Rechte: Task muss dem User gehören
     conn = get_pg_connection()
-    with conn.cursor() as cur:
+    with span("db.pdf_tasks.owner"), conn.cursor() as cur:
         cur.execute("SELECT id FROM pdf_tasks WHERE id = %s AND user_id = %s",
                     (data.task_id, int(user.get('user_id'))))
         row = cur.fetchone()
@@ -44,183 +58,33 @@ async def deskew_page(
                 status_code=404, detail="Task not found or not allowed")
     # Lade Bild
     page_num_str = str(int(data.page)).zfill(5)
-    pages_dir = os.path.join(STATIC_DIR, data.task_id, "pages")
+    pages_dir = os.path.join(storage.task_dir(data.task_id), "pages")
     image_path = os.path.join(
         pages_dir, f"{data.task_id}_page_{page_num_str}.png")
-    if not os.path.exists(image_path):
+    if not storage.fetch(image_path):
         raise HTTPException(status_code=404, detail="Page image not found")
     try:
-        image = Image.open(image_path)
+        with span("image.open"):
+            image = Image.open(image_path)
+            image.load()
         # Rotieren um den gewünschten Winkel
         rotated = image.rotate(-data.angle, expand=True, fillcolor="white")
         rotated.save(image_path, "PNG")
         image.close()
         rotated.close()
-        return {"status": "success", "angle": data.angle}
+        storage.publish(image_path)
+        # Vorberechnete Kopfzeilen-OCR passt nicht mehr zur gedrehten Seite
+        delete_page_words(data.task_id, data.page)
+        update_page_meta(data.task_id, data.page, edited=True)
+        return {"status": "success", "angle": data.angle,
+                "url": _page_url(image_path)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Fehler beim Deskew: {e}")
 
 
-def is_debug_mode():
-    import os
-    debug = os.environ.get("DEBUG", "False")
-    return str(debug).strip().lower() in ("1", "true", "yes", "ja")
-
-
-def is_debug_process_pdf_image():
-    import os
-
-    if is_debug_process_pdf_detailed_image():
-        return True
-
-    debug = os.environ.get("DEBUG_PROCESS_PDF_IMAGE", "False")
-    return str(debug).strip().lower() in ("1", "true", "yes", "ja")
-
-
-def is_debug_process_pdf_detailed_image():
-    import os
-    debug = os.environ.get("DEBUG_PROCESS_PDF_DETAILED_IMAGES", "False")
-    return str(debug).strip().lower() in ("1", "true", "yes", "ja")
-
-
-def deskew_scikit_orientation(image, optpages_dir, page_num, log_debug=None):
-    log_debug = getattr(image, '_log_debug', None)
-    if log_debug:
-        log_debug("")
-        log_debug("deskew_scikit_orientation: Start")
-
-    image_cv = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
-    gray = cv2.cvtColor(image_cv, cv2.COLOR_BGR2GRAY)
-    thresh = cv2.threshold(
-        gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)[1]
-
-    if is_debug_mode():
-        log_debug("Kontrollbilder gray und thresh werden gespeichert.")
-    if is_debug_process_pdf_detailed_image():
-        cv2.imwrite(os.path.join(
-            optpages_dir, f"page_{page_num}_4_1_gray.png"), gray)
-        cv2.imwrite(os.path.join(
-            optpages_dir, f"page_{page_num}_4_2_thresh.png"), thresh)
-
-    labeled = label(thresh)
-    regions = regionprops(labeled)
-
-    if not regions:
-        if log_debug:
-            log_debug("Keine Regionen gefunden, keine Rotation.")
-        return 0.0
-
-    largest_region = max(regions, key=lambda r: r.area)
-    angle_rad = largest_region.orientation
-    angle_deg = -np.degrees(angle_rad)
-
-    if 70 <= abs(angle_deg) <= 110:
-        if angle_deg > 0:
-            angle_deg = angle_deg - 90
-        else:
-            angle_deg = angle_deg + 90
-        if log_debug:
-            log_debug(
-                f"Winkel wurde um 90° korrigiert: Neuer Winkel = {angle_deg:.2f}°")
-
-    if is_debug_process_pdf_detailed_image():
-        debug_img = image_cv.copy()
-        h, w = debug_img.shape[:2]
-        center_img = (w // 2, h // 2)
-        length = min(h, w) // 2 - 10
-        angle_rad_draw = np.radians(angle_deg)
-        x2 = int(center_img[0] + length * np.cos(angle_rad_draw))
-        y2 = int(center_img[1] - length * np.sin(angle_rad_draw))
-        cv2.arrowedLine(debug_img, center_img, (x2, y2),
-                        (0, 0, 255), 4, tipLength=0.08)
-        cv2.putText(debug_img, f"{angle_deg:.2f}°", (
-            center_img[0]+10, center_img[1]-10), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 255), 2)
-        cv2.imwrite(os.path.join(
-            optpages_dir, f"page_{page_num}_4_3_angle_debug.png"), debug_img)
-
-    return angle_deg
-
-
-def deskew_min_area_rect(image, optpages_dir, page_num, log_debug=None):
-    log_debug = getattr(image, '_log_debug', None)
-    if log_debug:
-        log_debug("")
-        log_debug("deskew_min_area_rect: Wird aufgerufen")
-    import cv2
-    import numpy as np
-    from PIL import Image
-    image_cv = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
-    h, w = image_cv.shape[:2]
-    gray = cv2.cvtColor(image_cv, cv2.COLOR_BGR2GRAY)
-    thresh = cv2.threshold(
-        gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)[1]
-    coords = np.column_stack(np.where(thresh > 0))
-    if is_debug_process_pdf_detailed_image():
-        cv2.imwrite(os.path.join(
-            optpages_dir, f"page_{page_num}_03_01_gray.png"), gray)
-        cv2.imwrite(os.path.join(
-            optpages_dir, f"page_{page_num}_03_02_thresh.png"), thresh)
-    if coords.shape[0] == 0:
-        if log_debug:
-            log_debug("Keine relevanten Pixel gefunden, keine Rotation.")
-        return 0.0
-    rect = cv2.minAreaRect(coords)
-    (center, (width, height), angle) = rect
-
-    if image_cv.shape[1] > image_cv.shape[0]:
-        if log_debug:
-            log_debug("Bild ist im Landscape-Modus.")
-        if width > height and 80 <= angle <= 100:
-            angle = angle - 90.0
-            if log_debug:
-                log_debug(f"Winkel wurde auf {angle} gekippt.")
-        if width < height:
-            width, height = height, width
-            center = (center[1], center[0])
-            if log_debug:
-                log_debug(f"Breite und Höhe wurden vertauscht")
-    else:
-        if log_debug:
-            log_debug("Bild ist im Portrait-Modus.")
-        if width < height and 80 <= angle <= 100:
-            angle = angle - 90.0
-            if log_debug:
-                log_debug(f"Winkel wurde auf {angle} gekippt.")
-        if width > height:
-            width, height = height, width
-            center = (center[1], center[0])
-            if log_debug:
-                log_debug(f"Breite und Höhe wurden vertauscht")
-
-    angle = -angle
-
-    if is_debug_process_pdf_detailed_image():
-        debug_img = image_cv.copy()
-        h, w = debug_img.shape[:2]
-        box = cv2.boxPoints(((center[0], center[1]), (width, height), angle))
-        box = np.int0(box)
-        min_x, min_y = box[:, 0].min(), box[:, 1].min()
-        offset_x = 0
-        offset_y = 0
-        if min_x < 0:
-            offset_x = -min_x
-        if min_y < 0:
-            offset_y = -min_y
-        box[:, 0] += offset_x
-        box[:, 1] += offset_y
-        box[:, 1] = h - box[:, 1]
-        box[:, 0] = np.clip(box[:, 0], 0, w - 1)
-        box[:, 1] = np.clip(box[:, 1], 0, h - 1)
-        cv2.drawContours(debug_img, [box], 0, (0, 0, 255), 2)
-        cv2.imwrite(os.path.join(
-            optpages_dir, f"page_{page_num}_03_03_rect.png"), debug_img)
-
-    return angle
-
-
 def create_pdf_task(conn, user_id, filename):
     task_id = str(uuid.uuid4())
-    with conn.cursor() as cur:
+    with span("db.pdf_tasks.create"), conn.cursor() as cur:
         cur.execute(
             """INSERT INTO pdf_tasks (id, user_id, filename, status, created_at, updated_at)
                    VALUES (%s, %s, %s, %s, %s, %s)""",
@@ -232,7 +96,7 @@ def create_pdf_task(conn, user_id, filename):
 
 
 def update_pdf_task_status(conn, task_id, status, num_pages=None, error_message=None):
-    with conn.cursor() as cur:
+    with span("db.pdf_tasks.update_status"), conn.cursor() as cur:
         cur.execute(
             """UPDATE pdf_tasks SET status=%s, updated_at=%s, num_pages=%s, error_message=%s WHERE id=%s""",
             (status, datetime.datetime.now(), num_pages, error_message, task_id)
@@ -243,8 +107,8 @@ def update_pdf_task_status(conn, task_id, status, num_pages=None, error_message=
 def process_pdf_task(task_id, pdf_path, pages_dir, conn):
 
     timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-    log_dir = os.path.join(STATIC_DIR, task_id, "debug_logs")
-    optpages_dir = os.path.join(STATIC_DIR, task_id, "opt_pages")
+    log_dir = os.path.join(storage.task_dir(task_id), "debug_logs")
+    optpages_dir = os.path.join(storage.task_dir(task_id), "opt_pages")
     log_path = os.path.join(log_dir, f"process_pdf_task_{timestamp}.log")
 
     if is_debug_mode():
@@ -260,84 +124,23 @@ def process_pdf_task(task_id, pdf_path, pages_dir, conn):
         os.makedirs(optpages_dir, exist_ok=True)
 
     try:
-        images = convert_from_path(pdf_path, poppler_path=POPLER_PATH)
-        if is_debug_mode():
-            log_debug(f"PDF converted to {len(images)} images.")
-
-        for i, img in enumerate(images):
-            if is_debug_mode():
-                log_debug(
-                    f"------------------ Processing page {i+1} --------------------")
-            page_num_str = str(i+1).zfill(5)
-
-            if is_debug_process_pdf_image():
-                img_cv = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
-                cv2.imwrite(os.path.join(
-                    optpages_dir, f"page_{page_num_str}_0_origin.png"), img_cv)
-
-            if is_debug_mode():
-                setattr(img, '_log_debug', log_debug)
-            angle_min_area = deskew_min_area_rect(
-                img, optpages_dir, page_num_str)
-            if is_debug_mode():
-                log_debug(f"deskew_min_area_rect: Winkel = {angle_min_area}°")
-            angle_scikit = deskew_scikit_orientation(
-                img, optpages_dir, page_num_str)
-            if is_debug_mode():
-                log_debug(
-                    f"deskew_scikit_orientation: Winkel = {angle_scikit}°")
-
-            angle_diff = abs(angle_min_area - angle_scikit)
+        num_pages = render_pages(task_id, pdf_path, pages_dir, optpages_dir,
+                                 log_debug if is_debug_mode() else None)
+        # Seiten vor "done" ablegen, damit jeder Knoten sie ausliefern kann
+        storage.publish_dir(pages_dir)
+        # Kopfzeilen-OCR vor "done": Clients, die auf "done" hin die OCR-Endpunkte
+        # aufrufen, finden die vorberechneten Wörter bereits vor
+        if is_header_ocr_enabled():
+            precompute_header_ocr(task_id, pages_dir, num_pages)
             if is_debug_mode():
-                log_debug("")
-                log_debug(f"Winkel-Differenz: {angle_diff:.2f}°")
-
-            angle_to_apply = 0.0
-            if angle_diff <= 0.6:
-                angle_to_apply = (angle_min_area + angle_scikit) / 2.0
-                if is_debug_mode():
-                    log_debug(
-                        f"Winkel sind ähnlich, Mittelwert wird verwendet {angle_to_apply}°")
-            else:
-                if angle_diff >= 1.5:
-                    angle_to_apply = angle_scikit
-                    if is_debug_mode():
-                        log_debug(
-                            f"Winkel weichen um > 1.5 ab, deshalb wird Winkel scikit verwendet {angle_to_apply}°")
-                else:
-                    if is_debug_mode():
-                        log_debug(
-                            "Winkel weichen zu stark ab, deshalb auf 0.0° gesetzt")
-
-            if angle_to_apply != 0.0 and abs(angle_to_apply) < 20:
-                if is_debug_mode():
-                    log_debug(
-                        f"Rotation wird durchgeführt mit Mittelwert: {angle_to_apply:.2f}°")
-                img_cv = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
-                h, w = img_cv.shape[:2]
-                center_img = (w // 2, h // 2)
-                M = cv2.getRotationMatrix2D(center_img, angle_to_apply, 1.0)
-                rotated = cv2.warpAffine(
-                    img_cv, M, (w, h), flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE)
-                img = Image.fromarray(cv2.cvtColor(rotated, cv2.COLOR_BGR2RGB))
-                if is_debug_process_pdf_image():
-                    cv2.imwrite(os.path.join(
-                        optpages_dir, f"page_{page_num_str}_5_rotated.png"), rotated)
-            else:
-                if log_debug:
-                    log_debug(
-                        f"Winkel {angle_to_apply}° > 20° keine Rotation.")
-
-            img.save(os.path.join(
-                pages_dir, f"{task_id}_page_{page_num_str}.png"), "PNG")
-
-            if is_debug_mode():
-                log_debug(
-                    f"Page {i+1} saved as {task_id}_page_{page_num_str}.png")
-
-            img.close()
-            del img
-        update_pdf_task_status(conn, task_id, "done", num_pages=len(images))
+                log_debug("Header OCR precomputed.")
+        # Einzelne nicht gerasterte Seiten (z. B. Zeitlimit) beenden den Task nicht
+        failed = failed_pages(load_page_meta(task_id))
+        error_message = None
+        if failed:
+            error_message = f"Seiten nicht gerastert: {', '.join(map(str, failed))}"
+        update_pdf_task_status(conn, task_id, "done", num_pages=num_pages,
+                               error_message=error_message)
         if is_debug_mode():
             log_debug("PDF task finished successfully.")
     except Exception as e:
@@ -347,62 +150,320 @@ def process_pdf_task(task_id, pdf_path, pages_dir, conn):
         update_pdf_task_status(conn, task_id, "error", error_message=str(e))
 
 
+def _overloaded_error(e):
+    return HTTPException(
+        status_code=429,
+        detail={"message": "Verarbeitung ausgelastet, bitte später erneut hochladen",
+                "queue_position": e.waiting + 1, "retry_after": e.retry_after},
+        headers={"Retry-After": str(e.retry_after)})
+
+
 @router.post("/upload")
-async def upload_pdf(
+def upload_pdf(
     file: UploadFile = File(...),
-    background_tasks: BackgroundTasks = None,
     user: dict = Depends(get_current_user)
 ):
+    admission = get_ingest_admission()
+    try:
+        admission.check()
+    except Overloaded as e:
+        raise _overloaded_error(e)
     conn = get_pg_connection()
     filename = file.filename
     task_id = create_pdf_task(conn, user.get('user_id'), filename)
-    task_dir = os.path.join(STATIC_DIR, task_id)
+    task_dir = storage.task_dir(task_id)
     pages_dir = os.path.join(task_dir, "pages")
     os.makedirs(pages_dir, exist_ok=True)
     pdf_path = os.path.join(task_dir, "original.pdf")
+    # Synchroner Endpunkt: Schreiben, Upload in die Ablage und pypdf laufen im Threadpool
     with open(pdf_path, "wb") as f:
-        f.write(await file.read())
+        shutil.copyfileobj(file.file, f)
+    storage.publish(pdf_path)
+    cost = estimate_pdf_cost(pdf_path)
+    position = admission.submit(task_id, cost, _process_queued_task, task_id, pdf_path, pages_dir,
+                                owner=user.get('user_id'))
+    status = "processing" if position == 0 else "pending"
+    return {"id": task_id, "task_id": task_id, "status": status,
+            "queue_position": position, "estimate": cost}
+
+
+def _iter_batch_pdfs(files):
+    # Liefert (Dateiname, Dateiobjekt) für alle PDFs, auch aus ZIP-Archiven
+    for file in files:
+        name = file.filename or ""
+        if name.lower().endswith(".zip"):
+            with zipfile.ZipFile(file.file) as zf:
+                for info in zf.infolist():
+                    member = os.path.basename(info.filename)
+                    if info.is_dir() or not member.lower().endswith(".pdf") \
+                            or info.filename.startswith("__MACOSX/"):
+                        continue
+                    with zf.open(info) as src:
+                        yield member, src
+        elif name.lower().endswith(".pdf"):
+            yield name, file.file
+
+
+def create_pdf_batch(conn, user_id, filenames):
+    # Batch und alle Tasks in einer Transaktion anlegen
+    batch_id = str(uuid.uuid4())
+    task_ids = [str(uuid.uuid4()) for _ in filenames]
+    now = datetime.datetime.now()
+    try:
+        with span("db.pdf_batches.create"), conn.cursor() as cur:
+            cur.execute(
+                "INSERT INTO pdf_batches (id, user_id, created_at) VALUES (%s, %s, %s)",
+                (batch_id, user_id, now)
+            )
+            cur.executemany(
+                """INSERT INTO pdf_tasks (id, user_id, filename, status, batch_id, created_at, updated_at)
+                       VALUES (%s, %s, %s, %s, %s, %s, %s)""",
+                [(task_id, user_id, filename, 'pending', batch_id, now, now)
+                 for task_id, filename in zip(task_ids, filenames)]
+            )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return batch_id, task_ids
+
+
+def fail_pdf_batch(conn, batch_id, error_message):
+    # Tasks eines Batches, die nach dem Anlegen nicht mehr eingereiht werden konnten
+    try:
+        conn.rollback()
+        with span("db.pdf_batches.fail"), conn.cursor() as cur:
+            cur.execute(
+                """UPDATE pdf_tasks SET status = 'error', error_message = %s, updated_at = %s
+                   WHERE batch_id = %s AND status = 'pending'""",
+                (error_message, datetime.datetime.now(), batch_id)
+            )
+        conn.commit()
+    except Exception:
+        logging.exception(f"Batch {batch_id} konnte nicht als fehlgeschlagen markiert werden")
+
+
+def _process_queued_task(task_id, pdf_path, pages_dir):
+    # Eigene Verbindung pro Auftrag, da mehrere Worker parallel Tasks bearbeiten
+    conn = get_pg_connection()
     update_pdf_task_status(conn, task_id, "processing")
-    background_tasks.add_task(
-        process_pdf_task, task_id, pdf_path, pages_dir, conn)
-    return {"id": task_id, "task_id": task_id, "status": "processing"}
+    process_pdf_task(task_id, pdf_path, pages_dir, conn)
+
+
+@router.post("/upload_batch")
+def upload_pdf_batch(
+    files: List[UploadFile] = File(...),
+    user: dict = Depends(get_current_user)
+):
+    admission = get_ingest_admission()
+    try:
+        admission.check()
+    except Overloaded as e:
+        raise _overloaded_error(e)
+    # Dateien zuerst in ein Staging-Verzeichnis, Tasks erst danach gesammelt anlegen
+    staging_dir = os.path.join(STATIC_DIR, f"batch_{uuid.uuid4().hex}")
+    os.makedirs(staging_dir, exist_ok=True)
+    staged = []
+    conn = batch_id = None
+    try:
+        try:
+            for filename, src in _iter_batch_pdfs(files):
+                staged_path = os.path.join(staging_dir, f"{len(staged):05d}.pdf")
+                with open(staged_path, "wb") as f:
+                    shutil.copyfileobj(src, f)
+                staged.append((filename, staged_path))
+        except zipfile.BadZipFile:
+            raise HTTPException(status_code=400, detail="Ungültiges ZIP-Archiv")
+        if not staged:
+            raise HTTPException(status_code=400, detail="Keine PDF-Dateien gefunden")
+        # Jedes PDF wird ein eigener Auftrag: Kapazität für alle prüfen, nicht nur für den Upload
+        if len(staged) > admission.max_waiting:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Zu viele PDF-Dateien in einem Upload (höchstens {admission.max_waiting})")
+        try:
+            admission.check(len(staged))
+        except Overloaded as e:
+            raise _overloaded_error(e)
+
+        conn = get_pg_connection()
+        batch_id, task_ids = create_pdf_batch(
+            conn, user.get('user_id'), [filename for filename, _ in staged])
+
+        jobs = []
+        for task_id, (_, staged_path) in zip(task_ids, staged):
+            task_dir = storage.task_dir(task_id)
+            pages_dir = os.path.join(task_dir, "pages")
+            os.makedirs(pages_dir, exist_ok=True)
+            pdf_path = os.path.join(task_dir, "original.pdf")
+            shutil.move(staged_path, pdf_path)
+            storage.publish(pdf_path)
+            jobs.append((task_id, pdf_path, pages_dir))
+    except Exception as e:
+        # Sonst blieben die bereits angelegten Tasks für immer "pending"
+        if batch_id is not None:
+            fail_pdf_batch(conn, batch_id, f"Upload abgebrochen: {e}")
+        raise
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+    queued = 0
+    for task_id, pdf_path, pages_dir in jobs:
+        position = admission.submit(task_id, estimate_pdf_cost(pdf_path), _process_queued_task,
+                                    task_id, pdf_path, pages_dir, owner=user.get('user_id'))
+        queued += position > 0
+    return {"batch_id": batch_id, "task_ids": task_ids, "total": len(task_ids), "queued": queued}
+
+
+@router.get("/batches/{batch_id}")
+def get_pdf_batch_status(batch_id: str, user: dict = Depends(get_current_user)):
+    conn = get_pg_connection()
+    with span("db.pdf_batches.status"), conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT t.id, t.filename, t.status, t.num_pages, t.error_message
+            FROM pdf_batches b
+            JOIN pdf_tasks t ON t.batch_id = b.id
+            WHERE b.id = %s AND b.user_id = %s
+            ORDER BY t.filename
+            """,
+            (batch_id, int(user.get('user_id')))
+        )
+        rows = cur.fetchall()
+    if not rows:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    tasks = [dict(row) for row in rows]
+    admission = get_ingest_admission()
+    for task in tasks:
+        task["id"] = str(task["id"])
+        if task["status"] == "pending":
+            task["queue_position"] = admission.position(task["id"])
+    counts = {status: 0 for status in ("pending", "processing", "done", "error")}
+    for task in tasks:
+        counts[task["status"]] = counts.get(task["status"], 0) + 1
+    finished = counts["done"] + counts["error"]
+    return {
+        "batch_id": batch_id,
+        "status": "done" if finished == len(tasks) else "processing",
+        "total": len(tasks),
+        "finished": finished,
+        "counts": counts,
+        "num_pages": sum(task["num_pages"] or 0 for task in tasks),
+        "tasks": tasks,
+    }
 
 
 @router.get("/status/{task_id}")
 async def get_pdf_task_status(task_id: str, user: dict = Depends(get_current_user)):
     conn = get_pg_connection()
-    with conn.cursor() as cur:
+    with span("db.pdf_tasks.status"), conn.cursor() as cur:
         cur.execute(
             "SELECT status, num_pages, error_message FROM pdf_tasks WHERE id=%s", (task_id,))
         row = cur.fetchone()
     if not row:
         raise HTTPException(status_code=404, detail="Task not found")
     try:
-        return {"status": row["status"], "num_pages": row["num_pages"], "error_message": row["error_message"]}
+        result = {"status": row["status"], "num_pages": row["num_pages"], "error_message": row["error_message"]}
     except (TypeError, KeyError):
-        return {"status": row[0], "num_pages": row[1], "error_message": row[2]}
+        result = {"status": row[0], "num_pages": row[1], "error_message": row[2]}
+    if result["status"] == "pending":
+        # Von der Zulassungssteuerung zurückgestellt: Position in der Warteschlange
+        result["queue_position"] = get_ingest_admission().position(task_id)
+    return result
+
+
+def _check_task_id(task_id):
+    # Task-IDs sind uuid4 (create_pdf_task, create_pdf_batch); geprüft, bevor daraus ein Pfad wird
+    try:
+        valid = str(uuid.UUID(task_id)) == task_id
+    except ValueError:
+        valid = False
+    if not valid:
+        raise HTTPException(status_code=400, detail=f"Ungültige Task-ID: {task_id}")
+
+
+def _check_rendition_params(width, fmt):
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unbekanntes Format: {fmt}")
+    if width is not None and width < MIN_WIDTH:
+        raise HTTPException(status_code=400, detail=f"Breite muss mindestens {MIN_WIDTH} sein")
 
 
 @router.get("/pages/{task_id}")
-async def get_pages(task_id: str, user: dict = Depends(get_current_user)):
-    pages_dir = os.path.join(STATIC_DIR, task_id, "pages")
-    if not os.path.isdir(pages_dir):
-        return JSONResponse(content={"pages": []})
-    files = sorted(f for f in os.listdir(pages_dir)
-                   if f.startswith(f"{task_id}_") and f.endswith(".png"))
-    base_url = get_settings().frontend_url or os.getenv(
-        "SERVER_URL", "http://localhost:8000")
-    urls = [f"{base_url}/static/{task_id}/pages/{f}" for f in files]
+def get_pages(
+    task_id: str,
+    request: Request,
+    width: Optional[int] = Query(None),
+    fmt: Optional[str] = Query(None, alias="format"),
+    user: dict = Depends(get_current_user)
+):
+    _check_task_id(task_id)
+    pages_dir = os.path.join(storage.task_dir(task_id), "pages")
+    files = storage.list_dir(pages_dir)
+    names = [f for f in sorted(files) if f.startswith(f"{task_id}_") and f.endswith(".png")]
+    if width is None and fmt is None:
+        # Versionierte URLs: nach /deskew ändert sich die URL, sonst bleibt die Seite im Browser-Cache
+        urls = [_page_url(os.path.join(pages_dir, f), files[f]) for f in names]
+        return JSONResponse(content={"pages": urls})
+    # Mit width/format: URLs der verkleinerten Seiten, ebenfalls versioniert
+    fmt = fmt or "webp"
+    _check_rendition_params(width, fmt)
+    urls = []
+    for page, f in enumerate(names, start=1):
+        params = {"format": fmt, "v": files[f]}
+        if width is not None:
+            params["width"] = width
+        url = request.url_for("get_page_image", task_id=task_id, page=page)
+        urls.append(str(url.include_query_params(**params)))
     return JSONResponse(content={"pages": urls})
 
 
+@router.get("/pages/{task_id}/{page}")
+def get_page_image(
+    task_id: str,
+    page: int,
+    request: Request,
+    width: Optional[int] = Query(None),
+    fmt: str = Query("webp", alias="format")
+):
+    """Verkleinerte, neu kodierte Seite (services/renditions.py).
+
+    Ohne Anmeldung, damit <img> die URL direkt laden kann; task_id und page werden
+    deshalb vor jedem Zugriff auf die Ablage geprüft.
+    """
+    _check_task_id(task_id)
+    if page < 1:
+        raise HTTPException(status_code=400, detail="Seite muss mindestens 1 sein")
+    _check_rendition_params(width, fmt)
+    page_num_str = str(page).zfill(5)
+    image_path = os.path.join(storage.task_dir(task_id), "pages",
+                              f"{task_id}_page_{page_num_str}.png")
+    source_version = page_version(image_path)
+    if source_version is None:
+        raise HTTPException(status_code=404, detail=f"Seite {page} für Task {task_id} nicht gefunden")
+    etag = f'"{source_version}-{width or 0}-{fmt}"'
+    immutable = request.query_params.get("v") == source_version
+    headers = {
+        "ETag": etag,
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL,
+    }
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    try:
+        data = get_page_rendition(image_path, source_version, width, fmt)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Seite {page} für Task {task_id} nicht gefunden")
+    return Response(content=data, media_type=FORMATS[fmt], headers=headers)
+
+
 @router.get("/", response_model=List[dict])
 def list_pdf_tasks(user: dict = Depends(get_current_user)):
     conn = get_pg_connection()
-    with conn.cursor() as cur:
+    with span("db.pdf_tasks.list"), conn.cursor() as cur:
         cur.execute(
             """
-            SELECT id, filename, status, num_pages, created_at, updated_at, error_message
+            SELECT id, filename, status, num_pages, created_at, updated_at, error_message, batch_id
             FROM pdf_tasks
             WHERE user_id = %s
             ORDER BY created_at DESC
@@ -423,7 +484,7 @@ def list_pdf_tasks(user: dict = Depends(get_current_user)):
 @router.get("/{task_id}")
 def get_pdf_task(task_id: str, user: dict = Depends(get_current_user)):
     conn = get_pg_connection()
-    with conn.cursor() as cur:
+    with span("db.pdf_tasks.get"), conn.cursor() as cur:
         cur.execute(
             """
             SELECT id, filename, status, num_pages, created_at, updated_at, error_message
@@ -446,7 +507,7 @@ def get_pdf_task(task_id: str, user: dict = Depends(get_current_user)):
 @router.delete("/{task_id}")
 def delete_pdf_task(task_id: str, user: dict = Depends(get_current_user)):
     conn = get_pg_connection()
-    with conn.cursor() as cur:
+    with span("db.pdf_tasks.delete"), conn.cursor() as cur:
         cur.execute(
             "DELETE FROM pdf_tasks WHERE id = %s AND user_id = %s",
             (task_id, int(user.get('user_id')))
@@ -455,12 +516,10 @@ def delete_pdf_task(task_id: str, user: dict = Depends(get_current_user)):
             raise HTTPException(
                 status_code=404, detail="Task not found or not allowed")
         conn.commit()
-    task_dir = os.path.join(STATIC_DIR, task_id)
+    task_dir = storage.task_dir(task_id)
     import traceback
     try:
-        shutil.rmtree(task_dir)
-    except FileNotFoundError:
-        pass
+        storage.remove_dir(task_dir)
     except Exception as e:
         print(f"[ERROR] Fehler beim Löschen von {task_dir}: {e}")
         traceback.print_exc()
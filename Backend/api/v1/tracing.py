@@ -0,0 +1,11 @@
+from fastapi import APIRouter, Depends
+from sc_base_backend import get_current_user
+from services.tracing import stats
+
+router = APIRouter(prefix="/tracing", tags=["tracing"])
+
+
+@router.get("/summary")
+def get_tracing_summary(user: dict = Depends(get_current_user)):
+    # p50/p95/p99 je Route und je Span-Name über die letzten TRACE_WINDOW Requests
+    return stats.summary()
@@ -0,0 +1,103 @@
+"""
+Genauigkeit und Geschwindigkeit der Deskew-Verfahren auf synthetischen Notenseiten.
+
+Die Seiten stammen aus benchmarks/synthetic_scores.py und haben eine bekannte
+Schräglage. Gemessen werden deskew_min_area_rect, deskew_scikit_orientation und
+die Abstimmung aus services/pipeline.py (choose_deskew_angle inkl.
+MAX_DESKEW_ANGLE), jeweils mit Winkelfehler (Mittel, p95, max), Anteil der Seiten
+mit Fehler <= --ok-deg und Seiten pro Sekunde. Mit --agree/--fallback lassen sich
+andere Schwellen der Abstimmung vergleichen, ohne die Schätzer erneut zu rechnen.
+
+Aufruf (im Verzeichnis Backend):
+    python -m benchmarks.bench_deskew --pages 200
+    python -m benchmarks.bench_deskew --pages 2000 --dpi 150 200 --noise 0 0.5 1.0
+    python -m benchmarks.bench_deskew --pages 500 --agree 0.6 1.0 --fallback 1.5 3.0
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.synthetic_scores import generate_page
+from services.deskew import deskew_min_area_rect, deskew_scikit_orientation
+from services.pipeline import (
+    choose_deskew_angle, DESKEW_AGREE_DEG, DESKEW_FALLBACK_DEG, MAX_DESKEW_ANGLE,
+)
+
+
+ESTIMATORS = {
+    "min_area_rect": deskew_min_area_rect,
+    "scikit": deskew_scikit_orientation,
+}
+
+
+def applied_angle(angle, max_angle=MAX_DESKEW_ANGLE):
+    # Wie in der Pipeline: große Winkel werden nicht angewendet
+    return angle if abs(angle) < max_angle else 0.0
+
+
+def summarize(errors, ok_deg):
+    errors = np.abs(np.asarray(errors, dtype=float))
+    return {
+        "mean": float(errors.mean()),
+        "p95": float(np.percentile(errors, 95)),
+        "max": float(errors.max()),
+        "ok": float((errors <= ok_deg).mean()),
+    }
+
+
+def run(pages, dpi, noise, max_angle, seed, thresholds, ok_deg):
+    truth = []
+    estimates = {name: [] for name in ESTIMATORS}
+    seconds = {name: 0.0 for name in ESTIMATORS}
+    for i in range(pages):
+        image, t = generate_page(seed=seed + i, dpi=dpi, max_angle=max_angle, noise=noise)
+        truth.append(t["correction"])
+        for name, fn in ESTIMATORS.items():
+            t0 = time.perf_counter()
+            estimates[name].append(fn(image, None, "00000"))
+            seconds[name] += time.perf_counter() - t0
+        image.close()
+
+    truth = np.asarray(truth)
+    rows = []
+    for name in ESTIMATORS:
+        est = np.array([applied_angle(a) for a in estimates[name]])
+        rows.append((name, summarize(est - truth, ok_deg), pages / seconds[name]))
+    both = pages / (seconds["min_area_rect"] + seconds["scikit"])
+    for agree, fallback in thresholds:
+        voted = np.array([
+            applied_angle(choose_deskew_angle(a, b, agree_deg=agree, fallback_deg=fallback))
+            for a, b in zip(estimates["min_area_rect"], estimates["scikit"])
+        ])
+        rows.append((f"pipeline {agree}/{fallback}", summarize(voted - truth, ok_deg), both))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--dpi", type=int, nargs="*", default=[200])
+    parser.add_argument("--noise", type=float, nargs="*", default=[0.5])
+    parser.add_argument("--max-angle", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--agree", type=float, nargs="*", default=[DESKEW_AGREE_DEG])
+    parser.add_argument("--fallback", type=float, nargs="*", default=[DESKEW_FALLBACK_DEG])
+    parser.add_argument("--ok-deg", type=float, default=0.25,
+                        help="Fehlergrenze für den Anteil korrekt ausgerichteter Seiten")
+    args = parser.parse_args()
+
+    thresholds = [(a, f) for a in args.agree for f in args.fallback]
+    for dpi in args.dpi:
+        for noise in args.noise:
+            print(f"\n{args.pages} Seiten, {dpi} dpi, Rauschen {noise}, Winkel bis ±{args.max_angle}°")
+            for name, stats, pps in run(args.pages, dpi, noise, args.max_angle, args.seed,
+                                        thresholds, args.ok_deg):
+                print(f"{name:>22} | Fehler Mittel {stats['mean']:6.3f}° p95 {stats['p95']:6.3f}° "
+                      f"max {stats['max']:6.3f}° | <= {args.ok_deg}°: {stats['ok']:6.1%} | "
+                      f"{pps:7.2f} Seiten/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Größe und Kodierzeit der Exportprofile (services/voice_export.py) im Vergleich.
+
+Jede Seite wird mit jedem Profil (und optional jeder Ziel-DPI) als PDF kodiert;
+ausgegeben werden Gesamtgröße, Größe und Zeit pro Seite.
+
+Aufruf (im Verzeichnis Backend):
+    python -m benchmarks.bench_export_profiles --task <task_id>
+    python -m benchmarks.bench_export_profiles --pdf "../Misc/Gescannte Noten/Not Fair.pdf" --pages 4
+    python -m benchmarks.bench_export_profiles --images seite1.png seite2.png --target-dpi 150 100
+"""
+import argparse
+import io
+import time
+
+from PIL import Image
+
+from config import POPLER_PATH, RENDER_DPI
+from services.voice_export import EXPORT_PROFILES, PdfImageWriter, list_page_files, make_export_profile
+
+
+def load_pages(args):
+    if args.task:
+        return [Image.open(path) for path in list_page_files(args.task)[:args.pages]]
+    if args.pdf:
+        from pdf2image import convert_from_path
+        return convert_from_path(args.pdf, dpi=RENDER_DPI, poppler_path=POPLER_PATH,
+                                 first_page=1, last_page=args.pages)
+    return [Image.open(path) for path in args.images[:args.pages]]
+
+
+def bench_profile(pages, profile, source_dpi=RENDER_DPI):
+    scale = min(1.0, profile["target_dpi"] / source_dpi) if profile["target_dpi"] else 1.0
+    buf = io.BytesIO()
+    t0 = time.perf_counter()
+    writer = PdfImageWriter(buf, resolution=source_dpi, jpeg_quality=profile["quality"],
+                            profile=profile["name"], scale=scale)
+    for page in pages:
+        writer.add_page(page)
+    writer.close()
+    return len(buf.getvalue()), time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--task", help="Task-ID mit gerenderten Seiten")
+    source.add_argument("--pdf", help="PDF, das mit RENDER_DPI gerastert wird")
+    source.add_argument("--images", nargs="+", help="Seitenbilder")
+    parser.add_argument("--pages", type=int, default=10, help="höchstens so viele Seiten")
+    parser.add_argument("--profiles", nargs="*", default=list(EXPORT_PROFILES))
+    parser.add_argument("--quality", type=int, default=None, help="JPEG-Qualität")
+    parser.add_argument("--target-dpi", type=int, nargs="*", default=[],
+                        help="zusätzlich mit diesen Ziel-DPI messen")
+    args = parser.parse_args()
+
+    pages = load_pages(args)
+    if not pages:
+        raise SystemExit("Keine Seiten gefunden")
+    # Einmal vollständig dekodieren, damit das Laden nicht in die Kodierzeit eingeht
+    for page in pages:
+        page.load()
+    print(f"{len(pages)} Seiten, {pages[0].size[0]}x{pages[0].size[1]} Pixel")
+
+    for name in args.profiles:
+        for target_dpi in [None] + args.target_dpi:
+            profile = make_export_profile(name, args.quality, target_dpi)
+            size, seconds = bench_profile(pages, profile)
+            dpi = f"{target_dpi} dpi" if target_dpi else "original"
+            print(f"{name:>9} | {dpi:>9} | {size / 1024:10.1f} KiB | "
+                  f"{size / len(pages) / 1024:8.1f} KiB/Seite | "
+                  f"{seconds / len(pages) * 1000:8.1f} ms/Seite")
+
+
+if __name__ == "__main__":
+    main()
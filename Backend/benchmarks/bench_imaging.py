@@ -0,0 +1,189 @@
+"""
+Speicher und Laufzeit pro Seite: bisherige Bildverarbeitung gegen die Array-Pipeline.
+
+legacy bildet den früheren Ablauf von render_pages nach (np.array und RGB->BGR->Gray
+je Deskew-Schätzung, Drehung des BGR-Bilds mit INTER_CUBIC, BGR->RGB und
+Image.fromarray). array ist der aktuelle Ablauf aus services/pipeline.py
+(prepare_page, deskew_image mit PageBuffers über alle Seiten). Beide kodieren die
+Seite anschließend als PNG in den Speicher.
+
+Pro Seite werden ausgegeben: Zeit, Anzahl und Größe neu angelegter großer Arrays
+(Ergebnisse der numpy/cv2-Aufrufe ab --min-kib, die keinen Speicher mit einem
+Argument teilen), Spitzenwert des von numpy belegten Speichers (tracemalloc) und
+PNG-Größe. Die Seiten kommen aus benchmarks/synthetic_scores.py; mit --color
+bekommt jede Seite einen farbigen Stempel und wird damit in RGB verarbeitet.
+
+Aufruf (im Verzeichnis Backend):
+    python -m benchmarks.bench_imaging
+    python -m benchmarks.bench_imaging --pages 20 --color
+"""
+import argparse
+import contextlib
+import io
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw
+from skimage.measure import label, regionprops
+
+from benchmarks.synthetic_scores import generate_page
+from services.imaging import PageBuffers
+from services.pipeline import choose_deskew_angle, deskew_image, page_image, prepare_page
+
+
+# numpy/cv2-Aufrufe, deren Ergebnisse als neue Arrays gezählt werden
+COUNTED = [
+    (np, ("array", "asarray", "empty", "column_stack", "where", "ascontiguousarray")),
+    (cv2, ("cvtColor", "threshold", "warpAffine", "findNonZero")),
+]
+
+
+class AllocationCounter:
+    def __init__(self, min_bytes):
+        self.min_bytes = min_bytes
+        self.count = 0
+        self.bytes = 0
+
+    def _record(self, result, args):
+        results = result if isinstance(result, tuple) else (result,)
+        inputs = [a for a in args if isinstance(a, np.ndarray)]
+        for array in results:
+            if not isinstance(array, np.ndarray) or array.nbytes < self.min_bytes:
+                continue
+            if any(np.shares_memory(array, a) for a in inputs):
+                continue
+            self.count += 1
+            self.bytes += array.nbytes
+
+    @contextlib.contextmanager
+    def patched(self):
+        originals = []
+        for module, names in COUNTED:
+            for name in names:
+                fn = getattr(module, name)
+                originals.append((module, name, fn))
+
+                def wrapper(*args, _fn=fn, **kwargs):
+                    result = _fn(*args, **kwargs)
+                    self._record(result, list(args) + list(kwargs.values()))
+                    return result
+                setattr(module, name, wrapper)
+        try:
+            yield self
+        finally:
+            for module, name, fn in originals:
+                setattr(module, name, fn)
+
+
+def legacy_page(img):
+    # Früherer Ablauf aus render_pages/deskew_image (ohne Debug-Ausgaben)
+    image_cv = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
+    gray = cv2.cvtColor(image_cv, cv2.COLOR_BGR2GRAY)
+    thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)[1]
+    coords = np.column_stack(np.where(thresh > 0))
+    angle_min_area = 0.0
+    if coords.shape[0]:
+        (_, (width, height), angle) = cv2.minAreaRect(coords)
+        if width < height and 80 <= angle <= 100:
+            angle = angle - 90.0
+        angle_min_area = -angle
+
+    image_cv = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
+    gray = cv2.cvtColor(image_cv, cv2.COLOR_BGR2GRAY)
+    thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)[1]
+    regions = regionprops(label(thresh))
+    angle_scikit = 0.0
+    if regions:
+        angle_scikit = -np.degrees(max(regions, key=lambda r: r.area).orientation)
+        if 70 <= abs(angle_scikit) <= 110:
+            angle_scikit += -90 if angle_scikit > 0 else 90
+
+    angle = choose_deskew_angle(angle_min_area, angle_scikit)
+    if angle != 0.0 and abs(angle) < 20:
+        img_cv = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
+        h, w = img_cv.shape[:2]
+        M = cv2.getRotationMatrix2D((w // 2, h // 2), angle, 1.0)
+        rotated = cv2.warpAffine(img_cv, M, (w, h), flags=cv2.INTER_CUBIC,
+                                 borderMode=cv2.BORDER_REPLICATE)
+        img = Image.fromarray(cv2.cvtColor(rotated, cv2.COLOR_BGR2RGB))
+    buf = io.BytesIO()
+    img.save(buf, "PNG")
+    return angle, buf.tell()
+
+
+def array_page(img, buffers):
+    page, gray, color_mode = prepare_page(img, buffers)
+    page, meta = deskew_image(page, None, "00000", buffers=buffers, gray=gray)
+    buf = io.BytesIO()
+    page_image(page, color_mode).save(buf, "PNG")
+    return meta["angle"], buf.tell()
+
+
+def add_stamp(image, seed):
+    draw = ImageDraw.Draw(image)
+    w, h = image.size
+    x, y = int(w * 0.65), int(h * 0.85) - seed % 50
+    draw.ellipse((x, y, x + w // 6, y + w // 6), outline=(200, 30, 30), width=max(2, w // 200))
+    return image
+
+
+def measure(pages, run, min_bytes):
+    rows = []
+    for img in pages:
+        counter = AllocationCounter(min_bytes)
+        tracemalloc.reset_peak()
+        start_memory = tracemalloc.get_traced_memory()[0]
+        t0 = time.perf_counter()
+        with counter.patched():
+            angle, png_bytes = run(img)
+        seconds = time.perf_counter() - t0
+        peak = tracemalloc.get_traced_memory()[1] - start_memory
+        rows.append({"seconds": seconds, "count": counter.count, "bytes": counter.bytes,
+                     "peak": peak, "angle": angle, "png": png_bytes})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--dpi", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--color", action="store_true", help="farbiger Stempel auf jeder Seite")
+    parser.add_argument("--min-kib", type=int, default=256,
+                        help="kleinere Arrays werden nicht gezählt")
+    args = parser.parse_args()
+
+    pages = []
+    for i in range(args.pages):
+        image, _ = generate_page(seed=args.seed + i, dpi=args.dpi, mode="RGB")
+        pages.append(add_stamp(image, i) if args.color else image)
+
+    tracemalloc.start()
+    buffers = PageBuffers()
+    results = {
+        "legacy": measure(pages, legacy_page, args.min_kib * 1024),
+        "array": measure(pages, lambda img: array_page(img, buffers), args.min_kib * 1024),
+    }
+    tracemalloc.stop()
+
+    page_mib = pages[0].width * pages[0].height * 3 / 2**20
+    print(f"{len(pages)} Seiten {pages[0].width}x{pages[0].height} "
+          f"({'mit Farbe' if args.color else 'farblos'}, RGB-Seite = {page_mib:.1f} MiB)")
+    print(f"{'':>8} | {'ms/Seite':>9} | {'Arrays/Seite':>12} | {'MiB neu/Seite':>13} | "
+          f"{'Spitze MiB':>10} | {'PNG KiB':>8}")
+    for name, rows in results.items():
+        n = len(rows)
+        print(f"{name:>8} | {sum(r['seconds'] for r in rows) / n * 1000:9.1f} | "
+              f"{sum(r['count'] for r in rows) / n:12.1f} | "
+              f"{sum(r['bytes'] for r in rows) / n / 2**20:13.1f} | "
+              f"{max(r['peak'] for r in rows) / 2**20:10.1f} | "
+              f"{sum(r['png'] for r in rows) / n / 1024:8.0f}")
+    diffs = [abs(a["angle"] - b["angle"]) for a, b in zip(results["legacy"], results["array"])]
+    print(f"\nAbweichung der angewendeten Winkel: max {max(diffs):.4f}°")
+
+
+if __name__ == "__main__":
+    main()
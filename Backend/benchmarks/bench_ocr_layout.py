@@ -0,0 +1,183 @@
+"""
+Benchmark der Wortgruppierung (services/ocr_layout.py) gegen die frühere
+Python-Schleife aus get_ocr_boxes.
+
+Aufruf (im Verzeichnis Backend):
+    python -m benchmarks.bench_ocr_layout
+    python -m benchmarks.bench_ocr_layout --words 20000 --repeat 5 --page-width 20000
+    python -m benchmarks.bench_ocr_layout --task <task_id>   # vorberechnete Kopfzeilen-OCR eines Tasks
+"""
+import argparse
+import os
+import random
+import time
+
+from config import HEADER_CUTOFF_RATIO
+from services.header_ocr import load_page_words
+from services.ocr_layout import group_words, group_pages
+from services.storage import task_dir
+
+
+def legacy_group_words(data, cutoff_y, min_confidence=70):
+    # Unveränderte Logik der ursprünglichen Schleife aus get_ocr_boxes (Referenz)
+    boxes = []
+    n_boxes = len(data["text"])
+    groups = {}
+    for i in range(n_boxes):
+        conf = data["conf"][i]
+        try:
+            conf = int(conf)
+        except:
+            conf = -1
+        y = data["top"][i]
+        if y > cutoff_y or conf < min_confidence:
+            continue
+        if not data["text"][i].strip():
+            continue
+        key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        groups.setdefault(key, []).append(i)
+
+    for key, indices in groups.items():
+        sorted_indices = sorted(indices, key=lambda i: data["left"][i])
+        subgroups = []
+        current_group = []
+        distance_threshold = 40
+        for idx in sorted_indices:
+            if not current_group:
+                current_group.append(idx)
+            else:
+                prev = current_group[-1]
+                gap = data["left"][idx] - \
+                    (data["left"][prev] + data["width"][prev])
+                avg_word_width = sum(
+                    data["width"][j] for j in sorted_indices) / len(sorted_indices)
+                dynamic_threshold = max(
+                    distance_threshold, 1.5 * avg_word_width)
+                ref_h = data["height"][current_group[0]]
+                height_diff = abs(data["height"][idx] - ref_h)
+                if gap > dynamic_threshold or (height_diff / ref_h > 0.3):
+                    subgroups.append(current_group)
+                    current_group = [idx]
+                else:
+                    current_group.append(idx)
+        if current_group:
+            subgroups.append(current_group)
+        for subgroup in subgroups:
+            words = [data["text"][i].strip()
+                     for i in subgroup if data["text"][i].strip()]
+            if not words:
+                continue
+            lefts = [data["left"][i] for i in subgroup]
+            tops = [data["top"][i] for i in subgroup]
+            rights = [data["left"][i] + data["width"][i] for i in subgroup]
+            bottoms = [data["top"][i] + data["height"][i] for i in subgroup]
+            boxes.append({
+                "x": min(lefts),
+                "y": min(tops),
+                "width": max(rights) - min(lefts),
+                "height": max(bottoms) - min(tops),
+                "text": " ".join(words),
+                "selected": False
+            })
+    return boxes
+
+
+def synthetic_page(num_words, seed=0, page_width=2480):
+    # Dichte Seite im Format von image_to_data: viele lange Zeilen,
+    # gemischte Wortabstände/-höhen, Rauschen mit niedriger Konfidenz.
+    rng = random.Random(seed)
+    data = {col: [] for col in ("block_num", "par_num", "line_num", "word_num",
+                                "left", "top", "width", "height", "conf", "text")}
+    block, line, word = 1, 1, 1
+    x, y = 50, 40
+    line_height = 40
+    for _ in range(num_words):
+        w = rng.randint(20, 160)
+        if x + w > page_width - 50:
+            line += 1
+            word = 1
+            x = 50
+            y += line_height + rng.randint(5, 20)
+            line_height = rng.choice((28, 40, 64))
+            if line % 25 == 0:
+                block += 1
+                line = 1
+        h = line_height if rng.random() > 0.1 else int(line_height * rng.uniform(0.5, 1.8))
+        data["block_num"].append(block)
+        data["par_num"].append(1)
+        data["line_num"].append(line)
+        data["word_num"].append(word)
+        data["left"].append(x)
+        data["top"].append(y)
+        data["width"].append(w)
+        data["height"].append(max(1, h))
+        data["conf"].append(round(rng.uniform(40, 99), 2) if rng.random() > 0.05 else -1)
+        data["text"].append(rng.choice(("Flöte", "1.", "Klarinette", "in", "B", "Marsch", "Arr.", "", "Ewig", "Schad")))
+        x += w + (rng.randint(8, 30) if rng.random() > 0.15 else rng.randint(60, 400))
+        word += 1
+    return data
+
+
+def _timeit(fn, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def bench_synthetic(num_words, repeat, page_width):
+    data = synthetic_page(num_words, page_width=page_width)
+    cutoff_y = float("inf")
+    t_legacy, legacy = _timeit(lambda: legacy_group_words(data, cutoff_y), repeat)
+    t_vec, vec = _timeit(lambda: group_words(data, cutoff_y=cutoff_y), repeat)
+    same = legacy == vec
+    print(f"{num_words:>7} Wörter | {len(vec):>6} Boxen | "
+          f"Schleife {t_legacy * 1000:9.2f} ms | NumPy {t_vec * 1000:8.2f} ms | "
+          f"Faktor {t_legacy / t_vec:6.1f}x | identisch: {same}")
+    return same
+
+
+def bench_task(task_id, repeat):
+    pages_dir = os.path.join(task_dir(task_id), "ocr")
+    if not os.path.isdir(pages_dir):
+        print(f"Keine vorberechnete Kopfzeilen-OCR für Task {task_id}")
+        return True
+    pages = []
+    page = 1
+    while True:
+        result = load_page_words(task_id, page)
+        if result is None:
+            break
+        pages.append((page, result))
+        page += 1
+    t_vec, grouped = _timeit(
+        lambda: group_pages(pages, cutoff_ratio=HEADER_CUTOFF_RATIO), repeat)
+    num_boxes = sum(len(b) for b in grouped.values())
+    print(f"Task {task_id}: {len(pages)} Seiten, {num_boxes} Boxen in {t_vec * 1000:.2f} ms")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--words", type=int, nargs="*",
+                        default=[500, 2000, 10000, 50000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--page-width", type=int, default=2480,
+                        help="Seitenbreite in Pixel, größere Werte ergeben längere Zeilen")
+    parser.add_argument("--task", help="Task-ID mit vorberechneter Kopfzeilen-OCR")
+    args = parser.parse_args()
+
+    if args.task:
+        bench_task(args.task, args.repeat)
+        return
+    ok = all([bench_synthetic(n, args.repeat, args.page_width) for n in args.words])
+    if not ok:
+        raise SystemExit("Ergebnisse weichen von der Referenzimplementierung ab")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""
+Benchmark der rechenintensiven Stufen mit den Beispiel-PDFs aus Misc/Gescannte Noten.
+
+Jede Stufe wird einzeln gemessen (beste von --repeat Wiederholungen) und mit
+Seiten pro Sekunde sowie dem Spitzenwert des Python-Speichers (tracemalloc, in
+einem zusätzlichen Durchlauf) ausgegeben:
+
+    rasterize              convert_from_path mit RENDER_DPI (benötigt Poppler)
+    deskew_min_area_rect   Schräglage über minAreaRect
+    deskew_scikit          Schräglage über regionprops
+    header_ocr             Tesseract auf dem Kopfzeilen-Band (benötigt Tesseract)
+    group_words            Wortgruppierung aus get_ocr_boxes
+    detect_voices          Stimmenerkennung über vorberechnete Kopfzeilen-OCR
+    write_pdf              Stimmen-PDF aus den Seitenbildern (split_voices)
+
+Ohne Poppler werden die Seiten aus den eingebetteten Scans der PDFs gelesen, ohne
+Tesseract nutzen group_words/detect_voices synthetische Wortdaten. Fehlende Werkzeuge
+werden als übersprungen ausgewiesen.
+
+Mit --save-baseline werden die Ergebnisse als Baseline gespeichert; spätere Läufe
+vergleichen dagegen und enden mit Exit-Code 1, wenn eine Stufe um mehr als
+--tolerance langsamer wird oder mehr Speicher braucht.
+
+Aufruf (im Verzeichnis Backend):
+    python -m benchmarks.bench_pipeline --save-baseline
+    python -m benchmarks.bench_pipeline --tolerance 0.15
+    python -m benchmarks.bench_pipeline --stages deskew_min_area_rect deskew_scikit --max-pages 4
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import shutil
+import time
+import tracemalloc
+import uuid
+
+from pypdf import PdfReader
+
+from config import POPLER_PATH, RENDER_DPI, HEADER_CUTOFF_RATIO
+from benchmarks.bench_ocr_layout import synthetic_page
+from services.deskew import deskew_min_area_rect, deskew_scikit_orientation
+from services.header_ocr import ocr_header_band, save_page_words
+from services.ocr_layout import group_words
+from services.voice_detection import detect_voice_starts
+from services.storage import task_dir
+from services.voice_export import write_voice_pdf
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "Misc", "Gescannte Noten")
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+# Sehr kurze Stufen schwanken stark; Abweichungen darunter gelten nicht als Regression
+MIN_REGRESSION_SECONDS = 0.005
+STAGES = ("rasterize", "deskew_min_area_rect", "deskew_scikit", "header_ocr",
+          "group_words", "detect_voices", "write_pdf")
+
+
+class Skipped(Exception):
+    pass
+
+
+def find_fixtures():
+    return sorted(os.path.join(FIXTURES_DIR, f) for f in os.listdir(FIXTURES_DIR)
+                  if f.lower().endswith(".pdf"))
+
+
+def rasterize(pdfs, max_pages):
+    try:
+        from pdf2image import convert_from_path
+        from pdf2image.exceptions import PDFInfoNotInstalledError
+    except ImportError:
+        raise Skipped("pdf2image nicht installiert")
+    pages = []
+    try:
+        for pdf in pdfs:
+            pages.extend(convert_from_path(pdf, dpi=RENDER_DPI, poppler_path=POPLER_PATH,
+                                           last_page=max_pages - len(pages)))
+            if len(pages) >= max_pages:
+                break
+    except PDFInfoNotInstalledError:
+        raise Skipped("Poppler nicht gefunden")
+    return pages
+
+
+def embedded_pages(pdfs, max_pages):
+    # Ersatz ohne Poppler: Scans liegen als ein Bild pro Seite im PDF
+    pages = []
+    for pdf in pdfs:
+        for page in PdfReader(pdf).pages:
+            if page.images:
+                pages.append(page.images[0].image.convert("RGB"))
+            if len(pages) >= max_pages:
+                return pages
+    return pages
+
+
+def tesseract_available():
+    try:
+        import pytesseract
+        pytesseract.get_tesseract_version()
+        return True
+    except Exception:
+        return False
+
+
+def synthetic_words(page):
+    width, height = page.size
+    band_height = int(height * 0.3)
+    data = synthetic_page(60, page_width=width)
+    return {"width": width, "height": height, "band_height": band_height, "words": data}
+
+
+def measure(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def run_suite(pdfs, max_pages, repeat, stages):
+    results = {}
+    notes = []
+
+    def record(name, fn, num_pages):
+        if name not in stages:
+            return
+        try:
+            seconds, peak = measure(fn, repeat)
+        except Skipped as e:
+            results[name] = {"skipped": str(e)}
+            return
+        results[name] = {"seconds": round(seconds, 4), "pages": num_pages,
+                         "pages_per_second": round(num_pages / seconds, 2) if seconds else None,
+                         "peak_mb": round(peak / 2**20, 2)}
+
+    try:
+        pages = rasterize(pdfs, max_pages)
+        record("rasterize", lambda: rasterize(pdfs, max_pages), len(pages))
+    except Skipped as e:
+        results["rasterize"] = {"skipped": str(e)}
+        pages = embedded_pages(pdfs, max_pages)
+        notes.append(f"Seiten aus eingebetteten Scans gelesen ({e})")
+    if not pages:
+        raise SystemExit("Keine Seiten in den Fixtures gefunden")
+
+    record("deskew_min_area_rect",
+           lambda: [deskew_min_area_rect(p, None, "00000") for p in pages], len(pages))
+    record("deskew_scikit",
+           lambda: [deskew_scikit_orientation(p, None, "00000") for p in pages], len(pages))
+
+    if tesseract_available():
+        words = [ocr_header_band(p) for p in pages]
+        record("header_ocr", lambda: [ocr_header_band(p) for p in pages], len(pages))
+    else:
+        results["header_ocr"] = {"skipped": "Tesseract nicht gefunden"}
+        words = [synthetic_words(p) for p in pages]
+        notes.append("group_words/detect_voices mit synthetischen Wortdaten")
+
+    record("group_words",
+           lambda: [group_words(w["words"], cutoff_y=HEADER_CUTOFF_RATIO * w["height"])
+                    for w in words], len(pages))
+
+    # Temporärer Task für die Stufen, die mit Seiten auf der Platte arbeiten
+    task_id = f"_bench_{uuid.uuid4().hex[:8]}"
+    pages_dir = os.path.join(task_dir(task_id), "pages")
+    os.makedirs(pages_dir)
+    try:
+        page_paths = []
+        for i, (page, result) in enumerate(zip(pages, words), start=1):
+            path = os.path.join(pages_dir, f"{task_id}_page_{i:05d}.png")
+            page.save(path)
+            page_paths.append(path)
+            save_page_words(task_id, i, result)
+        title_box = {"x": 0, "y": 0, "width": 400, "height": 60}
+        voice_box = {"x": 0, "y": 80, "width": 200, "height": 40}
+        record("detect_voices",
+               lambda: detect_voice_starts(task_id, title_box, voice_box), len(pages))
+        record("write_pdf",
+               lambda: write_voice_pdf(page_paths, io.BytesIO()), len(pages))
+    finally:
+        shutil.rmtree(task_dir(task_id), ignore_errors=True)
+
+    return {"pages": len(pages), "repeat": repeat, "machine": platform.platform(),
+            "python": platform.python_version(), "stages": results, "notes": notes}
+
+
+def compare(current, baseline, tolerance):
+    regressions = []
+    for name, cur in current["stages"].items():
+        base = baseline.get("stages", {}).get(name)
+        if not base or "seconds" not in cur or "seconds" not in base:
+            continue
+        # Zeit pro Seite vergleichen, falls sich die Seitenzahl geändert hat
+        cur_t = cur["seconds"] / cur["pages"]
+        base_t = base["seconds"] / base["pages"]
+        cur["change"] = round(cur_t / base_t - 1, 3) if base_t else None
+        if base_t and cur_t > base_t * (1 + tolerance) \
+                and cur["seconds"] - base["seconds"] > MIN_REGRESSION_SECONDS:
+            regressions.append(f"{name}: {cur['change']:+.0%} Zeit pro Seite")
+        if base["peak_mb"] and cur["peak_mb"] > base["peak_mb"] * (1 + tolerance) + 1:
+            regressions.append(f"{name}: Speicher {base['peak_mb']} -> {cur['peak_mb']} MiB")
+    return regressions
+
+
+def print_results(result):
+    print(f"{result['pages']} Seiten, beste von {result['repeat']} Läufen")
+    for note in result["notes"]:
+        print(f"  Hinweis: {note}")
+    for name in STAGES:
+        stage = result["stages"].get(name)
+        if stage is None:
+            continue
+        if "skipped" in stage:
+            print(f"{name:>21} | übersprungen: {stage['skipped']}")
+            continue
+        change = f" | {stage['change']:+7.1%} ggü. Baseline" if stage.get("change") is not None else ""
+        print(f"{name:>21} | {stage['seconds'] * 1000:9.1f} ms | "
+              f"{stage['pages_per_second']:8.2f} Seiten/s | {stage['peak_mb']:8.2f} MiB{change}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdfs", nargs="*", help="PDFs statt der Fixtures aus Misc/Gescannte Noten")
+    parser.add_argument("--max-pages", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--stages", nargs="*", default=list(STAGES), choices=STAGES)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="erlaubte Verschlechterung, 0.2 = 20 %%")
+    args = parser.parse_args()
+
+    result = run_suite(args.pdfs or find_fixtures(), args.max_pages, args.repeat, set(args.stages))
+    regressions = []
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+    print_results(result)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"Baseline gespeichert: {args.baseline}")
+    elif regressions:
+        print("\nRegressionen:")
+        for line in regressions:
+            print(f"  {line}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Importzeit und Speicher beim Start der API.
+
+Importiert das Modul (Standard: main, also die App samt aller Router) in einem
+frischen Interpreter mit -X importtime und meldet Startzeit, Speicher (maxrss)
+und die teuersten Pakete nach eigener Importzeit. Der Lauf endet mit Exit-Code 1,
+wenn die beste von --repeat Startzeiten über --budget liegt oder eines der
+schweren Bild-/OCR-Pakete (services/startup.py, HEAVY_MODULES) schon beim Start
+geladen wird.
+
+Aufruf (im Verzeichnis Backend):
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --budget 1.5 --top 15
+    python -m benchmarks.bench_startup --module api.v1.pdf_tasks
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from config import STARTUP_BUDGET_SECONDS
+from services.startup import HEAVY_MODULES
+
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), "..")
+CHILD = """
+import json, sys, time
+t0 = time.perf_counter()
+import importlib
+importlib.import_module(sys.argv[1])
+seconds = time.perf_counter() - t0
+try:
+    import resource
+    maxrss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+except ImportError:
+    maxrss_mb = None
+print(json.dumps({"seconds": seconds, "maxrss_mb": maxrss_mb,
+                  "modules": sorted({m.split(".")[0] for m in sys.modules})}))
+"""
+
+
+def parse_importtime(stderr):
+    # "import time: self [us] | cumulative | imported package" -> eigene Zeit je Top-Level-Paket
+    per_package = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, _, name = line[len("import time:"):].split("|")
+            package = name.strip().split(".")[0]
+            per_package[package] = per_package.get(package, 0) + int(self_us)
+        except ValueError:
+            continue
+    return per_package
+
+
+def measure_startup(module):
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", CHILD, module],
+                          cwd=BACKEND_DIR, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise SystemExit(f"Import von {module} fehlgeschlagen:\n{proc.stderr[-2000:]}")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["packages"] = parse_importtime(proc.stderr)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--budget", type=float, default=STARTUP_BUDGET_SECONDS,
+                        help="maximale Startzeit in Sekunden")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    runs = [measure_startup(args.module) for _ in range(max(1, args.repeat))]
+    best = min(runs, key=lambda r: r["seconds"])
+    heavy = [name for name in HEAVY_MODULES if name in best["modules"]]
+
+    memory = f", {best['maxrss_mb']:.1f} MiB" if best["maxrss_mb"] is not None else ""
+    print(f"import {args.module}: {best['seconds']:.3f} s (beste von {len(runs)}){memory}")
+    print("\nTeuerste Pakete (eigene Importzeit):")
+    ranked = sorted(best["packages"].items(), key=lambda item: item[1], reverse=True)
+    for package, micros in ranked[:args.top]:
+        print(f"{package:>24} | {micros / 1000:8.1f} ms")
+
+    failures = []
+    if heavy:
+        failures.append(f"beim Start geladen: {', '.join(heavy)}")
+    if best["seconds"] > args.budget:
+        failures.append(f"Startzeit {best['seconds']:.3f} s über dem Budget von {args.budget:.2f} s")
+    if failures:
+        print("\nBudget verletzt:")
+        for line in failures:
+            print(f"  {line}")
+        raise SystemExit(1)
+    print(f"\nInnerhalb des Budgets von {args.budget:.2f} s, keine schweren Pakete geladen")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Synthetische Notenseiten mit bekannter Schräglage für Deskew-Benchmarks.
+
+Eine Seite besteht aus Kopfzeile (Stimme links, Titel mittig, Komponist rechts),
+Notensystemen mit je fünf Linien, Taktstrichen, Notenköpfen mit Hälsen und
+optional Rauschen. Die Seite wird wie beim Scannen um einen bekannten Winkel
+gedreht (weißer Rand, gleiche Bildgröße).
+
+generate_page liefert das Bild und die Wahrheit, u. a. "correction": den Winkel,
+den die Pipeline (services/pipeline.py, cv2.getRotationMatrix2D) anwenden muss,
+um die Seite wieder gerade zu stellen.
+
+Als Skript werden Seiten samt truth.json in ein Verzeichnis geschrieben:
+    python -m benchmarks.synthetic_scores --out /tmp/scores --pages 1000 --max-angle 5
+"""
+import argparse
+import json
+import os
+import random
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+
+A4_INCHES = (8.27, 11.69)
+HEADER_WORDS = {
+    "voice": ("1. Flöte", "2. Klarinette in B", "Tenorhorn", "Tuba", "3. Trompete in B", "Schlagzeug"),
+    "title": ("Ewig Schad", "Not Fair", "Marsch", "Böhmischer Traum", "Polka"),
+    "composer": ("Arr. M. Huber", "K. Müller", "Trad.", "P. Meier"),
+}
+
+
+def _font(size):
+    try:
+        return ImageFont.truetype("DejaVuSans.ttf", size)
+    except OSError:
+        return ImageFont.load_default()
+
+
+def draw_score(width, height, rng, margin=0.08, staves=10):
+    image = Image.new("L", (width, height), 255)
+    draw = ImageDraw.Draw(image)
+    scale = width / 1654  # Strichstärken relativ zu A4 bei 200 dpi
+    left = int(width * margin)
+    right = width - left
+    top = int(height * margin)
+
+    header_size = max(10, int(48 * scale))
+    draw.text((left, top), rng.choice(HEADER_WORDS["voice"]), fill=0, font=_font(int(header_size * 0.6)))
+    title = rng.choice(HEADER_WORDS["title"])
+    title_font = _font(header_size)
+    title_w = draw.textlength(title, font=title_font)
+    draw.text(((width - title_w) / 2, top), title, fill=0, font=title_font)
+    composer = rng.choice(HEADER_WORDS["composer"])
+    composer_font = _font(int(header_size * 0.5))
+    draw.text((right - draw.textlength(composer, font=composer_font), top + header_size),
+              composer, fill=0, font=composer_font)
+
+    line_gap = max(3, int(14 * scale))
+    line_w = max(1, int(2 * scale))
+    first = top + int(header_size * 2.5)
+    bottom = height - int(height * margin)
+    system_gap = (bottom - first) / staves
+    for s in range(staves):
+        y0 = int(first + s * system_gap)
+        if y0 + 4 * line_gap > bottom:
+            break
+        for k in range(5):
+            y = y0 + k * line_gap
+            draw.line((left, y, right, y), fill=0, width=line_w)
+        # Taktstriche
+        bars = rng.randint(3, 6)
+        for b in range(bars + 1):
+            x = left + (right - left) * b // bars
+            draw.line((x, y0, x, y0 + 4 * line_gap), fill=0, width=line_w)
+        # Notenköpfe mit Hals
+        x = left + int(40 * scale)
+        while x < right - int(30 * scale):
+            pos = rng.randint(-2, 10)
+            cy = y0 + pos * line_gap // 2
+            rx, ry = int(line_gap * 0.65), int(line_gap * 0.45)
+            draw.ellipse((x - rx, cy - ry, x + rx, cy + ry), fill=0)
+            stem = 3.5 * line_gap
+            if pos > 4:
+                draw.line((x + rx - 1, cy, x + rx - 1, cy - stem), fill=0, width=line_w)
+            else:
+                draw.line((x - rx, cy, x - rx, cy + stem), fill=0, width=line_w)
+            x += int(rng.uniform(18, 60) * scale)
+    return image
+
+
+def add_noise(image, rng, noise):
+    if noise <= 0:
+        return image
+    arr = np.asarray(image, dtype=np.int16)
+    nrng = np.random.default_rng(rng.randint(0, 2**31))
+    arr = arr + nrng.normal(0, 25 * noise, arr.shape).astype(np.int16)
+    # Staub/Punkte wie beim Scannen
+    specks = nrng.random(arr.shape) < 0.0015 * noise
+    arr[specks] = 0
+    return Image.fromarray(np.clip(arr, 0, 255).astype(np.uint8), "L")
+
+
+def generate_page(seed=0, dpi=200, angle=None, max_angle=5.0, noise=0.5, margin=None, mode="RGB"):
+    """Erzeugt eine Seite; angle=None wählt einen zufälligen Winkel in [-max_angle, max_angle]."""
+    rng = random.Random(seed)
+    width = int(A4_INCHES[0] * dpi)
+    height = int(A4_INCHES[1] * dpi)
+    if angle is None:
+        angle = rng.uniform(-max_angle, max_angle)
+    if margin is None:
+        margin = rng.uniform(0.05, 0.12)
+    image = draw_score(width, height, rng, margin=margin)
+    # PIL dreht gegen den Uhrzeigersinn; zum Geraderichten muss die Pipeline -angle anwenden
+    image = image.rotate(angle, resample=Image.BICUBIC, expand=False, fillcolor=255)
+    image = add_noise(image, rng, noise)
+    if mode != "L":
+        image = image.convert(mode)
+    truth = {"seed": seed, "dpi": dpi, "angle": angle, "correction": -angle,
+             "noise": noise, "margin": margin, "size": [width, height]}
+    return image, truth
+
+
+def generate_pages(count, seed=0, **kwargs):
+    for i in range(count):
+        yield generate_page(seed=seed + i, **kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dpi", type=int, default=200)
+    parser.add_argument("--max-angle", type=float, default=5.0)
+    parser.add_argument("--noise", type=float, default=0.5)
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    truth = []
+    for image, t in generate_pages(args.pages, seed=args.seed, dpi=args.dpi,
+                                   max_angle=args.max_angle, noise=args.noise, mode="L"):
+        name = f"page_{t['seed']:06d}.png"
+        image.save(os.path.join(args.out, name))
+        truth.append(dict(t, file=name))
+    with open(os.path.join(args.out, "truth.json"), "w", encoding="utf-8") as f:
+        json.dump(truth, f, indent=2)
+    print(f"{len(truth)} Seiten in {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""
+Stapelverarbeitung von Noten-PDFs ohne API und Datenbank.
+
+Verarbeitet alle PDFs eines Verzeichnisses (rekursiv) mit denselben Stufen wie das
+Backend: Rastern und Schräglagenkorrektur, Kopfzeilen-OCR, Stimmenerkennung und
+Export (ein PDF pro Stimme mit NotenIndex.xml oder ein ZIP). Die PDFs werden
+parallel in mehreren Prozessen bearbeitet.
+
+Jedes PDF erhält unter <ausgabe>/<id>/ dieselbe Struktur wie ein Task unter
+static/. Abgeschlossene Stufen werden in cli_state.json vermerkt; ein erneuter
+Aufruf setzt dort fort und überspringt unveränderte PDFs. Am Ende wird eine
+Zusammenfassung ausgegeben und als <ausgabe>/report.json gespeichert.
+
+Aufruf (im Verzeichnis Backend):
+    python cli.py "../Misc/Gescannte Noten" --output ../archiv
+    python cli.py scans/ --output out/ --workers 4 --zip --profile bilevel
+    python cli.py scans/ --output out/ --voice-box 40,60,300,50 --title-box 600,40,900,90
+"""
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+
+STAGES = ("render", "header_ocr", "voices", "export")
+STATE_NAME = "cli_state.json"
+
+
+def parse_box(value):
+    try:
+        x, y, width, height = (int(v) for v in value.split(","))
+    except ValueError:
+        raise argparse.ArgumentTypeError("Box als x,y,breite,höhe angeben")
+    return {"x": x, "y": y, "width": width, "height": height}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="Verzeichnis mit PDFs (oder ein einzelnes PDF)")
+    parser.add_argument("--output", required=True, help="Ausgabeverzeichnis")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Anzahl paralleler Prozesse (Standard: Anzahl CPU-Kerne)")
+    parser.add_argument("--title-box", type=parse_box,
+                        help="Titelbereich x,y,breite,höhe (Standard: aus Seite 1 ermittelt)")
+    parser.add_argument("--voice-box", type=parse_box,
+                        help="Stimmenbereich x,y,breite,höhe (Standard: aus Seite 1 ermittelt)")
+    parser.add_argument("--export-mode", default="auto", choices=("auto", "raster"))
+    parser.add_argument("--profile", default="color",
+                        choices=("color", "gray", "bilevel", "lossless"))
+    parser.add_argument("--jpeg-quality", type=int)
+    parser.add_argument("--target-dpi", type=int)
+    parser.add_argument("--zip", action="store_true",
+                        help="Stimmen als ZIP statt als einzelne PDFs ablegen")
+    parser.add_argument("--force", action="store_true",
+                        help="alle Stufen neu ausführen")
+    return parser.parse_args(argv)
+
+
+def find_pdfs(path):
+    if os.path.isfile(path):
+        return [path]
+    pdfs = []
+    for root, _, files in os.walk(path):
+        pdfs.extend(os.path.join(root, f) for f in files if f.lower().endswith(".pdf"))
+    return sorted(pdfs)
+
+
+def get_job_id(pdf_path, input_root):
+    # Lesbar und eindeutig: Dateiname plus Hash des relativen Pfads
+    rel = os.path.relpath(pdf_path, input_root) if os.path.isdir(input_root) \
+        else os.path.basename(pdf_path)
+    stem = re.sub(r"[^A-Za-z0-9_-]+", "_", os.path.splitext(os.path.basename(pdf_path))[0]).strip("_")
+    digest = hashlib.sha1(rel.encode("utf-8")).hexdigest()[:8]
+    return f"{stem or 'pdf'}_{digest}"
+
+
+def _source_info(pdf_path):
+    st = os.stat(pdf_path)
+    return {"path": os.path.abspath(pdf_path), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _load_state(task_dir):
+    try:
+        with open(os.path.join(task_dir, STATE_NAME), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _save_state(task_dir, state):
+    path = os.path.join(task_dir, STATE_NAME)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def process_pdf(pdf_path, task_id, options):
+    """Führt die noch offenen Stufen für ein PDF aus und liefert dessen Zusammenfassung."""
+    # Erst im Arbeitsprozess importieren: STATIC_DIR/EXPORT_WORKERS sind dann gesetzt
+    from services.header_ocr import precompute_header_ocr
+    from services.page_meta import load_page_meta, failed_pages
+    from services.pipeline import render_pages
+    from services.storage import task_dir as get_task_dir
+    from services.voice_detection import detect_voice_starts, suggest_header_boxes
+    from services.voice_export import (
+        list_page_files, parse_voice_starts, compute_voice_ranges, export_voices,
+        build_noten_index_xml, stream_voices_zip, get_zip_filename, make_export_profile,
+    )
+
+    task_dir = get_task_dir(task_id)
+    pages_dir = os.path.join(task_dir, "pages")
+    source = _source_info(pdf_path)
+    state = None if options["force"] else _load_state(task_dir)
+    if state is None or state.get("source") != source or state.get("options") != options["export"]:
+        # Neues oder geändertes PDF bzw. andere Exportoptionen: von vorn beginnen
+        shutil.rmtree(task_dir, ignore_errors=True)
+        state = {"source": source, "options": options["export"], "stages": {}}
+    os.makedirs(pages_dir, exist_ok=True)
+    stages = state["stages"]
+    summary = {"file": pdf_path, "id": task_id, "status": "done", "skipped": [], "seconds": {}}
+
+    def run_stage(name, fn):
+        if name in stages:
+            summary["skipped"].append(name)
+            return stages[name]
+        t0 = time.perf_counter()
+        result = fn()
+        summary["seconds"][name] = round(time.perf_counter() - t0, 3)
+        stages[name] = result
+        _save_state(task_dir, state)
+        return result
+
+    try:
+        def render():
+            original_path = os.path.join(task_dir, "original.pdf")
+            shutil.copyfile(pdf_path, original_path)
+            return {"num_pages": render_pages(task_id, original_path, pages_dir)}
+        num_pages = run_stage("render", render)["num_pages"]
+
+        def header_ocr():
+            precompute_header_ocr(task_id, pages_dir, num_pages)
+            return {}
+        run_stage("header_ocr", header_ocr)
+
+        def voices():
+            title_box, voice_box = options["title_box"], options["voice_box"]
+            if title_box is None or voice_box is None:
+                suggested_title, suggested_voice = suggest_header_boxes(task_id)
+                title_box = title_box or suggested_title
+                voice_box = voice_box or suggested_voice
+            if title_box is None or voice_box is None:
+                raise RuntimeError("Keine Kopfzeile erkannt, --title-box/--voice-box angeben")
+            return {"title_box": title_box, "voice_box": voice_box,
+                    "voices": detect_voice_starts(task_id, title_box, voice_box)}
+        detected = run_stage("voices", voices)["voices"]
+
+        def export():
+            page_files = list_page_files(task_id)
+            voices_ranges = compute_voice_ranges(parse_voice_starts(detected), len(page_files))
+            if not voices_ranges:
+                return {"files": []}
+            titles = [v["title"] for v in detected if v.get("title")]
+            title = titles[0] if titles else os.path.splitext(os.path.basename(pdf_path))[0]
+            export_opts = options["export"]
+            profile = make_export_profile(export_opts["profile"], export_opts["jpeg_quality"],
+                                          export_opts["target_dpi"])
+            export_dir = os.path.join(task_dir, "export")
+            shutil.rmtree(export_dir, ignore_errors=True)
+            os.makedirs(export_dir)
+            if export_opts["zip"]:
+                zip_name = get_zip_filename(title)
+                with open(os.path.join(export_dir, zip_name), "wb") as f:
+                    for chunk in stream_voices_zip(task_id, page_files, voices_ranges, title,
+                                                   "", "", "", export_opts["export_mode"],
+                                                   profile=profile):
+                        f.write(chunk)
+                return {"title": title, "files": [zip_name]}
+            timings = export_voices(task_id, page_files, voices_ranges, title, export_dir,
+                                    export_opts["export_mode"], profile=profile)
+            with open(os.path.join(export_dir, "NotenIndex.xml"), "w", encoding="utf-8") as f:
+                f.write(build_noten_index_xml(title, "", "", "", voices_ranges))
+            return {"title": title, "files": [t["filename"] for t in timings] + ["NotenIndex.xml"]}
+        exported = run_stage("export", export)
+
+        summary["pages"] = num_pages
+        summary["failed_pages"] = failed_pages(load_page_meta(task_id))
+        summary["voices"] = len(detected)
+        summary["files"] = exported["files"]
+        if not detected:
+            summary["status"] = "no_voices"
+    except Exception as e:
+        summary["status"] = "error"
+        summary["error"] = f"{type(e).__name__}: {e}"
+    return summary
+
+
+def print_report(results, seconds):
+    width = max([len(os.path.basename(r["file"])) for r in results] + [5])
+    for r in results:
+        detail = r.get("error") or f"{r.get('pages', 0)} Seiten, {r.get('voices', 0)} Stimmen"
+        if r.get("failed_pages"):
+            detail += f", nicht gerastert: {', '.join(map(str, r['failed_pages']))}"
+        took = sum(r["seconds"].values())
+        print(f"{os.path.basename(r['file']):<{width}}  {r['status']:<9}  {took:8.1f} s  {detail}")
+    counts = {}
+    for r in results:
+        counts[r["status"]] = counts.get(r["status"], 0) + 1
+    pages = sum(r.get("pages", 0) for r in results)
+    print(f"\n{len(results)} PDFs, {pages} Seiten in {seconds:.1f} s  "
+          + ", ".join(f"{k}: {v}" for k, v in sorted(counts.items())))
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    output = os.path.abspath(args.output)
+    os.makedirs(output, exist_ok=True)
+    # Vor dem Import von config: Ausgabe als STATIC_DIR, Parallelität über die PDFs statt pro Export
+    os.environ["STATIC_DIR"] = output
+    os.environ["EXPORT_WORKERS"] = "1"
+    # Ergebnisse bleiben lokal und flach unter output/<id>/
+    os.environ["STORAGE_BACKEND"] = "local"
+    os.environ["STORAGE_LAYOUT"] = "flat"
+
+    pdfs = find_pdfs(args.input)
+    if not pdfs:
+        raise SystemExit(f"Keine PDFs gefunden: {args.input}")
+    options = {
+        "force": args.force,
+        "title_box": args.title_box,
+        "voice_box": args.voice_box,
+        "export": {
+            "export_mode": args.export_mode,
+            "profile": args.profile,
+            "jpeg_quality": args.jpeg_quality,
+            "target_dpi": args.target_dpi,
+            "zip": args.zip,
+        },
+    }
+
+    t0 = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        futures = {pool.submit(process_pdf, pdf, get_job_id(pdf, args.input), options): pdf
+                   for pdf in pdfs}
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            print(f"[{len(results)}/{len(pdfs)}] {result['status']:<9} {result['file']}",
+                  flush=True)
+    seconds = time.perf_counter() - t0
+
+    results.sort(key=lambda r: r["file"])
+    print()
+    print_report(results, seconds)
+    with open(os.path.join(output, "report.json"), "w", encoding="utf-8") as f:
+        json.dump({"finished_at": datetime.datetime.now().isoformat(),
+                   "seconds": round(seconds, 3), "results": results},
+                  f, ensure_ascii=False, indent=2)
+    return 1 if any(r["status"] == "error" for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -15,11 +15,75 @@ Hinweis: Generische Settings (DB, JWT, CORS/Frontend) kommen zentral aus SC_Base
 über get_settings() und werden nicht mehr hier dupliziert.
 """
 
+
+def _env_flag(name, default="false"):
+    return os.getenv(name, default).strip().lower() in ("1", "true", "yes", "ja")
+
+
 STATIC_DIR = os.getenv("STATIC_DIR") or os.path.join(os.getcwd(), "static")
 PAGES_DIR = os.path.join(STATIC_DIR, "pages")
-VOICES_EXPORT_DIR = os.path.join(STATIC_DIR, "voices_export")
 BOXES_STORAGE = os.path.join(STATIC_DIR, "boxes.json")
 
+# Ablage der Task-Artefakte (services/storage.py): "local" oder "s3", Layout "flat" oder "sharded"
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local").lower()
+STORAGE_LAYOUT = os.getenv("STORAGE_LAYOUT", "flat").lower()
+STORAGE_S3_BUCKET = os.getenv("STORAGE_S3_BUCKET", "")
+STORAGE_S3_PREFIX = os.getenv("STORAGE_S3_PREFIX", "")
+STORAGE_S3_ENDPOINT_URL = os.getenv("STORAGE_S3_ENDPOINT_URL") or None
+
+# Auflösung, mit der die PDF-Seiten gerastert werden (pdf2image-Standard)
+RENDER_DPI = 200
+
+# Randbeschnitt nach dem Deskew (TRIM_MARGINS=true, services/pipeline.py): Rand in Pixeln
+# bei RENDER_DPI, der um den Tintenbereich stehen bleibt
+TRIM_MARGINS = _env_flag("TRIM_MARGINS")
+TRIM_MARGIN_PX = int(os.getenv("TRIM_MARGIN_PX", "20"))
+
+# Zeitlimits (Sekunden) für Poppler pro Seite und jeden Tesseract-Aufruf; 0 = ohne Limit.
+# Bei Überschreitung wird der Prozess beendet und die Seite als fehlgeschlagen markiert.
+POPPLER_PAGE_TIMEOUT = int(os.getenv("POPPLER_PAGE_TIMEOUT", "60"))
+TESSERACT_TIMEOUT = int(os.getenv("TESSERACT_TIMEOUT", "30"))
+
+# Anzahl Worker-Threads der gemeinsamen Auftragswarteschlange (PDF-Verarbeitung, Export-Aufträge)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+
+# Zulassungssteuerung der PDF-Verarbeitung (services/admission.py): Budgets für gleichzeitig
+# laufende Verarbeitungen und Anzahl wartender Uploads, ab der mit 429 abgelehnt wird
+INGEST_MEMORY_BUDGET_MB = float(os.getenv("INGEST_MEMORY_BUDGET_MB", "2048"))
+INGEST_CPU_BUDGET_SECONDS = float(os.getenv("INGEST_CPU_BUDGET_SECONDS", "600"))
+INGEST_MAX_WAITING = int(os.getenv("INGEST_MAX_WAITING", "50"))
+
+# Anzahl Prozesse für den parallelen Stimmen-Export (0 = Anzahl CPU-Kerne)
+EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", "0")) or (os.cpu_count() or 1)
+
+# Anzahl zwischengespeicherter Export-Varianten pro Task (static/<task_id>/exports/)
+EXPORT_CACHE_MAX_VARIANTS = int(os.getenv("EXPORT_CACHE_MAX_VARIANTS", "5"))
+
+# Stimmen-PDFs nach der Stimmenerkennung vorab erzeugen (services/speculative_export.py)
+SPECULATIVE_EXPORT = _env_flag("SPECULATIVE_EXPORT")
+
+# Verkleinerte Seiten für /pdf_tasks/pages/{task_id}/{page} (services/renditions.py):
+# LRU-Cache im Speicher und auf der Platte (lokal pro Knoten), Qualität für WebP/JPEG
+RENDITION_CACHE_MEMORY_MB = int(os.getenv("RENDITION_CACHE_MEMORY_MB", "64"))
+RENDITION_CACHE_DISK_MB = int(os.getenv("RENDITION_CACHE_DISK_MB", "1024"))
+RENDITION_CACHE_DIR = os.getenv("RENDITION_CACHE_DIR") or os.path.join(STATIC_DIR, ".renditions")
+RENDITION_QUALITY = int(os.getenv("RENDITION_QUALITY", "80"))
+
+# Kopfzeilen-OCR während der PDF-Verarbeitung (optional, siehe services/header_ocr.py)
+# HEADER_CUTOFF_RATIO: Boxen, die unterhalb dieses Anteils der Seitenhöhe beginnen, werden ignoriert
+# HEADER_OCR_BAND_RATIO: erkanntes Band, etwas größer, damit Wörter an der Grenze vollständig sind
+HEADER_CUTOFF_RATIO = 0.25
+HEADER_OCR_BAND_RATIO = float(os.getenv("HEADER_OCR_BAND_RATIO", "0.3"))
+PRECOMPUTE_HEADER_OCR = _env_flag("PRECOMPUTE_HEADER_OCR")
+
+# Request-Tracing (services/tracing.py): Traces pro Route im Zeitfenster für /tracing/summary,
+# Export nach "file:<pfad>" oder an einen HTTP-Collector (leer = kein Export)
+TRACE_WINDOW = int(os.getenv("TRACE_WINDOW", "1000"))
+TRACE_EXPORT = os.getenv("TRACE_EXPORT", "")
+
+# Warnschwelle (Sekunden) für die Startzeit der API (services/startup.py, benchmarks/bench_startup.py)
+STARTUP_BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_SECONDS", "2.0"))
+
 # CORS/Frontend, Datenbank und JWT: zentral über SC_BaseBackend.settings
 # Beispiel in Modulen: from sc_base_backend import get_settings -> settings.frontend_url, settings.cors_origins,
 # settings.database_url (bzw. POSTGRES_* Aliases) und settings.jwt_secret
@@ -15,3 +15,64 @@ CREATE TABLE IF NOT EXISTS pdf_tasks (
 -- Helpful index for listing per user ordered by created_at
 CREATE INDEX IF NOT EXISTS idx_pdf_tasks_user_created_at
   ON pdf_tasks (user_id, created_at DESC);
+
+-- Batch-Uploads (/pdf_tasks/upload_batch); Fortschritt ergibt sich aus dem Status der Tasks
+CREATE TABLE IF NOT EXISTS pdf_batches (
+  id UUID PRIMARY KEY,
+  user_id INTEGER NOT NULL,
+  created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT NOW()
+);
+
+ALTER TABLE pdf_tasks
+  ADD COLUMN IF NOT EXISTS batch_id UUID REFERENCES pdf_batches (id) ON DELETE SET NULL;
+
+CREATE INDEX IF NOT EXISTS idx_pdf_tasks_batch
+  ON pdf_tasks (batch_id);
+
+-- OCR-Boxen pro Task und Seite (ersetzt static/<task_id>/boxes.json)
+CREATE TABLE IF NOT EXISTS ocr_pages (
+  task_id UUID NOT NULL REFERENCES pdf_tasks (id) ON DELETE CASCADE,
+  page INTEGER NOT NULL,
+  suggestions JSONB NOT NULL DEFAULT '{}'::jsonb,
+  labels JSONB NOT NULL DEFAULT '{}'::jsonb,
+  updated_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (task_id, page)
+);
+
+-- Eine Zeile pro Box; data enthält die Box wie vom Frontend gesendet (text, selected, ...)
+CREATE TABLE IF NOT EXISTS ocr_boxes (
+  task_id UUID NOT NULL,
+  page INTEGER NOT NULL,
+  idx INTEGER NOT NULL,
+  x INTEGER NOT NULL,
+  y INTEGER NOT NULL,
+  width INTEGER NOT NULL,
+  height INTEGER NOT NULL,
+  data JSONB NOT NULL,
+  PRIMARY KEY (task_id, page, idx),
+  FOREIGN KEY (task_id, page) REFERENCES ocr_pages (task_id, page) ON DELETE CASCADE
+);
+
+-- Zuordnung erkannter Texte zu gespeicherten Boxen über die Geometrie
+CREATE INDEX IF NOT EXISTS idx_ocr_boxes_geometry
+  ON ocr_boxes (task_id, page, x, y, width, height);
+
+-- Stimmen-Export als Hintergrundauftrag (status: queued, running, done, cancelled, error)
+CREATE TABLE IF NOT EXISTS export_jobs (
+  id UUID PRIMARY KEY,
+  task_id UUID NOT NULL REFERENCES pdf_tasks (id) ON DELETE CASCADE,
+  user_id INTEGER NOT NULL,
+  status TEXT NOT NULL,
+  voices_total INTEGER NOT NULL DEFAULT 0,
+  voices_done INTEGER NOT NULL DEFAULT 0,
+  pages_total INTEGER NOT NULL DEFAULT 0,
+  pages_done INTEGER NOT NULL DEFAULT 0,
+  cancel_requested BOOLEAN NOT NULL DEFAULT FALSE,
+  result_url TEXT,
+  error_message TEXT,
+  created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT NOW(),
+  updated_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_export_jobs_task_created_at
+  ON export_jobs (task_id, created_at DESC);
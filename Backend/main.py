@@ -1,3 +1,6 @@
+import time
+_started_at = time.perf_counter()
+
 from sc_base_backend.api.v1 import (
     users_router as base_users_router,
     organisations_router as base_organisations_router,
@@ -8,12 +11,15 @@ from dotenv import load_dotenv
 from sc_base_backend import get_settings, configure_logging, create_app, create_oauth_router
 from sc_base_backend.api.info import router as base_info_router
 import os
-from fastapi.staticfiles import StaticFiles
 from config import STATIC_DIR
 from api.v1.ocr import router as ocr_router
 from api.v1.musicsheets import router as musicsheets_router
 from api.v1.voices import router as voices_router
 from api.v1.pdf_tasks import router as pdf_tasks_router
+from api.v1.tracing import router as tracing_router
+from api.static_files import router as static_files_router
+from services.tracing import TracingMiddleware
+from services.startup import log_startup_report
 from fastapi.middleware.cors import CORSMiddleware
 
 load_dotenv()
@@ -40,10 +46,13 @@ app.include_router(ocr_router, prefix=api_prefix)
 app.include_router(musicsheets_router, prefix=api_prefix)
 app.include_router(voices_router, prefix=api_prefix)
 app.include_router(pdf_tasks_router, prefix=api_prefix)
+app.include_router(tracing_router, prefix=api_prefix)
 
 # Static-Verzeichnis erstellen in dem die generierten PDFs gespeichert werden
+# (beim Objektspeicher die lokale Arbeitskopie). Ausgeliefert wird aus der Ablage,
+# versionierte URLs mit unbegrenztem Cache, die übrigen mit ETag.
 os.makedirs(STATIC_DIR, exist_ok=True)
-app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
+app.include_router(static_files_router)
 
 # Zusätzliche (defensive) CORS-Absicherung für Dev:
 # Falls die globale CORS-Konfiguration nicht gegriffen hat, hier noch einmal sicherstellen.
@@ -59,4 +68,12 @@ if origins:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        # Dateiname gestreamter Downloads (ZIP-Export) für das Frontend lesbar machen
+        expose_headers=["Content-Disposition"],
     )
+
+# Request-Tracing als äußerste Middleware, damit auch CORS und Auth mitgemessen werden
+app.add_middleware(TracingMiddleware)
+
+# Startzeit und vorzeitig geladene Bild-/OCR-Bibliotheken protokollieren
+log_startup_report(_started_at)
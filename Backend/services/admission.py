@@ -0,0 +1,178 @@
+"""
+Zulassungssteuerung für die PDF-Verarbeitung.
+
+Vor dem Start wird der Aufwand eines PDFs aus Seitenzahl und Seitengröße × RENDER_DPI
+geschätzt (estimate_pdf_cost): Speicher der größten gerasterten Seite samt
+Arbeitskopien der Schräglagenkorrektur und CPU-Sekunden. IngestAdmission gibt Aufträge erst an die
+Job-Warteschlange weiter, wenn die Schätzungen aller zugelassenen, noch nicht
+beendeten Aufträge innerhalb von INGEST_MEMORY_BUDGET_MB und INGEST_CPU_BUDGET_SECONDS
+bleiben. Zugelassen werden höchstens so viele Aufträge, wie die Warteschlange Worker
+hat (JOB_WORKERS); die Budgets gelten damit für gleichzeitig laufende Verarbeitungen
+und nicht für Aufträge, die nur in der Warteschlange liegen. Belegen Exporte einen
+Worker, kann ein zugelassener Auftrag dort noch kurz warten.
+Die übrigen warten hier; wie in der Job-Warteschlange kommen die Auftraggeber
+reihum dran, jeweils in Eingangsreihenfolge. Ein Auftrag, der allein schon über dem
+Budget liegt, läuft, sobald sonst nichts zugelassen ist.
+
+Warten bereits INGEST_MAX_WAITING Aufträge, werden neue Uploads mit Overloaded
+abgelehnt (API: 429 mit Warteposition und Retry-After).
+"""
+import math
+import threading
+from collections import OrderedDict
+
+from pypdf import PdfReader
+
+from config import (
+    RENDER_DPI, JOB_WORKERS, INGEST_MEMORY_BUDGET_MB, INGEST_CPU_BUDGET_SECONDS, INGEST_MAX_WAITING,
+)
+from services.job_queue import get_job_queue
+
+
+# render_pages rastert Seite für Seite und hält sie als Array (services/imaging.py); zur
+# RGB-Seite kommen Graustufen (1), Schwellwert (1), das int64-Labelbild von regionprops (8)
+# und die gedrehte Seite (bis 3) hinzu. Die Puffer werden über die Seiten hinweg wiederverwendet.
+RGB_BYTES_PER_PIXEL = 3
+DESKEW_BYTES_PER_PIXEL = 13
+# Grob aus benchmarks/bench_pipeline.py: Rastern und beide Deskew-Verfahren pro Megapixel
+CPU_SECONDS_PER_MEGAPIXEL = 0.1
+
+
+class Overloaded(Exception):
+    def __init__(self, waiting, retry_after):
+        super().__init__(f"{waiting} Aufträge warten bereits")
+        self.waiting = waiting
+        self.retry_after = retry_after
+
+
+def estimate_pdf_cost(pdf_path, dpi=RENDER_DPI):
+    """Liefert {"pages", "megapixels", "memory_mb", "cpu_seconds"} für das Rastern mit dpi."""
+    try:
+        sizes = [(float(page.mediabox.width), float(page.mediabox.height))
+                 for page in PdfReader(pdf_path).pages]
+    except Exception:
+        # Nicht lesbare PDFs scheitern ohnehin früh in der Verarbeitung
+        sizes = []
+    pixels = [math.ceil(w / 72 * dpi) * math.ceil(h / 72 * dpi) for w, h in sizes]
+    total = sum(pixels)
+    peak = max(pixels, default=0) * (RGB_BYTES_PER_PIXEL + DESKEW_BYTES_PER_PIXEL)
+    return {
+        "pages": len(pixels),
+        "megapixels": round(total / 1e6, 1),
+        "memory_mb": round(peak / 2**20, 1),
+        "cpu_seconds": round(total / 1e6 * CPU_SECONDS_PER_MEGAPIXEL, 1),
+    }
+
+
+class IngestAdmission:
+    def __init__(self, memory_budget_mb, cpu_budget_seconds, max_waiting, submit, max_running=JOB_WORKERS):
+        self.memory_budget_mb = memory_budget_mb
+        self.cpu_budget_seconds = cpu_budget_seconds
+        self.max_waiting = max_waiting
+        self.max_running = max(1, max_running)
+        self._submit = submit
+        self._lock = threading.Lock()
+        self._admitted = {}
+        # owner -> OrderedDict(task_id -> (cost, fn, args)); Reihenfolge der owner = Rotation
+        self._waiting = OrderedDict()
+        self._waiting_count = 0
+
+    def _fits(self, cost):
+        # Aufrufer hält _lock
+        if not self._admitted:
+            return True
+        if len(self._admitted) >= self.max_running:
+            return False
+        memory = sum(c["memory_mb"] for c in self._admitted.values()) + cost["memory_mb"]
+        cpu = sum(c["cpu_seconds"] for c in self._admitted.values()) + cost["cpu_seconds"]
+        return memory <= self.memory_budget_mb and cpu <= self.cpu_budget_seconds
+
+    def _retry_after(self):
+        # Aufrufer hält _lock; geschätzte Zeit, bis die Warteschlange abgearbeitet ist
+        pending = list(self._admitted.values()) + [
+            entry[0] for jobs in self._waiting.values() for entry in jobs.values()]
+        seconds = sum(c["cpu_seconds"] for c in pending) / self.max_running
+        return max(1, int(math.ceil(seconds)))
+
+    def check(self, count=1):
+        """Wirft Overloaded, wenn mit count neuen Aufträgen mehr als max_waiting zurückgestellt wären."""
+        with self._lock:
+            if self._waiting_count + count > self.max_waiting:
+                raise Overloaded(self._waiting_count, self._retry_after())
+
+    def submit(self, task_id, cost, fn, *args, owner=None):
+        """Lässt den Auftrag zu oder stellt ihn zurück; liefert die Warteposition (0 = zugelassen)."""
+        with self._lock:
+            if not self._waiting and self._fits(cost):
+                self._admitted[task_id] = cost
+            else:
+                self._waiting.setdefault(owner, OrderedDict())[task_id] = (cost, fn, args)
+                self._waiting_count += 1
+                return self._position(task_id)
+        self._start(task_id, fn, args, owner)
+        return 0
+
+    def _waiting_order(self):
+        # Aufrufer hält _lock; task_ids in der Reihenfolge, in der sie zugelassen würden
+        queues = [list(jobs) for jobs in self._waiting.values()]
+        for i in range(max(map(len, queues), default=0)):
+            for queue in queues:
+                if i < len(queue):
+                    yield queue[i]
+
+    def _position(self, task_id):
+        # Aufrufer hält _lock
+        if task_id in self._admitted:
+            return 0
+        for i, waiting_id in enumerate(self._waiting_order(), start=1):
+            if waiting_id == task_id:
+                return i
+        return None
+
+    def position(self, task_id):
+        """Warteposition (1 = als Nächstes), 0 = zugelassen, None = unbekannt bzw. beendet."""
+        with self._lock:
+            return self._position(task_id)
+
+    def _start(self, task_id, fn, args, owner):
+        self._submit(self._run, task_id, fn, args, kind="ingest", owner=owner)
+
+    def _run(self, task_id, fn, args):
+        try:
+            fn(*args)
+        finally:
+            self._release(task_id)
+
+    def _release(self, task_id):
+        ready = []
+        with self._lock:
+            self._admitted.pop(task_id, None)
+            # Nur der jeweils nächste Auftrag rückt nach, damit große PDFs nicht verhungern
+            while self._waiting:
+                owner, jobs = next(iter(self._waiting.items()))
+                waiting_id, (cost, fn, args) = next(iter(jobs.items()))
+                if not self._fits(cost):
+                    break
+                del jobs[waiting_id]
+                if jobs:
+                    self._waiting.move_to_end(owner)
+                else:
+                    del self._waiting[owner]
+                self._waiting_count -= 1
+                self._admitted[waiting_id] = cost
+                ready.append((waiting_id, fn, args, owner))
+        for waiting_id, fn, args, owner in ready:
+            self._start(waiting_id, fn, args, owner)
+
+
+_admission = None
+_admission_lock = threading.Lock()
+
+
+def get_ingest_admission():
+    global _admission
+    with _admission_lock:
+        if _admission is None:
+            _admission = IngestAdmission(INGEST_MEMORY_BUDGET_MB, INGEST_CPU_BUDGET_SECONDS,
+                                         INGEST_MAX_WAITING, get_job_queue().submit)
+        return _admission
@@ -0,0 +1,224 @@
+"""
+Speicher für OCR-Boxen, Vorschläge und Labels pro Task und Seite (PostgreSQL, JSONB).
+
+Ersetzt static/<task_id>/boxes.json: statt die ganze Datei bei jedem Aufruf neu zu
+schreiben, wird pro Box eine Zeile gehalten (ocr_boxes) und nur geänderte Zeilen
+geschrieben. Schreibzugriffe auf eine Seite sperren deren Zeile in ocr_pages, damit
+parallele Requests sich nicht gegenseitig überschreiben. Schema: docs/schema.sql
+
+Seiten ohne eigene Boxen verwenden die der Vorlagenseite; sind die Seiten beschnitten
+(TRIM_MARGINS), werden die Boxen um den Unterschied der Ausschnitte verschoben.
+"""
+import datetime
+import json
+import logging
+import os
+
+from services.page_meta import load_page_meta, page_offset, shift_box
+from services.storage import task_dir
+
+
+# Seite, unter der der frühere einzelne "template"-Eintrag abgelegt wird
+TEMPLATE_PAGE = 1
+
+
+def _box_rows(boxes):
+    rows = []
+    for idx, box in enumerate(boxes):
+        rows.append({
+            "idx": idx,
+            "x": int(float(box.get("x", 0))),
+            "y": int(float(box.get("y", 0))),
+            "width": int(float(box.get("width", 0))),
+            "height": int(float(box.get("height", 0))),
+            "data": box,
+        })
+    return rows
+
+
+def _fetch_page(cur, task_id, page):
+    cur.execute(
+        "SELECT suggestions, labels FROM ocr_pages WHERE task_id = %s AND page = %s",
+        (task_id, page))
+    page_row = cur.fetchone()
+    if not page_row:
+        return None
+    cur.execute(
+        "SELECT data FROM ocr_boxes WHERE task_id = %s AND page = %s ORDER BY idx",
+        (task_id, page))
+    boxes = [row["data"] for row in cur.fetchall()]
+    return {
+        "boxes": boxes,
+        "suggestions": page_row["suggestions"] or {},
+        "labels": page_row["labels"] or {},
+    }
+
+
+def _write_boxes(cur, task_id, page, boxes):
+    # Nur Zeilen schreiben, die sich tatsächlich geändert haben
+    cur.execute(
+        """
+        INSERT INTO ocr_boxes (task_id, page, idx, x, y, width, height, data)
+        SELECT %s, %s, r.idx, r.x, r.y, r.width, r.height, r.data
+        FROM jsonb_to_recordset(%s::jsonb)
+             AS r(idx INTEGER, x INTEGER, y INTEGER, width INTEGER, height INTEGER, data JSONB)
+        ON CONFLICT (task_id, page, idx) DO UPDATE
+        SET x = EXCLUDED.x, y = EXCLUDED.y, width = EXCLUDED.width,
+            height = EXCLUDED.height, data = EXCLUDED.data
+        WHERE ocr_boxes.data IS DISTINCT FROM EXCLUDED.data
+        """,
+        (task_id, page, json.dumps(_box_rows(boxes), ensure_ascii=False)))
+    cur.execute(
+        "DELETE FROM ocr_boxes WHERE task_id = %s AND page = %s AND idx >= %s",
+        (task_id, page, len(boxes)))
+
+
+def _resolve_page(cur, task_id, page, fallback_to_template=True):
+    """Seite, deren Boxen für page gelten; None, wenn der Task keine Boxen hat.
+
+    Seiten ohne eigene Boxen verwenden die erste gespeicherte Seite als Vorlage.
+    """
+    cur.execute(
+        "SELECT 1 FROM ocr_pages WHERE task_id = %s AND page = %s", (task_id, page))
+    if cur.fetchone():
+        return page
+    if not fallback_to_template:
+        return None
+    cur.execute(
+        "SELECT MIN(page) AS page FROM ocr_pages WHERE task_id = %s", (task_id,))
+    row = cur.fetchone()
+    if row and row["page"] is not None:
+        return row["page"]
+    return None
+
+
+def _template_shift(task_id, page, source_page):
+    """(dx, dy) von Koordinaten auf source_page nach page; (0, 0) ohne Beschnitt."""
+    if source_page is None or source_page == page:
+        return 0, 0
+    meta = load_page_meta(task_id)
+    source_x, source_y = page_offset(meta, source_page)
+    page_x, page_y = page_offset(meta, page)
+    return source_x - page_x, source_y - page_y
+
+
+def get_page(conn, task_id, page, fallback_to_template=True):
+    _migrate_legacy_boxes(conn, task_id)
+    with conn.cursor() as cur:
+        source_page = _resolve_page(cur, task_id, page, fallback_to_template)
+        result = _fetch_page(cur, task_id, source_page) if source_page is not None else None
+    conn.commit()
+    dx, dy = _template_shift(task_id, page, source_page)
+    if result is not None and (dx or dy):
+        result["boxes"] = [shift_box(box, dx, dy) for box in result["boxes"]]
+    return result
+
+
+def save_page(conn, task_id, page, boxes, suggestions, labels=None):
+    """Ersetzt Boxen und Vorschläge einer Seite. labels=None behält die gespeicherten Labels."""
+    labels_json = json.dumps(labels, ensure_ascii=False) if labels is not None else None
+    try:
+        with conn.cursor() as cur:
+            # Upsert sperrt die Seitenzeile bis zum Commit
+            cur.execute(
+                """
+                INSERT INTO ocr_pages (task_id, page, suggestions, labels, updated_at)
+                VALUES (%s, %s, %s::jsonb, COALESCE(%s::jsonb, '{}'::jsonb), %s)
+                ON CONFLICT (task_id, page) DO UPDATE
+                SET suggestions = EXCLUDED.suggestions,
+                    labels = COALESCE(%s::jsonb, ocr_pages.labels),
+                    updated_at = EXCLUDED.updated_at
+                RETURNING labels
+                """,
+                (task_id, page, json.dumps(suggestions or {}, ensure_ascii=False),
+                 labels_json, datetime.datetime.now(), labels_json))
+            stored_labels = cur.fetchone()["labels"] or {}
+            _write_boxes(cur, task_id, page, boxes)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return {"boxes": boxes, "suggestions": suggestions or {}, "labels": stored_labels}
+
+
+def update_box_texts(conn, task_id, page, results, suggest):
+    """Überträgt erkannte Texte auf gespeicherte Boxen mit gleicher Geometrie.
+
+    Seiten ohne eigene Boxen aktualisieren wie get_page die Vorlagenseite; die
+    Koordinaten in results werden dazu auf die Vorlagenseite zurückgerechnet.
+    suggest(boxes) berechnet die Vorschläge neu und läuft in derselben Transaktion.
+    Gibt die aktualisierten Vorschläge zurück.
+    """
+    _migrate_legacy_boxes(conn, task_id)
+    try:
+        with conn.cursor() as cur:
+            source_page = _resolve_page(cur, task_id, page)
+            dx, dy = _template_shift(task_id, page, source_page)
+            page = source_page
+            if page is not None:
+                cur.execute(
+                    "SELECT page FROM ocr_pages WHERE task_id = %s AND page = %s FOR UPDATE",
+                    (task_id, page))
+            if page is None or not cur.fetchone():
+                conn.rollback()
+                return suggest([])
+            # Zuordnung über den Geometrie-Index statt verschachtelter Schleife
+            cur.execute(
+                """
+                UPDATE ocr_boxes AS b
+                SET data = jsonb_set(b.data, '{text}', to_jsonb(r.text))
+                FROM jsonb_to_recordset(%s::jsonb)
+                     AS r(x INTEGER, y INTEGER, width INTEGER, height INTEGER, text TEXT)
+                WHERE b.task_id = %s AND b.page = %s
+                  AND b.x = r.x AND b.y = r.y AND b.width = r.width AND b.height = r.height
+                """,
+                (json.dumps([{
+                    "x": int(res["x"]) - dx,
+                    "y": int(res["y"]) - dy,
+                    "width": int(res["width"]),
+                    "height": int(res["height"]),
+                    "text": res["text"],
+                } for res in results], ensure_ascii=False), task_id, page))
+            cur.execute(
+                "SELECT data FROM ocr_boxes WHERE task_id = %s AND page = %s ORDER BY idx",
+                (task_id, page))
+            boxes = [row["data"] for row in cur.fetchall()]
+            suggestions = suggest(boxes)
+            cur.execute(
+                """
+                UPDATE ocr_pages SET suggestions = %s::jsonb, updated_at = %s
+                WHERE task_id = %s AND page = %s
+                """,
+                (json.dumps(suggestions, ensure_ascii=False), datetime.datetime.now(),
+                 task_id, page))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return suggestions
+
+
+def get_legacy_boxes_path(task_id):
+    return os.path.join(task_dir(task_id), "boxes.json")
+
+
+def _migrate_legacy_boxes(conn, task_id):
+    # Einmalige Übernahme einer vorhandenen boxes.json in die Datenbank
+    path = get_legacy_boxes_path(task_id)
+    if not os.path.exists(path):
+        return
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            template = json.load(f).get("template")
+        if template:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "SELECT 1 FROM ocr_pages WHERE task_id = %s LIMIT 1", (task_id,))
+                exists = cur.fetchone()
+            conn.commit()
+            if not exists:
+                save_page(conn, task_id, TEMPLATE_PAGE, template.get("boxes", []),
+                          template.get("suggestions", {}), template.get("labels", {}))
+        os.replace(path, f"{path}.migrated")
+    except Exception:
+        logging.exception(f"Übernahme von {path} fehlgeschlagen")
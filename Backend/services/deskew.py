@@ -0,0 +1,168 @@
+"""
+Schräglagenerkennung der gerenderten Seiten.
+
+Zwei unabhängige Schätzungen (minAreaRect über alle Vordergrundpixel und
+Orientierung der größten zusammenhängenden Region) werden in
+services/pipeline.py gegeneinander abgewogen. Beide nehmen PIL-Bilder oder Arrays
+(services/imaging.py); die Pipeline übergibt das einmal berechnete Schwellwertbild.
+"""
+import os
+
+from services.imaging import as_array, binarize, to_bgr, to_gray
+
+
+def is_debug_mode():
+    import os
+    debug = os.environ.get("DEBUG", "False")
+    return str(debug).strip().lower() in ("1", "true", "yes", "ja")
+
+
+def is_debug_process_pdf_image():
+    import os
+
+    if is_debug_process_pdf_detailed_image():
+        return True
+
+    debug = os.environ.get("DEBUG_PROCESS_PDF_IMAGE", "False")
+    return str(debug).strip().lower() in ("1", "true", "yes", "ja")
+
+
+def is_debug_process_pdf_detailed_image():
+    import os
+    debug = os.environ.get("DEBUG_PROCESS_PDF_DETAILED_IMAGES", "False")
+    return str(debug).strip().lower() in ("1", "true", "yes", "ja")
+
+
+def deskew_scikit_orientation(image, optpages_dir, page_num, log_debug=None, thresh=None):
+    log_debug = log_debug or getattr(image, '_log_debug', None)
+    if log_debug:
+        log_debug("")
+        log_debug("deskew_scikit_orientation: Start")
+    import cv2
+    import numpy as np
+    from skimage.measure import label, regionprops
+
+    if thresh is None:
+        thresh = binarize(to_gray(image))
+
+    if is_debug_mode() and log_debug:
+        log_debug("Kontrollbilder gray und thresh werden gespeichert.")
+    if is_debug_process_pdf_detailed_image():
+        cv2.imwrite(os.path.join(
+            optpages_dir, f"page_{page_num}_4_1_gray.png"), to_gray(image))
+        cv2.imwrite(os.path.join(
+            optpages_dir, f"page_{page_num}_4_2_thresh.png"), thresh)
+
+    labeled = label(thresh)
+    regions = regionprops(labeled)
+
+    if not regions:
+        if log_debug:
+            log_debug("Keine Regionen gefunden, keine Rotation.")
+        return 0.0
+
+    largest_region = max(regions, key=lambda r: r.area)
+    angle_rad = largest_region.orientation
+    angle_deg = -np.degrees(angle_rad)
+
+    if 70 <= abs(angle_deg) <= 110:
+        if angle_deg > 0:
+            angle_deg = angle_deg - 90
+        else:
+            angle_deg = angle_deg + 90
+        if log_debug:
+            log_debug(
+                f"Winkel wurde um 90° korrigiert: Neuer Winkel = {angle_deg:.2f}°")
+
+    if is_debug_process_pdf_detailed_image():
+        debug_img = to_bgr(as_array(image))
+        h, w = debug_img.shape[:2]
+        center_img = (w // 2, h // 2)
+        length = min(h, w) // 2 - 10
+        angle_rad_draw = np.radians(angle_deg)
+        x2 = int(center_img[0] + length * np.cos(angle_rad_draw))
+        y2 = int(center_img[1] - length * np.sin(angle_rad_draw))
+        cv2.arrowedLine(debug_img, center_img, (x2, y2),
+                        (0, 0, 255), 4, tipLength=0.08)
+        cv2.putText(debug_img, f"{angle_deg:.2f}°", (
+            center_img[0]+10, center_img[1]-10), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 255), 2)
+        cv2.imwrite(os.path.join(
+            optpages_dir, f"page_{page_num}_4_3_angle_debug.png"), debug_img)
+
+    return angle_deg
+
+
+def deskew_min_area_rect(image, optpages_dir, page_num, log_debug=None, thresh=None):
+    log_debug = log_debug or getattr(image, '_log_debug', None)
+    if log_debug:
+        log_debug("")
+        log_debug("deskew_min_area_rect: Wird aufgerufen")
+    import cv2
+    import numpy as np
+    if thresh is None:
+        thresh = binarize(to_gray(image))
+    h, w = thresh.shape[:2]
+    # (Zeile, Spalte) wie früher np.where, aber als int32 ohne Zwischenmaske
+    points = cv2.findNonZero(thresh)
+    coords = points.reshape(-1, 2)[:, ::-1] if points is not None else np.empty((0, 2), np.int32)
+    if is_debug_process_pdf_detailed_image():
+        cv2.imwrite(os.path.join(
+            optpages_dir, f"page_{page_num}_03_01_gray.png"), to_gray(image))
+        cv2.imwrite(os.path.join(
+            optpages_dir, f"page_{page_num}_03_02_thresh.png"), thresh)
+    if coords.shape[0] == 0:
+        if log_debug:
+            log_debug("Keine relevanten Pixel gefunden, keine Rotation.")
+        return 0.0
+    rect = cv2.minAreaRect(coords)
+    (center, (width, height), angle) = rect
+
+    if w > h:
+        if log_debug:
+            log_debug("Bild ist im Landscape-Modus.")
+        if width > height and 80 <= angle <= 100:
+            angle = angle - 90.0
+            if log_debug:
+                log_debug(f"Winkel wurde auf {angle} gekippt.")
+        if width < height:
+            width, height = height, width
+            center = (center[1], center[0])
+            if log_debug:
+                log_debug("Breite und Höhe wurden vertauscht")
+    else:
+        if log_debug:
+            log_debug("Bild ist im Portrait-Modus.")
+        if width < height and 80 <= angle <= 100:
+            angle = angle - 90.0
+            if log_debug:
+                log_debug(f"Winkel wurde auf {angle} gekippt.")
+        if width > height:
+            width, height = height, width
+            center = (center[1], center[0])
+            if log_debug:
+                log_debug("Breite und Höhe wurden vertauscht")
+
+    angle = -angle
+
+    if is_debug_process_pdf_detailed_image():
+        debug_img = to_bgr(as_array(image))
+        h, w = debug_img.shape[:2]
+        box = cv2.boxPoints(((center[0], center[1]), (width, height), angle))
+        box = np.int0(box)
+        min_x, min_y = box[:, 0].min(), box[:, 1].min()
+        offset_x = 0
+        offset_y = 0
+        if min_x < 0:
+            offset_x = -min_x
+        if min_y < 0:
+            offset_y = -min_y
+        box[:, 0] += offset_x
+        box[:, 1] += offset_y
+        box[:, 1] = h - box[:, 1]
+        box[:, 0] = np.clip(box[:, 0], 0, w - 1)
+        box[:, 1] = np.clip(box[:, 1], 0, h - 1)
+        cv2.drawContours(debug_img, [box], 0, (0, 0, 255), 2)
+        cv2.imwrite(os.path.join(
+            optpages_dir, f"page_{page_num}_03_03_rect.png"), debug_img)
+
+    return angle
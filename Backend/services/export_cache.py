@@ -0,0 +1,183 @@
+"""
+Zwischenspeicher für Export-Artefakte pro Task.
+
+Jede Export-Variante liegt unter <task_dir>/exports/<key>/, wobei der
+Schlüssel ein Hash aus Stimmenbereichen, Metadaten, Exportoptionen und dem
+Seitenstand ist. Der Seitenstand wird aus Größe und Änderungszeit der Seitenbilder,
+von original.pdf und page_meta.json gebildet, damit ein wiederholter Export ohne
+erneutes Lesen der Seiten erkannt wird. Varianten mit veraltetem Seitenstand und
+die ältesten über EXPORT_CACHE_MAX_VARIANTS hinaus werden entfernt.
+Mit dem Manifest wird die Variante in der gemeinsamen Ablage veröffentlicht
+(services/storage.py), damit die Artefakt-URLs auf jedem Knoten auflösbar sind.
+"""
+import datetime
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+from config import EXPORT_CACHE_MAX_VARIANTS
+from services import storage
+from services.storage import task_dir, versioned_url
+
+
+MANIFEST_NAME = "manifest.json"
+# Varianten ohne Manifest gelten erst nach dieser Zeit (Sekunden) als abgebrochen
+INCOMPLETE_VARIANT_MAX_AGE = 3600
+
+_lock = threading.Lock()
+
+
+def get_exports_root(task_id):
+    return os.path.join(task_dir(task_id), "exports")
+
+
+def get_variant_dir(task_id, key):
+    return os.path.join(get_exports_root(task_id), key)
+
+
+def get_artifact_url(task_id, key, name):
+    return versioned_url(artifact_path(task_id, key, name))
+
+
+def pages_signature(task_id, page_files):
+    h = hashlib.sha256()
+    directory = task_dir(task_id)
+    extra = [os.path.join(directory, "original.pdf"), os.path.join(directory, "page_meta.json")]
+    for path in extra:
+        storage.fetch(path)
+    paths = list(page_files) + extra
+    for path in paths:
+        name = os.path.basename(path)
+        try:
+            st = os.stat(path)
+            h.update(f"{name}:{st.st_size}:{st.st_mtime_ns}\n".encode("utf-8"))
+        except FileNotFoundError:
+            h.update(f"{name}:-\n".encode("utf-8"))
+    return h.hexdigest()
+
+
+def export_key(voices_ranges, metadata, options, pages_sig):
+    payload = json.dumps({
+        "ranges": [list(r) for r in voices_ranges],
+        "metadata": metadata,
+        "options": options,
+        "pages": pages_sig,
+    }, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:24]
+
+
+def load_manifest(task_id, key):
+    path = os.path.join(get_variant_dir(task_id, key), MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    # Zugriff vermerken, damit häufig genutzte Varianten nicht verdrängt werden
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return manifest
+
+
+def update_manifest(task_id, key, pages_sig, **fields):
+    variant_dir = get_variant_dir(task_id, key)
+    path = os.path.join(variant_dir, MANIFEST_NAME)
+    with _lock:
+        os.makedirs(variant_dir, exist_ok=True)
+        manifest = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    manifest = json.load(f)
+            except (OSError, ValueError):
+                manifest = {}
+        manifest.setdefault("created_at", datetime.datetime.now().isoformat())
+        manifest["pages_signature"] = pages_sig
+        manifest.update(fields)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    storage.publish_dir(variant_dir)
+    return manifest
+
+
+def artifact_path(task_id, key, name):
+    return os.path.join(get_variant_dir(task_id, key), name)
+
+
+def temp_artifact_path(task_id, key, name):
+    os.makedirs(get_variant_dir(task_id, key), exist_ok=True)
+    return f"{artifact_path(task_id, key, name)}.{uuid.uuid4().hex}.tmp"
+
+
+def evict(task_id, pages_sig, keep_key=None, max_variants=EXPORT_CACHE_MAX_VARIANTS):
+    root = get_exports_root(task_id)
+    if not os.path.isdir(root):
+        return
+    variants = []
+    for key in os.listdir(root):
+        variant_dir = os.path.join(root, key)
+        manifest_path = os.path.join(variant_dir, MANIFEST_NAME)
+        if not os.path.isdir(variant_dir) or key == keep_key:
+            continue
+        if not os.path.exists(manifest_path):
+            # Variante wird evtl. gerade von einem anderen Request erzeugt
+            if time.time() - os.path.getmtime(variant_dir) > INCOMPLETE_VARIANT_MAX_AGE:
+                _remove_variant(variant_dir)
+            continue
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                sig = json.load(f).get("pages_signature")
+            mtime = os.path.getmtime(manifest_path)
+        except (OSError, ValueError):
+            sig, mtime = None, 0
+        if sig != pages_sig:
+            # Seiten haben sich seitdem geändert
+            _remove_variant(variant_dir)
+        else:
+            variants.append((mtime, variant_dir))
+    variants.sort(reverse=True)
+    keep = max_variants - 1 if keep_key else max_variants
+    for _, variant_dir in variants[max(0, keep):]:
+        _remove_variant(variant_dir)
+
+
+def _remove_variant(variant_dir):
+    try:
+        storage.remove_dir(variant_dir)
+    except Exception:
+        logging.exception(f"Export-Variante {variant_dir} konnte nicht entfernt werden")
+
+
+def tee_to_cache(chunks, task_id, key, name, on_complete=None):
+    """Reicht einen Byte-Stream durch und legt ihn dabei als Artefakt ab.
+
+    Das Artefakt wird erst nach vollständigem Durchlauf sichtbar; bei Abbruch
+    (z. B. Client trennt die Verbindung) wird die Teildatei entfernt.
+    """
+    tmp_path = temp_artifact_path(task_id, key, name)
+    complete = False
+    try:
+        with open(tmp_path, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+                yield chunk
+        os.replace(tmp_path, artifact_path(task_id, key, name))
+        complete = True
+        if on_complete is not None:
+            on_complete()
+    finally:
+        if hasattr(chunks, "close"):
+            # Abbruch an den erzeugenden Generator weitergeben (z. B. wartende Stimmen)
+            chunks.close()
+        if not complete and os.path.exists(tmp_path):
+            os.remove(tmp_path)
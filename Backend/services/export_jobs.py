@@ -0,0 +1,143 @@
+"""
+Stimmen-Export als Hintergrundauftrag (Tabelle export_jobs, siehe docs/schema.sql).
+
+Der Auftrag läuft über die gemeinsame Warteschlange (services/job_queue.py),
+schreibt das ZIP in den Export-Cache des Tasks und meldet den Fortschritt pro
+Stimme und Seite. Ein Abbruch wird zwischen zwei Stimmen wirksam: danach werden
+keine weiteren Stimmen eingereiht und noch wartende im Prozesspool abgebrochen.
+"""
+import datetime
+import logging
+import uuid
+
+from sc_base_backend import get_pg_connection
+
+from services.export_cache import (
+    get_artifact_url, update_manifest, evict, tee_to_cache,
+)
+from services.voice_export import stream_voices_zip
+
+
+def create_export_job(conn, task_id, user_id, voices_total, pages_total):
+    job_id = str(uuid.uuid4())
+    now = datetime.datetime.now()
+    with conn.cursor() as cur:
+        cur.execute(
+            """INSERT INTO export_jobs (id, task_id, user_id, status, voices_total, pages_total,
+                                        created_at, updated_at)
+                   VALUES (%s, %s, %s, %s, %s, %s, %s, %s)""",
+            (job_id, task_id, user_id, 'queued', voices_total, pages_total, now, now)
+        )
+        conn.commit()
+    return job_id
+
+
+def update_export_job(conn, job_id, **fields):
+    # Nur feste Spaltennamen zulassen (Whitelist)
+    allowed = ("status", "voices_done", "pages_done", "result_url", "error_message")
+    columns = [c for c in allowed if c in fields]
+    assignments = ", ".join(f"{c} = %s" for c in columns)
+    with conn.cursor() as cur:
+        cur.execute(
+            f"UPDATE export_jobs SET {assignments}, updated_at = %s WHERE id = %s",
+            tuple(fields[c] for c in columns) + (datetime.datetime.now(), job_id)
+        )
+        conn.commit()
+
+
+def get_export_job(conn, job_id, user_id):
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT id, task_id, status, voices_total, voices_done, pages_total, pages_done,
+                   cancel_requested, result_url, error_message, created_at, updated_at
+            FROM export_jobs
+            WHERE id = %s AND user_id = %s
+            """,
+            (job_id, user_id)
+        )
+        row = cur.fetchone()
+    if not row:
+        return None
+    job = dict(row)
+    for field in ("id", "task_id"):
+        job[field] = str(job[field])
+    for date_field in ("created_at", "updated_at"):
+        if hasattr(job[date_field], "isoformat"):
+            job[date_field] = job[date_field].isoformat()
+    return job
+
+
+def request_cancel(conn, job_id, user_id):
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE export_jobs SET cancel_requested = TRUE, updated_at = %s
+            WHERE id = %s AND user_id = %s AND status IN ('queued', 'running')
+            """,
+            (datetime.datetime.now(), job_id, user_id)
+        )
+        updated = cur.rowcount
+        conn.commit()
+    return updated > 0
+
+
+def is_cancel_requested(conn, job_id):
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT cancel_requested FROM export_jobs WHERE id = %s", (job_id,))
+        row = cur.fetchone()
+    conn.commit()
+    return bool(row and row["cancel_requested"])
+
+
+def run_export_job(job_id, task_id, page_files, voices_ranges, title, genre, komponist,
+                   arrangeur, export_mode, pages_sig, key, zip_filename, profile=None,
+                   prerendered=None):
+    conn = get_pg_connection()
+    try:
+        if is_cancel_requested(conn, job_id):
+            update_export_job(conn, job_id, status="cancelled")
+            return
+        update_export_job(conn, job_id, status="running")
+
+        timings = []
+        done = {"complete": False}
+
+        def on_complete():
+            update_manifest(task_id, key, pages_sig,
+                            zip=zip_filename, zip_timings=timings)
+            evict(task_id, pages_sig, keep_key=key)
+            done["complete"] = True
+
+        chunks = tee_to_cache(
+            stream_voices_zip(task_id, page_files, voices_ranges, title, genre,
+                              komponist, arrangeur, export_mode, timings=timings,
+                              profile=profile, prerendered=prerendered),
+            task_id, key, zip_filename, on_complete)
+        reported = 0
+        try:
+            for _ in chunks:
+                if len(timings) == reported:
+                    continue
+                reported = len(timings)
+                update_export_job(conn, job_id, voices_done=reported,
+                                  pages_done=sum(t["pages"] for t in timings))
+                if is_cancel_requested(conn, job_id):
+                    break
+        finally:
+            # Bei Abbruch entfernt tee_to_cache die Teildatei
+            chunks.close()
+
+        if done["complete"]:
+            update_export_job(conn, job_id, status="done",
+                              result_url=get_artifact_url(task_id, key, zip_filename))
+        else:
+            update_export_job(conn, job_id, status="cancelled")
+    except Exception as e:
+        logging.exception("Exception in run_export_job")
+        try:
+            conn.rollback()
+            update_export_job(conn, job_id, status="error", error_message=str(e))
+        except Exception:
+            logging.exception("Status des Export-Auftrags nicht aktualisierbar")
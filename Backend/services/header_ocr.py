@@ -0,0 +1,146 @@
+"""
+Kopfzeilen-OCR als nachgelagerte Stufe der PDF-Verarbeitung.
+
+Pro Seite wird nur das obere Band (HEADER_OCR_BAND_RATIO der Seitenhöhe) mit
+image_to_data erkannt. Die Wortdaten (Text, Boxen, Konfidenzen) werden spaltenweise
+im Format von pytesseract.Output.DICT unter <task_dir>/ocr/ abgelegt,
+damit die OCR-Endpunkte ohne erneuten Tesseract-Aufruf antworten können.
+"""
+import json
+import logging
+import os
+
+from PIL import Image
+
+from config import HEADER_OCR_BAND_RATIO, PRECOMPUTE_HEADER_OCR
+from services import storage
+from services.page_meta import update_page_meta
+from services.storage import task_dir
+from services.tesseract import TesseractTimeout, image_to_data
+
+
+WORD_COLUMNS = ("block_num", "par_num", "line_num", "word_num",
+                "left", "top", "width", "height", "conf", "text")
+
+
+def is_header_ocr_enabled():
+    return PRECOMPUTE_HEADER_OCR
+
+
+def get_page_words_path(task_id, page):
+    page_num_str = str(int(page)).zfill(5)
+    return os.path.join(task_dir(task_id), "ocr", f"{task_id}_page_{page_num_str}.json")
+
+
+def ocr_header_band(image):
+    width, height = image.size
+    band_height = max(1, min(height, int(round(height * HEADER_OCR_BAND_RATIO))))
+    band = image.crop((0, 0, width, band_height))
+    try:
+        data = image_to_data(
+            band,
+            lang="deu",
+            config="--psm 6"
+        )
+    finally:
+        band.close()
+
+    # Nur Wort-Ebene (level 5) mit Text übernehmen, Rest wird nie ausgewertet
+    words = {col: [] for col in WORD_COLUMNS}
+    for i in range(len(data["level"])):
+        text = str(data["text"][i]).strip()
+        if data["level"][i] != 5 or not text:
+            continue
+        try:
+            conf = float(data["conf"][i])
+        except (TypeError, ValueError):
+            conf = -1.0
+        for col in WORD_COLUMNS:
+            if col == "text":
+                words[col].append(text)
+            elif col == "conf":
+                words[col].append(conf)
+            else:
+                words[col].append(int(data[col][i]))
+    return {"width": width, "height": height, "band_height": band_height, "words": words}
+
+
+def save_page_words(task_id, page, result):
+    path = get_page_words_path(task_id, page)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    storage.publish(path)
+
+
+def load_page_words(task_id, page):
+    path = get_page_words_path(task_id, page)
+    if not storage.fetch(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        logging.exception(f"Kopfzeilen-OCR von {path} nicht lesbar")
+        return None
+
+
+def delete_page_words(task_id, page):
+    storage.remove(get_page_words_path(task_id, page))
+
+
+def precompute_header_ocr(task_id, pages_dir, num_pages):
+    for page in range(1, num_pages + 1):
+        page_num_str = str(page).zfill(5)
+        image_path = os.path.join(
+            pages_dir, f"{task_id}_page_{page_num_str}.png")
+        if not os.path.exists(image_path):
+            continue
+        try:
+            with Image.open(image_path) as image:
+                result = ocr_header_band(image)
+            save_page_words(task_id, page, result)
+        except TesseractTimeout:
+            # Seite markieren; die Endpunkte fallen auf Live-OCR (mit demselben Zeitlimit) zurück
+            logging.warning(
+                f"Kopfzeilen-OCR für Task {task_id}, Seite {page}: Zeitlimit überschritten")
+            update_page_meta(task_id, page, ocr_failed="timeout")
+        except Exception:
+            # Eine fehlerhafte Seite darf die übrigen nicht blockieren,
+            # die Endpunkte fallen für diese Seite auf Live-OCR zurück.
+            logging.exception(
+                f"Kopfzeilen-OCR für Task {task_id}, Seite {page} fehlgeschlagen")
+
+
+def words_in_region(result, left, top, right, bottom):
+    """Text der vorberechneten Wörter, deren Mittelpunkt im Bereich liegt.
+
+    Liefert None, wenn der Bereich über das erkannte Band hinausreicht.
+    """
+    if bottom > result["band_height"]:
+        # Häufig ein Zeichen für ein zu kleines HEADER_OCR_BAND_RATIO
+        logging.warning(
+            f"Bereich bis y={bottom:.0f} liegt außerhalb des Kopfzeilen-Bands "
+            f"(Höhe {result['band_height']}, HEADER_OCR_BAND_RATIO={HEADER_OCR_BAND_RATIO}), "
+            f"Live-OCR wird verwendet")
+        return None
+    words = result["words"]
+    hits = []
+    for i in range(len(words["text"])):
+        cx = words["left"][i] + words["width"][i] / 2
+        cy = words["top"][i] + words["height"][i] / 2
+        if left <= cx <= right and top <= cy <= bottom:
+            hits.append(i)
+    hits.sort(key=lambda i: (words["block_num"][i], words["par_num"][i],
+                             words["line_num"][i], words["left"][i]))
+    lines = []
+    current_key = None
+    for i in hits:
+        key = (words["block_num"][i], words["par_num"][i], words["line_num"][i])
+        if key != current_key:
+            lines.append([])
+            current_key = key
+        lines[-1].append(words["text"][i])
+    return "\n".join(" ".join(line) for line in lines).strip()
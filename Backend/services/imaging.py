@@ -0,0 +1,139 @@
+"""
+Array-Hilfen für die Seitenverarbeitung (services/pipeline.py, services/deskew.py).
+
+Eine Seite wird nach dem Rastern einmal in ein uint8-Array übernommen (RGB, H×W×3,
+oder Graustufen, H×W) und bleibt bis zum Speichern als PNG ein Array; es gibt keine
+Umwege über BGR oder zurück nach PIL. Graustufen und Schwellwertbild werden einmal
+pro Seite berechnet und von beiden Deskew-Schätzungen genutzt. PageBuffers hält die
+Arbeitspuffer über die Seiten eines PDFs hinweg, solange die Seitengröße gleich bleibt.
+
+classify_color_mode ordnet jede Seite anhand einer Stichprobe einem Farbmodus zu:
+"color" (nennenswerter Anteil farbiger Pixel), "bilevel" (praktisch nur Schwarz und
+Weiß, z. B. CCITT-Scans) oder "gray". Nur Farbseiten bleiben dreikanalig.
+ink_bbox liefert den Tintenbereich einer Seite für den Randbeschnitt.
+
+cv2 und numpy werden erst in den Funktionen geladen (siehe services/startup.py).
+"""
+
+
+# Stichprobe: jedes COLOR_SAMPLE_STEP-te Pixel in beide Richtungen
+COLOR_SAMPLE_STEP = 4
+# Pixel mit mehr als COLOR_SPREAD Abstand zwischen hellstem und dunkelstem Kanal gelten
+# als farbig; ab COLOR_MIN_FRACTION farbiger Pixel ist die Seite eine Farbseite
+# (ein Stempel reicht, JPEG-Farbrauschen an Kanten nicht)
+COLOR_SPREAD = 24
+COLOR_MIN_FRACTION = 0.001
+# Graustufenseiten mit höchstens BILEVEL_MAX_MIDTONE_FRACTION Pixeln zwischen
+# BILEVEL_DARK und BILEVEL_LIGHT werden als Schwarzweiß abgelegt
+BILEVEL_DARK = 32
+BILEVEL_LIGHT = 224
+BILEVEL_MAX_MIDTONE_FRACTION = 0.002
+COLOR_MODES = ("color", "gray", "bilevel")
+# Randbeschnitt: Pixel unter INK_THRESHOLD sind Tinte (wie normalize_margins im alten
+# Notenscanner.py); vorher entfernt ein 3x3-Median einzelne Staubpunkte, Zeilen und
+# Spalten mit weniger als INK_MIN_PIXELS Tintenpixeln zählen nicht
+INK_THRESHOLD = 200
+INK_MIN_PIXELS = 5
+
+
+class PageBuffers:
+    """Wiederverwendete Arbeitspuffer; ein Objekt pro Verarbeitungslauf (nicht threadsicher)."""
+
+    def __init__(self):
+        self._arrays = {}
+
+    def get(self, name, shape):
+        import numpy as np
+        array = self._arrays.get(name)
+        if array is None or array.shape != tuple(shape):
+            array = self._arrays[name] = np.empty(shape, dtype=np.uint8)
+        return array
+
+
+def _buffer(buffers, name, shape):
+    return buffers.get(name, shape) if buffers is not None else None
+
+
+def as_array(image):
+    """uint8-Array einer Seite; PIL-Bilder werden einmal kopiert, Arrays unverändert geliefert."""
+    import numpy as np
+    if isinstance(image, np.ndarray):
+        return image
+    if image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    return np.asarray(image)
+
+
+def to_gray(image, buffers=None):
+    import cv2
+    page = as_array(image)
+    if page.ndim == 2:
+        return page
+    return cv2.cvtColor(page, cv2.COLOR_RGB2GRAY, dst=_buffer(buffers, "gray", page.shape[:2]))
+
+
+def binarize(gray, buffers=None):
+    """Otsu-Schwellwert, Vordergrund (Noten) = 255."""
+    import cv2
+    return cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU,
+                         dst=_buffer(buffers, "thresh", gray.shape))[1]
+
+
+def color_statistics(page, gray=None, step=COLOR_SAMPLE_STEP):
+    """Anteil farbiger Pixel und Anteil mittlerer Grautöne auf einer Stichprobe der Seite."""
+    import numpy as np
+    color_fraction = 0.0
+    if page.ndim == 3:
+        sample = page[::step, ::step]
+        channel_spread = sample.max(axis=2) - sample.min(axis=2)
+        color_fraction = np.count_nonzero(channel_spread > COLOR_SPREAD) / channel_spread.size
+    if gray is None:
+        gray = to_gray(page)
+    gray_sample = gray[::step, ::step]
+    midtones = np.count_nonzero((gray_sample > BILEVEL_DARK) & (gray_sample < BILEVEL_LIGHT))
+    return {"color_fraction": float(color_fraction),
+            "midtone_fraction": float(midtones / gray_sample.size)}
+
+
+def classify_color_mode(page, gray=None):
+    """"color", "gray" oder "bilevel" (siehe Modulbeschreibung)."""
+    stats = color_statistics(page, gray)
+    if stats["color_fraction"] >= COLOR_MIN_FRACTION:
+        return "color"
+    if stats["midtone_fraction"] <= BILEVEL_MAX_MIDTONE_FRACTION:
+        return "bilevel"
+    return "gray"
+
+
+def ink_bbox(gray, buffers=None, threshold=INK_THRESHOLD, min_pixels=INK_MIN_PIXELS):
+    """(left, top, right, bottom) des Tintenbereichs, right/bottom exklusiv; None ohne Tinte."""
+    import cv2
+    import numpy as np
+    ink = cv2.medianBlur(gray, 3, dst=_buffer(buffers, "ink", gray.shape))
+    cv2.threshold(ink, threshold - 1, 1, cv2.THRESH_BINARY_INV, dst=ink)
+    rows = np.flatnonzero(ink.sum(axis=1, dtype=np.int32) >= min_pixels)
+    cols = np.flatnonzero(ink.sum(axis=0, dtype=np.int32) >= min_pixels)
+    if not rows.size or not cols.size:
+        return None
+    return int(cols[0]), int(rows[0]), int(cols[-1]) + 1, int(rows[-1]) + 1
+
+
+def rotate(page, angle, buffers=None):
+    """Dreht die Seite um angle Grad (wie cv2.getRotationMatrix2D) bei gleicher Bildgröße.
+
+    Mit buffers landet das Ergebnis in einem wiederverwendeten Puffer, der beim nächsten
+    Aufruf überschrieben wird.
+    """
+    import cv2
+    h, w = page.shape[:2]
+    matrix = cv2.getRotationMatrix2D((w // 2, h // 2), angle, 1.0)
+    return cv2.warpAffine(page, matrix, (w, h), dst=_buffer(buffers, "rotated", page.shape),
+                          flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE)
+
+
+def to_bgr(page):
+    """BGR-Kopie für cv2.imwrite und Debug-Zeichnungen."""
+    import cv2
+    if page.ndim == 2:
+        return cv2.cvtColor(page, cv2.COLOR_GRAY2BGR)
+    return cv2.cvtColor(page, cv2.COLOR_RGB2BGR)
@@ -0,0 +1,105 @@
+"""
+Gemeinsame Warteschlange für Hintergrundarbeit (PDF-Verarbeitung, Export).
+
+Aufträge laufen auf einer festen Anzahl eigener Worker-Threads (JOB_WORKERS)
+statt im Threadpool der API-Requests. Niedrigere Prioritätswerte werden zuerst
+bearbeitet. Innerhalb einer Priorität kommen die Auftraggeber (owner, z. B. die
+User-ID) reihum dran, jeweils in Eingangsreihenfolge; ein Batch-Upload mit
+hunderten PDFs blockiert so nicht die Uploads anderer Nutzer.
+"""
+import logging
+import threading
+from collections import OrderedDict, deque
+
+from config import JOB_WORKERS
+
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 10
+PRIORITY_LOW = 20
+
+
+class JobQueue:
+    def __init__(self, workers):
+        self.workers = max(1, workers)
+        # _cond weckt Worker bei neuen Aufträgen, _done wartende join()-Aufrufer;
+        # getrennt, damit notify() in submit nicht einen join() statt eines Workers weckt
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._done = threading.Condition(self._lock)
+        # Priorität -> OrderedDict(owner -> deque der Aufträge); Reihenfolge der owner = Rotation
+        self._pending = {}
+        self._size = 0
+        self._unfinished = 0
+        self._threads = []
+
+    def _ensure_workers(self):
+        # Aufrufer hält _cond
+        if self._threads:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._work, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, fn, *args, priority=PRIORITY_NORMAL, kind="job", owner=None, **kwargs):
+        with self._cond:
+            self._ensure_workers()
+            owners = self._pending.setdefault(priority, OrderedDict())
+            owners.setdefault(owner, deque()).append((kind, fn, args, kwargs))
+            self._size += 1
+            self._unfinished += 1
+            self._cond.notify()
+
+    def qsize(self):
+        with self._cond:
+            return self._size
+
+    def join(self):
+        with self._cond:
+            while self._unfinished:
+                self._done.wait()
+
+    def _next_job(self):
+        # Aufrufer hält _cond
+        priority = min(self._pending)
+        owners = self._pending[priority]
+        owner, jobs = next(iter(owners.items()))
+        job = jobs.popleft()
+        if jobs:
+            owners.move_to_end(owner)
+        else:
+            del owners[owner]
+        if not owners:
+            del self._pending[priority]
+        self._size -= 1
+        return job
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._size:
+                    self._cond.wait()
+                kind, fn, args, kwargs = self._next_job()
+            try:
+                fn(*args, **kwargs)
+            except Exception:
+                logging.exception(f"Hintergrundauftrag {kind} fehlgeschlagen")
+            finally:
+                with self._cond:
+                    self._unfinished -= 1
+                    if not self._unfinished:
+                        self._done.notify_all()
+
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue(JOB_WORKERS)
+        return _job_queue
@@ -0,0 +1,143 @@
+"""
+Gruppierung von Tesseract-Wörtern zu Textboxen.
+
+Arbeitet spaltenweise auf der Ausgabe von image_to_data (Output.DICT oder die
+vorberechneten Wortdaten aus services/header_ocr.py) und liefert dieselben Boxen
+wie die ursprüngliche Schleife in get_ocr_boxes:
+
+- Wörter derselben Zeile (block_num, par_num, line_num) werden nach x sortiert.
+- Eine neue Box beginnt, wenn der Abstand zum Vorgänger größer ist als
+  max(distance_threshold, 1.5 * mittlere Wortbreite der Zeile), oder wenn die Höhe
+  um mehr als height_ratio von der Höhe des ersten Worts der Box abweicht.
+
+numpy wird erst beim ersten Aufruf geladen (schneller Start der API-Worker).
+"""
+
+
+DISTANCE_THRESHOLD = 40
+WIDTH_FACTOR = 1.5
+HEIGHT_RATIO = 0.3
+MIN_CONFIDENCE = 70
+
+
+def _confidences(conf_column):
+    import numpy as np
+    try:
+        conf = np.asarray(conf_column, dtype=np.float64)
+    except (TypeError, ValueError):
+        conf = np.array([_parse_conf(c) for c in conf_column], dtype=np.float64)
+    # Wie int(conf) in der Originalschleife: Nachkommastellen abschneiden
+    return np.trunc(conf)
+
+
+def _parse_conf(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        try:
+            return int(float(value))
+        except (TypeError, ValueError):
+            return -1
+
+
+def group_words(data, cutoff_y=None, min_confidence=MIN_CONFIDENCE,
+                distance_threshold=DISTANCE_THRESHOLD, height_ratio=HEIGHT_RATIO):
+    texts = [str(t).strip() for t in data["text"]]
+    n = len(texts)
+    if n == 0:
+        return []
+    import numpy as np
+
+    left = np.asarray(data["left"], dtype=np.int64)
+    top = np.asarray(data["top"], dtype=np.int64)
+    width = np.asarray(data["width"], dtype=np.int64)
+    height = np.asarray(data["height"], dtype=np.int64)
+    conf = _confidences(data["conf"])
+    has_text = np.fromiter((bool(t) for t in texts), dtype=bool, count=n)
+
+    mask = (conf >= min_confidence) & has_text
+    if cutoff_y is not None:
+        mask &= top <= cutoff_y
+    idx = np.flatnonzero(mask)
+    if idx.size == 0:
+        return []
+
+    # Zeilenschlüssel in Reihenfolge des ersten Auftretens nummerieren
+    keys = np.column_stack((
+        np.asarray(data["block_num"], dtype=np.int64)[idx],
+        np.asarray(data["par_num"], dtype=np.int64)[idx],
+        np.asarray(data["line_num"], dtype=np.int64)[idx],
+    ))
+    _, first_pos, inverse = np.unique(
+        keys, axis=0, return_index=True, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    line_rank = np.empty_like(first_pos)
+    line_rank[np.argsort(first_pos, kind="stable")] = np.arange(first_pos.size)
+    line_id = line_rank[inverse]
+
+    # Stabil nach Zeile, dann nach x sortieren (wie sorted(..., key=left))
+    order = np.lexsort((left[idx], line_id))
+    idx = idx[order]
+    line_id = line_id[order]
+    l = left[idx]
+    w = width[idx]
+    h = height[idx]
+
+    line_start = np.ones(idx.size, dtype=bool)
+    line_start[1:] = line_id[1:] != line_id[:-1]
+    line_starts = np.flatnonzero(line_start)
+    line_counts = np.diff(np.append(line_starts, idx.size))
+
+    # Dynamische Schwelle einmal pro Zeile statt pro Wort
+    avg_width = np.add.reduceat(w, line_starts) / line_counts
+    threshold = np.maximum(distance_threshold, WIDTH_FACTOR * avg_width)
+    threshold = np.repeat(threshold, line_counts)
+
+    gap = np.zeros(idx.size, dtype=np.int64)
+    gap[1:] = l[1:] - (l[:-1] + w[:-1])
+    gap_break = line_start | (gap > threshold)
+
+    # Der Höhenvergleich bezieht sich auf das erste Wort der laufenden Box und
+    # hängt damit von vorherigen Trennungen ab: einziger sequentieller Schritt.
+    box_start = gap_break.copy()
+    h_list = h.tolist()
+    gap_break_list = gap_break.tolist()
+    ref_h = 0
+    for pos in range(idx.size):
+        if gap_break_list[pos]:
+            ref_h = h_list[pos]
+        elif ref_h and abs(h_list[pos] - ref_h) / ref_h > height_ratio:
+            box_start[pos] = True
+            ref_h = h_list[pos]
+
+    starts = np.flatnonzero(box_start)
+    grp_left = np.minimum.reduceat(l, starts)
+    grp_top = np.minimum.reduceat(top[idx], starts)
+    grp_right = np.maximum.reduceat(l + w, starts)
+    grp_bottom = np.maximum.reduceat(top[idx] + h, starts)
+
+    ends = np.append(starts[1:], idx.size).tolist()
+    word_idx = idx.tolist()
+    boxes = []
+    for b, (s, e) in enumerate(zip(starts.tolist(), ends)):
+        boxes.append({
+            "x": int(grp_left[b]),
+            "y": int(grp_top[b]),
+            "width": int(grp_right[b] - grp_left[b]),
+            "height": int(grp_bottom[b] - grp_top[b]),
+            "text": " ".join(texts[i] for i in word_idx[s:e]),
+            "selected": False
+        })
+    return boxes
+
+
+def group_pages(pages, cutoff_ratio=None, **kwargs):
+    """Gruppiert mehrere Seiten, z. B. die vorberechnete Kopfzeilen-OCR eines Tasks.
+
+    pages: Iterable aus (page, result) mit result im Format von header_ocr.ocr_header_band.
+    """
+    grouped = {}
+    for page, result in pages:
+        cutoff_y = cutoff_ratio * result["height"] if cutoff_ratio is not None else None
+        grouped[page] = group_words(result["words"], cutoff_y=cutoff_y, **kwargs)
+    return grouped
@@ -0,0 +1,87 @@
+"""
+Metadaten pro Seite eines Tasks (<task_dir>/page_meta.json).
+
+Wird bei der PDF-Verarbeitung einmal geschrieben und nur bei manuellen
+Änderungen (z. B. /pdf_tasks/deskew) aktualisiert. Aufbau:
+    {"pages": {"1": {"rotated": false, "angle": 0.0, "edited": false}, ...}}
+Nicht gerasterte Seiten tragen zusätzlich "failed" (z. B. "timeout"), beschnittene
+Seiten (TRIM_MARGINS) "crop": {"x", "y", "width", "height"} relativ zur gerasterten Seite.
+"""
+import json
+import os
+import threading
+
+from services import storage
+from services.storage import task_dir
+
+
+_lock = threading.Lock()
+
+
+def get_page_meta_path(task_id):
+    return os.path.join(task_dir(task_id), "page_meta.json")
+
+
+def load_page_meta(task_id):
+    path = get_page_meta_path(task_id)
+    if not storage.fetch(path):
+        return {"pages": {}}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"pages": {}}
+
+
+def save_page_meta(task_id, meta):
+    path = get_page_meta_path(task_id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    storage.publish(path)
+
+
+def update_page_meta(task_id, page, **fields):
+    with _lock:
+        meta = load_page_meta(task_id)
+        entry = meta.setdefault("pages", {}).setdefault(str(int(page)), {})
+        entry.update(fields)
+        save_page_meta(task_id, meta)
+        return entry
+
+
+def get_page_entry(meta, page):
+    if not meta:
+        return None
+    return meta.get("pages", {}).get(str(int(page)))
+
+
+def page_offset(meta, page):
+    """(x, y) des Seitenbilds innerhalb der gerasterten Seite; (0, 0) ohne Beschnitt."""
+    crop = (get_page_entry(meta, page) or {}).get("crop")
+    if not crop:
+        return 0, 0
+    return crop["x"], crop["y"]
+
+
+def shift_box(box, dx, dy):
+    """Box um (dx, dy) verschoben, z. B. von der Vorlagenseite auf eine andere beschnittene Seite."""
+    return {**box, "x": int(float(box.get("x", 0))) + dx, "y": int(float(box.get("y", 0))) + dy}
+
+
+def is_page_untouched(meta, page):
+    # Nur Seiten mit Metadaten gelten als unverändert; ältere Tasks werden gerastert exportiert.
+    # Beschnittene Seiten weichen ebenfalls vom Original ab. Nicht gerasterte Seiten ("failed")
+    # liegen nur als leere Ersatzseite vor und werden daher gerade aus dem Original kopiert.
+    entry = get_page_entry(meta, page)
+    if entry is None:
+        return False
+    return not any(entry.get(field) for field in ("rotated", "edited", "crop"))
+
+
+def failed_pages(meta):
+    """Seiten, die beim Rastern fehlgeschlagen sind (Ersatzseite), aufsteigend."""
+    pages = (meta or {}).get("pages", {})
+    return sorted(int(page) for page, entry in pages.items() if entry.get("failed"))
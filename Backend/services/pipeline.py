@@ -0,0 +1,240 @@
+"""
+Verarbeitungsstufen eines PDFs unabhängig von FastAPI und Postgres.
+
+Wird von /pdf_tasks/upload (api/v1/pdf_tasks.py) und vom Kommandozeilenwerkzeug
+(cli.py) genutzt: Rastern, Schräglagenkorrektur und Ablage der Seiten als PNG
+unter pages_dir samt page_meta.json.
+
+Jede Seite wird einzeln mit POPPLER_PAGE_TIMEOUT gerastert. Hängt Poppler oder
+schlägt eine Seite fehl, wird der Prozess beendet, an ihrer Stelle eine leere
+Seite abgelegt (die Seitennummern der übrigen bleiben gleich) und die Seite in
+page_meta.json mit "failed" markiert.
+
+Nach dem Rastern bleibt jede Seite bis zum Speichern ein Array (services/imaging.py):
+Graustufen und Schwellwertbild werden einmal berechnet und von beiden
+Deskew-Schätzungen genutzt, die Arbeitspuffer werden über die Seiten hinweg
+wiederverwendet. Der Farbmodus jeder Seite (classify_color_mode) wird direkt nach
+dem Rastern bestimmt und als "color_mode" in page_meta.json vermerkt: Nur Farbseiten
+bleiben RGB, Graustufenseiten werden als L, Schwarzweißseiten nach dem Drehen als
+1-Bit-PNG gespeichert. OCR-Ausschnitte und PDF-Export lesen damit gleich die kleinere
+Fassung.
+
+Mit TRIM_MARGINS=true wird jede Seite nach dem Deskew auf ihren Tintenbereich plus
+TRIM_MARGIN_PX zugeschnitten (Nachfolger von normalize_margins im alten
+Notenscanner.py, ohne neuen weißen Rand). Der Ausschnitt steht als "crop" in
+page_meta.json; alle weiteren Koordinaten (Kopfzeilen-OCR, Boxen) beziehen sich auf
+die zugeschnittene Seite, page_meta.page_offset rechnet zwischen Seiten um.
+
+cv2, numpy und pdf2image werden erst in den Stufen selbst geladen, damit die API
+sie beim Start nicht importiert.
+"""
+import logging
+import os
+
+from PIL import Image
+
+from config import POPLER_PATH, RENDER_DPI, POPPLER_PAGE_TIMEOUT, TRIM_MARGINS, TRIM_MARGIN_PX
+from services.deskew import (
+    is_debug_process_pdf_image, deskew_min_area_rect, deskew_scikit_orientation,
+)
+from services.imaging import (
+    PageBuffers, as_array, binarize, classify_color_mode, ink_bbox, rotate, to_bgr, to_gray,
+)
+from services.page_meta import save_page_meta
+
+
+# Abstimmung der beiden Deskew-Schätzungen (Grad): bis DESKEW_AGREE_DEG Mittelwert,
+# ab DESKEW_FALLBACK_DEG Schätzung von scikit, dazwischen keine Drehung.
+# Winkel ab MAX_DESKEW_ANGLE gelten als Fehlerkennung.
+DESKEW_AGREE_DEG = 0.6
+DESKEW_FALLBACK_DEG = 1.5
+MAX_DESKEW_ANGLE = 20
+# Größe der Ersatzseite, solange noch keine Seite erfolgreich gerastert wurde
+A4_INCHES = (8.27, 11.69)
+
+
+def is_margin_trim_enabled():
+    return TRIM_MARGINS
+
+
+def choose_deskew_angle(angle_min_area, angle_scikit, log_debug=None,
+                        agree_deg=DESKEW_AGREE_DEG, fallback_deg=DESKEW_FALLBACK_DEG):
+    angle_diff = abs(angle_min_area - angle_scikit)
+    if log_debug:
+        log_debug("")
+        log_debug(f"Winkel-Differenz: {angle_diff:.2f}°")
+
+    angle_to_apply = 0.0
+    if angle_diff <= agree_deg:
+        angle_to_apply = (angle_min_area + angle_scikit) / 2.0
+        if log_debug:
+            log_debug(
+                f"Winkel sind ähnlich, Mittelwert wird verwendet {angle_to_apply}°")
+    else:
+        if angle_diff >= fallback_deg:
+            angle_to_apply = angle_scikit
+            if log_debug:
+                log_debug(
+                    f"Winkel weichen um > 1.5 ab, deshalb wird Winkel scikit verwendet {angle_to_apply}°")
+        else:
+            if log_debug:
+                log_debug(
+                    "Winkel weichen zu stark ab, deshalb auf 0.0° gesetzt")
+    return angle_to_apply
+
+
+def prepare_page(img, buffers=None):
+    """Übernimmt die gerasterte Seite als Array und bestimmt ihren Farbmodus.
+
+    Liefert (Seite, Graustufen, Farbmodus); außer bei Farbseiten ist die Seite
+    dasselbe Array wie die Graustufen.
+    """
+    page = as_array(img)
+    gray = to_gray(page, buffers)
+    color_mode = classify_color_mode(page, gray)
+    if color_mode != "color":
+        page = gray
+    return page, gray, color_mode
+
+
+def trim_margins(page, margin=TRIM_MARGIN_PX, buffers=None):
+    """Liefert (Ausschnitt der Seite, Eintrag "crop" oder None, wenn nichts abfällt).
+
+    Der Ausschnitt ist eine Sicht auf page; leere Seiten bleiben unverändert.
+    """
+    bbox = ink_bbox(to_gray(page, buffers), buffers)
+    if bbox is None:
+        return page, None
+    height, width = page.shape[:2]
+    left, top, right, bottom = bbox
+    left, top = max(0, left - margin), max(0, top - margin)
+    right, bottom = min(width, right + margin), min(height, bottom + margin)
+    if (left, top, right, bottom) == (0, 0, width, height):
+        return page, None
+    crop = {"x": left, "y": top, "width": right - left, "height": bottom - top}
+    return page[top:bottom, left:right], crop
+
+
+def page_image(page, color_mode):
+    """PIL-Bild zum Speichern; Schwarzweißseiten werden erst hier (nach dem Drehen)
+    auf 1 Bit gebracht, damit die Interpolation beim Drehen keine Treppen erzeugt."""
+    # fromarray teilt bei Graustufen den Speicher des Arrays
+    image = Image.fromarray(page)
+    if color_mode == "bilevel":
+        return image.convert("1", dither=Image.Dither.NONE)
+    return image
+
+
+def deskew_image(img, optpages_dir, page_num_str, log_debug=None, buffers=None, gray=None):
+    """Liefert (ggf. gedrehte Seite als Array, Eintrag für page_meta.json).
+
+    img ist ein Array aus prepare_page (oder ein PIL-Bild). Mit buffers kann die
+    gedrehte Seite in einem Puffer liegen, der bei der nächsten Seite überschrieben wird.
+    """
+    page = as_array(img)
+    thresh = binarize(gray if gray is not None else to_gray(page, buffers), buffers)
+    angle_min_area = deskew_min_area_rect(
+        page, optpages_dir, page_num_str, log_debug, thresh=thresh)
+    if log_debug:
+        log_debug(f"deskew_min_area_rect: Winkel = {angle_min_area}°")
+    angle_scikit = deskew_scikit_orientation(
+        page, optpages_dir, page_num_str, log_debug, thresh=thresh)
+    if log_debug:
+        log_debug(
+            f"deskew_scikit_orientation: Winkel = {angle_scikit}°")
+
+    angle_to_apply = choose_deskew_angle(angle_min_area, angle_scikit, log_debug)
+
+    rotated_page = bool(angle_to_apply != 0.0 and abs(angle_to_apply) < MAX_DESKEW_ANGLE)
+    meta = {
+        "rotated": rotated_page,
+        "angle": float(angle_to_apply) if rotated_page else 0.0,
+        "edited": False
+    }
+    if rotated_page:
+        if log_debug:
+            log_debug(
+                f"Rotation wird durchgeführt mit Mittelwert: {angle_to_apply:.2f}°")
+        page = rotate(page, angle_to_apply, buffers)
+        if is_debug_process_pdf_image():
+            import cv2
+            cv2.imwrite(os.path.join(
+                optpages_dir, f"page_{page_num_str}_5_rotated.png"), to_bgr(page))
+    else:
+        if log_debug:
+            log_debug(
+                f"Winkel {angle_to_apply}° > 20° keine Rotation.")
+    return page, meta
+
+
+def render_pages(task_id, pdf_path, pages_dir, optpages_dir=None, log_debug=None):
+    """Rastert das PDF Seite für Seite, korrigiert jede Seite und speichert sie als PNG.
+
+    Liefert die Seitenzahl; page_meta.json wird nach der letzten Seite geschrieben.
+    """
+    from pdf2image import convert_from_path, pdfinfo_from_path
+    from pdf2image.exceptions import PDFPopplerTimeoutError
+    timeout = POPPLER_PAGE_TIMEOUT or None
+    num_pages = pdfinfo_from_path(pdf_path, poppler_path=POPLER_PATH, timeout=timeout)["Pages"]
+    page_meta = {"dpi": RENDER_DPI, "pages": {}}
+    if log_debug:
+        log_debug(f"PDF has {num_pages} pages.")
+
+    page_size = (int(A4_INCHES[0] * RENDER_DPI), int(A4_INCHES[1] * RENDER_DPI))
+    buffers = PageBuffers()
+    for i in range(num_pages):
+        if log_debug:
+            log_debug(
+                f"------------------ Processing page {i+1} --------------------")
+        page_num_str = str(i+1).zfill(5)
+        page_path = os.path.join(pages_dir, f"{task_id}_page_{page_num_str}.png")
+
+        # pdf2image beendet Poppler beim Zeitlimit selbst; die übrigen Seiten laufen weiter
+        failed = None
+        try:
+            img = convert_from_path(
+                pdf_path, dpi=RENDER_DPI, poppler_path=POPLER_PATH,
+                first_page=i+1, last_page=i+1, timeout=timeout)[0]
+        except PDFPopplerTimeoutError:
+            failed = "timeout"
+        except Exception as e:
+            failed = str(e) or type(e).__name__
+        if failed:
+            logging.warning(f"Task {task_id}, Seite {i+1} nicht gerastert: {failed}")
+            if log_debug:
+                log_debug(f"Page {i+1} failed: {failed}")
+            with Image.new("L", page_size, "white") as placeholder:
+                placeholder.save(page_path, "PNG")
+            page_meta["pages"][str(i+1)] = {
+                "rotated": False, "angle": 0.0, "edited": False, "color_mode": "gray",
+                "failed": failed}
+            continue
+        page_size = img.size
+        page, gray, color_mode = prepare_page(img, buffers)
+        img.close()
+        if log_debug:
+            log_debug(f"Farbmodus: {color_mode}")
+
+        if is_debug_process_pdf_image():
+            import cv2
+            cv2.imwrite(os.path.join(
+                optpages_dir, f"page_{page_num_str}_0_origin.png"), to_bgr(page))
+
+        page, meta = deskew_image(page, optpages_dir, page_num_str, log_debug, buffers, gray)
+        meta["color_mode"] = color_mode
+        if is_margin_trim_enabled():
+            page, crop = trim_margins(page, buffers=buffers)
+            if crop:
+                meta["crop"] = crop
+                if log_debug:
+                    log_debug(f"Rand beschnitten: {crop}")
+        page_meta["pages"][str(i+1)] = meta
+
+        with page_image(page, color_mode) as image:
+            image.save(page_path, "PNG")
+
+        if log_debug:
+            log_debug(
+                f"Page {i+1} saved as {task_id}_page_{page_num_str}.png")
+    save_page_meta(task_id, page_meta)
+    return num_pages
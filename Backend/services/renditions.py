@@ -0,0 +1,210 @@
+"""
+Verkleinerte, neu kodierte Seitenbilder für die Seitenansicht.
+
+Eine Ausgabe (Rendition) wird durch Seite, Version des Seitenbilds (storage.version),
+Breite und Format bestimmt; nach /pdf_tasks/deskew ändert sich die Version und damit
+der Schlüssel. Fertige Renditions liegen in einem LRU-Cache im Speicher
+(RENDITION_CACHE_MEMORY_MB) und auf der Platte (RENDITION_CACHE_DIR,
+RENDITION_CACHE_DISK_MB). Gleichzeitige Anfragen nach derselben Rendition warten auf
+die erste, das Seitenbild wird nur einmal dekodiert.
+"""
+import hashlib
+import logging
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future
+from io import BytesIO
+
+from PIL import Image
+
+from config import (
+    RENDITION_CACHE_MEMORY_MB, RENDITION_CACHE_DISK_MB, RENDITION_CACHE_DIR, RENDITION_QUALITY,
+)
+from services import storage
+from services.tracing import span
+
+
+FORMATS = {"webp": "image/webp", "jpeg": "image/jpeg", "png": "image/png"}
+MIN_WIDTH = 16
+
+
+def encode_rendition(source_path, width, fmt):
+    """Verkleinert das Seitenbild auf width (nie vergrößern) und kodiert es als fmt."""
+    with Image.open(source_path) as image:
+        if image.mode == "1":
+            # Schwarzweißseiten: 1 Bit würde nur mit NEAREST verkleinert und WebP kennt es nicht
+            image = image.convert("L")
+        if width and width < image.width:
+            height = max(1, round(image.height * width / image.width))
+            # reducing_gap: erst grob per reduce() verkleinern, dann fein filtern
+            resized = image.resize((width, height), Image.LANCZOS, reducing_gap=3.0)
+        else:
+            image.load()
+            resized = image.copy()
+    try:
+        if fmt == "jpeg" and resized.mode not in ("RGB", "L"):
+            resized = resized.convert("RGB")
+        buf = BytesIO()
+        if fmt == "png":
+            resized.save(buf, "PNG", optimize=False)
+        elif fmt == "webp":
+            resized.save(buf, "WEBP", quality=RENDITION_QUALITY, method=4)
+        else:
+            resized.save(buf, "JPEG", quality=RENDITION_QUALITY, optimize=True)
+        return buf.getvalue()
+    finally:
+        resized.close()
+
+
+class RenditionCache:
+    def __init__(self, directory, memory_bytes, disk_bytes):
+        self.directory = directory
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        # Dateiname -> Größe in LRU-Reihenfolge; beim ersten Zugriff aus dem Verzeichnis gelesen
+        self._disk = None
+        self._disk_size = 0
+        self._inflight = {}
+
+    def _disk_index(self):
+        # Aufrufer hält _lock
+        if self._disk is None:
+            self._disk = OrderedDict()
+            entries = []
+            if os.path.isdir(self.directory):
+                for name in os.listdir(self.directory):
+                    if name.endswith(".tmp"):
+                        continue
+                    st = os.stat(os.path.join(self.directory, name))
+                    entries.append((st.st_mtime, name, st.st_size))
+            for _, name, size in sorted(entries):
+                self._disk[name] = size
+                self._disk_size += size
+        return self._disk
+
+    def _remember(self, name, data):
+        # Aufrufer hält _lock
+        if len(data) > self.memory_bytes:
+            return
+        if name in self._memory:
+            self._memory_size -= len(self._memory.pop(name))
+        self._memory[name] = data
+        self._memory_size += len(data)
+        while self._memory_size > self.memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+
+    def _get(self, name):
+        with self._lock:
+            data = self._memory.get(name)
+            if data is not None:
+                self._memory.move_to_end(name)
+                return data
+            disk = self._disk_index()
+            if name not in disk:
+                return None
+            disk.move_to_end(name)
+        path = os.path.join(self.directory, name)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self._disk_size -= self._disk.pop(name, 0)
+            return None
+        with self._lock:
+            self._remember(name, data)
+        return data
+
+    def _put(self, name, data):
+        with self._lock:
+            self._remember(name, data)
+        if len(data) > self.disk_bytes:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, name)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        evicted = []
+        with self._lock:
+            disk = self._disk_index()
+            self._disk_size -= disk.pop(name, 0)
+            disk[name] = len(data)
+            self._disk_size += len(data)
+            while self._disk_size > self.disk_bytes:
+                old_name, size = disk.popitem(last=False)
+                self._disk_size -= size
+                evicted.append(old_name)
+        for old_name in evicted:
+            try:
+                os.remove(os.path.join(self.directory, old_name))
+            except FileNotFoundError:
+                pass
+
+    def get_or_create(self, key, create):
+        """Liefert die Bytes zu key; create() läuft pro key höchstens einmal gleichzeitig."""
+        name = hashlib.sha256(repr(key).encode("utf-8")).hexdigest()[:32]
+        data = self._get(name)
+        if data is not None:
+            return data
+        with self._lock:
+            future = self._inflight.get(name)
+            owner = future is None
+            if owner:
+                future = self._inflight[name] = Future()
+        if not owner:
+            return future.result()
+        try:
+            data = create()
+            try:
+                self._put(name, data)
+            except OSError:
+                logging.exception(f"Rendition {name} konnte nicht abgelegt werden")
+            future.set_result(data)
+            return data
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(name, None)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_rendition_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = RenditionCache(RENDITION_CACHE_DIR, RENDITION_CACHE_MEMORY_MB * 2**20,
+                                    RENDITION_CACHE_DISK_MB * 2**20)
+        return _cache
+
+
+def page_version(image_path):
+    """Version des Seitenbilds in der Ablage, None wenn es fehlt."""
+    info = storage.get_storage().stat(storage.storage_key(image_path))
+    if info is None:
+        return None
+    return storage.version(info["size"], info["mtime"])
+
+
+def get_page_rendition(image_path, source_version, width, fmt):
+    def create():
+        with span("rendition.encode", width=width, format=fmt):
+            if not storage.fetch(image_path):
+                raise FileNotFoundError(image_path)
+            return encode_rendition(image_path, width, fmt)
+
+    key = (storage.storage_key(image_path), source_version, width, fmt)
+    return get_rendition_cache().get_or_create(key, create)
@@ -0,0 +1,171 @@
+"""
+Spekulatives Vorrendern der Stimmen-PDFs nach /ocr/voices (optional).
+
+Mit SPECULATIVE_EXPORT=true werden nach der Stimmenerkennung die PDFs der
+erkannten Stimmen mit niedriger Priorität über die gemeinsame Warteschlange
+erzeugt (Modus "auto", Standardprofil) und unter <task_dir>/speculative/
+abgelegt. Die PDFs hängen nur vom Seitenbereich ab, nicht von Titel oder
+Metadaten, und werden von den Split-Endpunkten übernommen.
+
+Fragt ein Export einen Bereich an, der nicht erkannt wurde (Bereiche bearbeitet),
+oder haben sich die Seiten geändert, wird die Spekulation verworfen.
+Pro Auftrag wird nur eine Stimme erzeugt, danach reiht sich die Spekulation
+erneut ein, damit PDF-Verarbeitung und Exporte der Nutzer Vorrang haben.
+"""
+import json
+import logging
+import os
+import shutil
+import threading
+import uuid
+
+from config import SPECULATIVE_EXPORT
+from services.export_cache import pages_signature
+from services.job_queue import get_job_queue, PRIORITY_LOW
+from services.storage import task_dir
+from services.voice_export import (
+    list_page_files, compute_voice_ranges, make_export_profile, write_voice,
+)
+
+
+SPECULATIVE_EXPORT_MODE = "auto"
+MANIFEST_NAME = "manifest.json"
+
+_lock = threading.Lock()
+# Laufende Spekulation pro Task; ältere Aufträge beenden sich bei abweichender Generation
+_generations = {}
+
+
+def is_speculative_export_enabled():
+    return SPECULATIVE_EXPORT
+
+
+def get_speculative_dir(task_id):
+    return os.path.join(task_dir(task_id), "speculative")
+
+
+def _voice_filename(start, end):
+    return f"{start}-{end}.pdf"
+
+
+def _load_manifest(task_id):
+    path = os.path.join(get_speculative_dir(task_id), MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _save_manifest(task_id, manifest):
+    spec_dir = get_speculative_dir(task_id)
+    os.makedirs(spec_dir, exist_ok=True)
+    path = os.path.join(spec_dir, MANIFEST_NAME)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def _discard(task_id):
+    # Aufrufer hält _lock
+    _generations[task_id] = _generations.get(task_id, 0) + 1
+    shutil.rmtree(get_speculative_dir(task_id), ignore_errors=True)
+
+
+def discard_speculative_export(task_id):
+    with _lock:
+        _discard(task_id)
+
+
+def start_speculative_export(task_id, voice_starts):
+    page_files = list_page_files(task_id)
+    voices_ranges = compute_voice_ranges(voice_starts, len(page_files))
+    ranges = [[start, end] for start, end, _ in voices_ranges if page_files[start:end+1]]
+    if not ranges:
+        return
+    pages_sig = pages_signature(task_id, page_files)
+    profile = make_export_profile()
+    with _lock:
+        manifest = _load_manifest(task_id)
+        unchanged = manifest is not None and manifest.get("pages_signature") == pages_sig \
+            and manifest.get("ranges") == ranges
+        if not unchanged:
+            _discard(task_id)
+            _save_manifest(task_id, {
+                "pages_signature": pages_sig,
+                "export_mode": SPECULATIVE_EXPORT_MODE,
+                "profile": profile,
+                "ranges": ranges,
+                "voices": [],
+            })
+        else:
+            _generations[task_id] = _generations.get(task_id, 0) + 1
+        generation = _generations[task_id]
+    get_job_queue().submit(_render_next_voice, task_id, generation, page_files,
+                           priority=PRIORITY_LOW, kind="speculative_export")
+
+
+def _render_next_voice(task_id, generation, page_files):
+    with _lock:
+        if _generations.get(task_id) != generation:
+            return
+        manifest = _load_manifest(task_id)
+        if manifest is None:
+            return
+        pending = [(start, end) for start, end in manifest["ranges"]
+                   if _voice_filename(start, end) not in manifest["voices"]]
+    if not pending:
+        return
+
+    start, end = pending[0]
+    path = os.path.join(get_speculative_dir(task_id), _voice_filename(start, end))
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            write_voice(task_id, page_files, start, end, f,
+                        manifest["export_mode"], profile=manifest["profile"])
+        with _lock:
+            current = _load_manifest(task_id)
+            if _generations.get(task_id) != generation or current is None:
+                return
+            os.replace(tmp_path, path)
+            current["voices"].append(_voice_filename(start, end))
+            _save_manifest(task_id, current)
+    except Exception:
+        logging.exception(f"Spekulativer Export für Task {task_id} fehlgeschlagen")
+        return
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    if len(pending) > 1:
+        get_job_queue().submit(_render_next_voice, task_id, generation, page_files,
+                               priority=PRIORITY_LOW, kind="speculative_export")
+
+
+def take_prerendered(task_id, voices_ranges, export_mode, profile, pages_sig):
+    """Liefert vorgerenderte PDFs {(start, end): Pfad} für einen Export.
+
+    Bereiche, die nicht erkannt wurden, gelten als bearbeitet und verwerfen die
+    Spekulation; einzelne Stimmen aus den erkannten Bereichen bleiben nutzbar.
+    """
+    with _lock:
+        manifest = _load_manifest(task_id)
+        if manifest is None:
+            return {}
+        speculated = {tuple(r) for r in manifest["ranges"]}
+        requested = {(start, end) for start, end, _ in voices_ranges}
+        if manifest.get("pages_signature") != pages_sig or not requested <= speculated:
+            _discard(task_id)
+            return {}
+        if export_mode != manifest["export_mode"] or profile != manifest["profile"]:
+            return {}
+        spec_dir = get_speculative_dir(task_id)
+        done = set(manifest["voices"])
+        return {
+            (start, end): os.path.join(spec_dir, _voice_filename(start, end))
+            for start, end in requested if _voice_filename(start, end) in done
+        }
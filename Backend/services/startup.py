@@ -0,0 +1,34 @@
+"""
+Startzeit der API und schwere Importe.
+
+Bild- und OCR-Bibliotheken (HEAVY_MODULES) werden in den Diensten erst bei der
+ersten Verwendung importiert. log_startup_report prüft nach dem Aufbau der App,
+ob das so bleibt, und protokolliert die Startzeit; liegt sie über
+STARTUP_BUDGET_SECONDS, wird gewarnt. benchmarks/bench_startup.py misst dasselbe
+in einem frischen Interpreter und schlägt bei Überschreitung fehl.
+"""
+import logging
+import sys
+import time
+
+from config import STARTUP_BUDGET_SECONDS
+
+
+# numpy fehlt bewusst: Pillow 10 lädt es bereits beim Import von PIL.Image (PIL._typing).
+# Die Dienste importieren numpy trotzdem erst bei Bedarf, ab Pillow 11 entfällt es beim Start.
+HEAVY_MODULES = ("cv2", "scipy", "skimage", "pdf2image", "pytesseract")
+
+
+def loaded_heavy_modules():
+    return [name for name in HEAVY_MODULES if name in sys.modules]
+
+
+def log_startup_report(started_at, budget=STARTUP_BUDGET_SECONDS):
+    seconds = time.perf_counter() - started_at
+    heavy = loaded_heavy_modules()
+    logging.info(f"API gestartet in {seconds:.2f} s")
+    if heavy:
+        logging.warning(f"Beim Start geladen, obwohl erst bei Bedarf nötig: {', '.join(heavy)}")
+    if seconds > budget:
+        logging.warning(f"Startzeit {seconds:.2f} s über dem Budget von {budget:.2f} s")
+    return seconds
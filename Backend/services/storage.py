@@ -0,0 +1,356 @@
+"""
+Ablage der Task-Artefakte (original.pdf, Seiten, page_meta.json, Kopfzeilen-OCR, Exporte).
+
+Verarbeitung und Endpunkte arbeiten auf lokalen Dateien unter task_dir(task_id).
+STORAGE_LAYOUT=sharded verteilt die Task-Verzeichnisse auf STATIC_DIR/<aa>/<bb>/<task_id>/
+(aa, bb aus sha1(task_id)), damit kein Verzeichnis zehntausende Einträge bekommt; Tasks
+im flachen Layout (STATIC_DIR/<task_id>/) werden weiterhin gefunden.
+
+STORAGE_BACKEND wählt die gemeinsame Ablage:
+    local (Standard)  die lokalen Dateien sind die Ablage, publish/fetch tun nichts
+    s3                S3-kompatibler Objektspeicher (STORAGE_S3_BUCKET, STORAGE_S3_PREFIX,
+                      STORAGE_S3_ENDPOINT_URL z. B. für MinIO), benötigt boto3
+
+Beim Objektspeicher legen schreibende Stufen fertige Dateien mit publish() ab, lesende
+holen fehlende oder veraltete mit fetch()/fetch_dir() in die lokale Arbeitskopie. So
+teilen sich mehrere API- und Worker-Knoten eine Ablage. Der Objektschlüssel ist der Pfad
+relativ zu STATIC_DIR; static_url() liefert die URL unter /static, die api/static_files.py
+(gestreamt, mit Range-Anfragen) ausliefert. versioned_url() hängt die Version der Datei
+(aus Größe und Änderungszeit) als ?v= an; solche URLs dürfen unbegrenzt gecacht werden,
+weil jedes Überschreiben (z. B. /pdf_tasks/deskew) eine neue URL ergibt.
+
+Schlüssel aus Anfragen werden mit is_safe_key geprüft; LocalStorage lehnt zusätzlich
+jeden Schlüssel mit ValueError ab, dessen aufgelöster Pfad (auch über Backslashes,
+Laufwerksangaben oder symbolische Links) außerhalb von STATIC_DIR liegt.
+"""
+import hashlib
+import ntpath
+import os
+import shutil
+import threading
+import uuid
+from urllib.parse import quote
+
+from config import (
+    STATIC_DIR, STORAGE_BACKEND, STORAGE_LAYOUT, STORAGE_S3_BUCKET, STORAGE_S3_PREFIX,
+    STORAGE_S3_ENDPOINT_URL,
+)
+
+
+CHUNK_SIZE = 256 * 1024
+
+
+def is_safe_key(key):
+    """False für leere Schlüssel, "..", Backslashes, Laufwerksangaben und absolute Pfade."""
+    if not key or key.startswith("/") or "\\" in key or "\0" in key or ntpath.splitdrive(key)[0]:
+        return False
+    return ".." not in key.split("/")
+
+
+class LocalStorage:
+    remote = False
+
+    def __init__(self, root):
+        self.root = root
+        self._real_root = os.path.realpath(root)
+
+    def _path(self, key):
+        path = os.path.join(self.root, *key.split("/"))
+        resolved = os.path.realpath(path)
+        if os.path.commonpath([self._real_root, resolved]) != self._real_root:
+            raise ValueError(f"Schlüssel außerhalb der Ablage: {key!r}")
+        return path
+
+    def stat(self, key):
+        try:
+            st = os.stat(self._path(key))
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        if not os.path.isfile(self._path(key)):
+            return None
+        return {"size": st.st_size, "mtime": st.st_mtime}
+
+    def iter_range(self, key, start=0, end=None, chunk_size=CHUNK_SIZE):
+        """Liefert die Bytes start..end (einschließlich) in Blöcken."""
+        with open(self._path(key), "rb") as f:
+            f.seek(start)
+            remaining = None if end is None else end - start + 1
+            while remaining is None or remaining > 0:
+                chunk = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+    def list(self, prefix):
+        # Schlüssel -> (Größe, mtime)
+        result = {}
+        for root, _, files in os.walk(self._path(prefix.rstrip("/"))):
+            for name in files:
+                path = os.path.join(root, name)
+                st = os.stat(path)
+                key = os.path.relpath(path, self.root).replace(os.sep, "/")
+                result[key] = (st.st_size, st.st_mtime)
+        return result
+
+    # Die lokalen Dateien sind bereits die Ablage
+    def upload(self, key, path):
+        return None
+
+    def download(self, key, path):
+        return os.path.exists(path)
+
+    def delete(self, key):
+        return None
+
+    def delete_prefix(self, prefix):
+        return None
+
+
+class S3Storage:
+    remote = True
+
+    def __init__(self, bucket, prefix="", endpoint_url=None, client=None):
+        if client is None:
+            try:
+                import boto3
+            except ImportError:
+                raise RuntimeError("STORAGE_BACKEND=s3 benötigt boto3 (pip install boto3)")
+            client = boto3.client("s3", endpoint_url=endpoint_url)
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.strip("/") + "/" if prefix.strip("/") else ""
+
+    def _key(self, key):
+        return f"{self.prefix}{key}"
+
+    @staticmethod
+    def _is_missing(error):
+        return error.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound")
+
+    def stat(self, key):
+        from botocore.exceptions import ClientError
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+        except ClientError as e:
+            if self._is_missing(e):
+                return None
+            raise
+        return {"size": head["ContentLength"], "mtime": head["LastModified"].timestamp()}
+
+    def iter_range(self, key, start=0, end=None, chunk_size=CHUNK_SIZE):
+        """Liefert die Bytes start..end (einschließlich) in Blöcken."""
+        kwargs = {}
+        if start or end is not None:
+            kwargs["Range"] = f"bytes={start}-{'' if end is None else end}"
+        body = self.client.get_object(Bucket=self.bucket, Key=self._key(key), **kwargs)["Body"]
+        try:
+            yield from body.iter_chunks(chunk_size)
+        finally:
+            body.close()
+
+    def list(self, prefix):
+        # Schlüssel -> (Größe, mtime)
+        result = {}
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self._key(prefix)):
+            for obj in page.get("Contents", []):
+                key = obj["Key"][len(self.prefix):]
+                result[key] = (obj["Size"], obj["LastModified"].timestamp())
+        return result
+
+    def upload(self, key, path):
+        """Lädt die Datei hoch und liefert die mtime des Objekts."""
+        self.client.upload_file(path, self.bucket, self._key(key))
+        return self.stat(key)["mtime"]
+
+    def download(self, key, path):
+        from botocore.exceptions import ClientError
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            self.client.download_file(self.bucket, self._key(key), tmp_path)
+        except ClientError as e:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            if self._is_missing(e):
+                return False
+            raise
+        os.replace(tmp_path, path)
+        return True
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+    def delete_prefix(self, prefix):
+        keys = [self._key(key) for key in self.list(prefix)]
+        for i in range(0, len(keys), 1000):
+            self.client.delete_objects(Bucket=self.bucket, Delete={
+                "Objects": [{"Key": key} for key in keys[i:i + 1000]], "Quiet": True})
+
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_storage():
+    global _storage
+    with _storage_lock:
+        if _storage is None:
+            if STORAGE_BACKEND == "s3":
+                if not STORAGE_S3_BUCKET:
+                    raise RuntimeError("STORAGE_BACKEND=s3 benötigt STORAGE_S3_BUCKET")
+                _storage = S3Storage(STORAGE_S3_BUCKET, STORAGE_S3_PREFIX, STORAGE_S3_ENDPOINT_URL)
+            else:
+                _storage = LocalStorage(STATIC_DIR)
+        return _storage
+
+
+def task_dir(task_id):
+    """Lokales Verzeichnis des Tasks (Arbeitskopie beim Objektspeicher)."""
+    if STORAGE_LAYOUT != "sharded":
+        return os.path.join(STATIC_DIR, task_id)
+    digest = hashlib.sha1(task_id.encode("utf-8")).hexdigest()
+    path = os.path.join(STATIC_DIR, digest[:2], digest[2:4], task_id)
+    legacy = os.path.join(STATIC_DIR, task_id)
+    if not os.path.isdir(path) and os.path.isdir(legacy):
+        return legacy
+    return path
+
+
+def storage_key(path):
+    return os.path.relpath(path, STATIC_DIR).replace(os.sep, "/")
+
+
+def static_url(path):
+    return "/static/" + quote(storage_key(path))
+
+
+def version(size, mtime):
+    """Kurzer Versionsschlüssel einer Datei; ändert sich bei jedem Überschreiben."""
+    return hashlib.sha1(f"{size}:{mtime!r}".encode("utf-8")).hexdigest()[:16]
+
+
+def versioned_url(path, file_version=None):
+    """static_url mit ?v=<Version>; ohne Version (Datei fehlt) die unversionierte URL."""
+    if file_version is None:
+        info = get_storage().stat(storage_key(path))
+        if info is not None:
+            file_version = version(info["size"], info["mtime"])
+    url = static_url(path)
+    return f"{url}?v={file_version}" if file_version else url
+
+
+def _set_mtime(path, mtime):
+    # Lokale Kopie trägt die mtime des Objekts, damit fetch sie als aktuell erkennt
+    os.utime(path, (mtime, mtime))
+
+
+def _is_current(path, size, mtime):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return False
+    return st.st_size == size and st.st_mtime >= mtime
+
+
+def publish(*paths):
+    """Legt fertig geschriebene lokale Dateien in der gemeinsamen Ablage ab."""
+    storage = get_storage()
+    if not storage.remote:
+        return
+    for path in paths:
+        _set_mtime(path, storage.upload(storage_key(path), path))
+
+
+def publish_dir(directory):
+    if not get_storage().remote or not os.path.isdir(directory):
+        return
+    for root, _, files in os.walk(directory):
+        publish(*(os.path.join(root, name) for name in files if not name.endswith(".tmp")))
+
+
+def fetch(path):
+    """Stellt sicher, dass die lokale Datei dem Stand der Ablage entspricht; False, wenn es sie nicht gibt."""
+    storage = get_storage()
+    if not storage.remote:
+        return os.path.exists(path)
+    info = storage.stat(storage_key(path))
+    if info is None:
+        return os.path.exists(path)
+    if not _is_current(path, info["size"], info["mtime"]):
+        if not storage.download(storage_key(path), path):
+            return False
+        _set_mtime(path, info["mtime"])
+    return True
+
+
+def fetch_dir(directory):
+    """Holt alle Dateien unterhalb des Verzeichnisses, die lokal fehlen oder veraltet sind."""
+    storage = get_storage()
+    if not storage.remote:
+        return
+    for key, (size, mtime) in storage.list(storage_key(directory) + "/").items():
+        path = os.path.join(STATIC_DIR, *key.split("/"))
+        if not _is_current(path, size, mtime) and storage.download(key, path):
+            _set_mtime(path, mtime)
+
+
+def list_dir(directory):
+    """{Dateiname: Version} direkt im Verzeichnis, bei Objektspeicher ohne Herunterladen."""
+    prefix = storage_key(directory) + "/"
+    files = {}
+    for key, (size, mtime) in get_storage().list(prefix).items():
+        name = key[len(prefix):]
+        if "/" not in name:
+            files[name] = version(size, mtime)
+    return files
+
+
+def exists(path):
+    if os.path.exists(path):
+        return True
+    storage = get_storage()
+    return storage.remote and storage.stat(storage_key(path)) is not None
+
+
+def remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    storage = get_storage()
+    if storage.remote:
+        storage.delete(storage_key(path))
+
+
+def remove_dir(directory):
+    shutil.rmtree(directory, ignore_errors=True)
+    storage = get_storage()
+    if storage.remote:
+        storage.delete_prefix(storage_key(directory) + "/")
+
+
+def parse_range(header, size):
+    """Wertet einen Range-Header mit einem Bereich aus; liefert (start, end) bzw. None für die ganze Datei.
+
+    Wirft ValueError, wenn der Bereich nicht erfüllbar ist (HTTP 416).
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, _, last = header[len("bytes="):].strip().partition("-")
+    try:
+        if first == "":
+            # Suffix: die letzten n Bytes
+            length = int(last)
+            if length <= 0:
+                raise ValueError(header)
+            return max(0, size - length), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        raise ValueError(header)
+    if start >= size or end < start:
+        raise ValueError(header)
+    return start, min(end, size - 1)
@@ -0,0 +1,43 @@
+"""
+Zugriff auf pytesseract erst beim ersten OCR-Aufruf.
+
+API-Worker, die nur Tasklisten oder statische Dateien ausliefern, laden pytesseract
+(und damit numpy) so nie; der Pfad zur Tesseract-Binary wird beim ersten Zugriff
+aus TESSERACT_CMD gesetzt.
+
+image_to_string/image_to_data laufen mit TESSERACT_TIMEOUT: pytesseract beendet
+den Tesseract-Prozess nach Ablauf, hier wird daraus TesseractTimeout.
+"""
+from config import TESSERACT_CMD, TESSERACT_TIMEOUT
+
+
+class TesseractTimeout(RuntimeError):
+    pass
+
+
+def get_pytesseract():
+    import pytesseract
+    pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
+    return pytesseract
+
+
+def _run(fn, image, **kwargs):
+    kwargs.setdefault("timeout", TESSERACT_TIMEOUT)
+    try:
+        return fn(image, **kwargs)
+    except RuntimeError as e:
+        # pytesseract meldet das Zeitlimit nur über den Text der Exception
+        if str(e) == "Tesseract process timeout":
+            raise TesseractTimeout(
+                f"Tesseract nach {kwargs['timeout']} s abgebrochen") from e
+        raise
+
+
+def image_to_string(image, **kwargs):
+    return _run(get_pytesseract().image_to_string, image, **kwargs)
+
+
+def image_to_data(image, **kwargs):
+    pytesseract = get_pytesseract()
+    kwargs.setdefault("output_type", pytesseract.Output.DICT)
+    return _run(pytesseract.image_to_data, image, **kwargs)
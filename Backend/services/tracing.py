@@ -0,0 +1,233 @@
+"""
+Leichtgewichtiges Request-Tracing.
+
+TracingMiddleware legt pro Request einen Wurzel-Span an (Methode und Routen-
+Vorlage, z. B. "POST /api/v1/ocr/voices"); innerhalb der Router werden mit
+span("...") verschachtelte Spans für Bild laden, OCR, Box-Speicher und
+DB-Abfragen erfasst. Der aktuelle Span wird über contextvars weitergereicht und
+ist damit auch in synchronen Endpunkten im Threadpool verfügbar.
+
+Abgeschlossene Traces landen in einem Zeitfenster pro Route bzw. Span-Namen
+(TRACE_WINDOW Einträge) für die p50/p95/p99-Auswertung (/tracing/summary) und
+werden optional exportiert (TRACE_EXPORT):
+    file:<pfad>    eine JSON-Zeile pro Trace
+    http(s)://...  Traces gesammelt als JSON-Liste per POST an einen Collector
+"""
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import queue
+import threading
+import time
+import urllib.request
+import uuid
+from collections import deque
+from contextlib import contextmanager
+
+from config import TRACE_WINDOW, TRACE_EXPORT
+
+
+# Traces pro POST an einen HTTP-Collector
+TRACE_EXPORT_BATCH = 50
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "attrs", "start", "duration", "trace")
+
+    def __init__(self, name, parent=None, **attrs):
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.name = name
+        self.attrs = attrs
+        self.start = time.time()
+        self.duration = None
+        # Alle Spans eines Traces, geteilt über Threads hinweg
+        self.trace = parent.trace if parent else []
+        self.trace.append(self)
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": round(self.duration * 1000, 3) if self.duration is not None else None,
+            "attrs": self.attrs,
+        }
+
+
+@contextmanager
+def span(name, **attrs):
+    """Verschachtelter Span; ohne umgebenden Request-Trace (z. B. Hintergrundauftrag) ohne Wirkung."""
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    current = Span(name, parent, **attrs)
+    token = _current_span.set(current)
+    t0 = time.perf_counter()
+    try:
+        yield current
+    except Exception as e:
+        current.attrs["error"] = type(e).__name__
+        raise
+    finally:
+        current.duration = time.perf_counter() - t0
+        _current_span.reset(token)
+
+
+def traced_dependency(name, dependency):
+    """Umhüllt eine FastAPI-Abhängigkeit (z. B. get_current_user) mit einem Span.
+
+    Die Signatur bleibt über functools.wraps erhalten, damit FastAPI die
+    Unterabhängigkeiten der ursprünglichen Funktion auflöst.
+    """
+    if inspect.iscoroutinefunction(dependency):
+        @functools.wraps(dependency)
+        async def traced(*args, **kwargs):
+            with span(name):
+                return await dependency(*args, **kwargs)
+    else:
+        @functools.wraps(dependency)
+        def traced(*args, **kwargs):
+            with span(name):
+                return dependency(*args, **kwargs)
+    return traced
+
+
+class _Stats:
+    def __init__(self, window):
+        self.window = window
+        self._lock = threading.Lock()
+        self._routes = {}
+        self._spans = {}
+
+    def add(self, root):
+        with self._lock:
+            self._routes.setdefault(root.name, deque(maxlen=self.window)).append(root.duration)
+            for s in root.trace:
+                if s is not root and s.duration is not None:
+                    self._spans.setdefault(s.name, deque(maxlen=self.window)).append(s.duration)
+
+    @staticmethod
+    def _percentiles(values):
+        ordered = sorted(values)
+        n = len(ordered)
+
+        def pct(p):
+            return round(ordered[min(n - 1, int(p * n))] * 1000, 2)
+        return {"count": n, "p50_ms": pct(0.50), "p95_ms": pct(0.95), "p99_ms": pct(0.99),
+                "max_ms": round(ordered[-1] * 1000, 2)}
+
+    def summary(self):
+        with self._lock:
+            routes = {k: list(v) for k, v in self._routes.items()}
+            spans = {k: list(v) for k, v in self._spans.items()}
+        return {
+            "window": self.window,
+            "routes": {k: self._percentiles(v) for k, v in sorted(routes.items()) if v},
+            "spans": {k: self._percentiles(v) for k, v in sorted(spans.items()) if v},
+        }
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+            self._spans.clear()
+
+
+stats = _Stats(TRACE_WINDOW)
+
+
+class _Exporter:
+    def __init__(self, target):
+        self.target = target
+        self._queue = queue.Queue(maxsize=10000)
+        threading.Thread(target=self._run, name="trace-exporter", daemon=True).start()
+
+    def submit(self, trace):
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            pass  # Tracing darf Requests nie blockieren
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < TRACE_EXPORT_BATCH:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+            except Exception:
+                logging.exception("Traces konnten nicht exportiert werden")
+
+    def _write(self, batch):
+        if self.target.startswith("file:"):
+            with open(self.target[len("file:"):], "a", encoding="utf-8") as f:
+                for trace in batch:
+                    f.write(json.dumps(trace, ensure_ascii=False) + "\n")
+        else:
+            request = urllib.request.Request(
+                self.target, data=json.dumps(batch).encode("utf-8"),
+                headers={"Content-Type": "application/json"}, method="POST")
+            urllib.request.urlopen(request, timeout=5).close()
+
+
+_exporter = _Exporter(TRACE_EXPORT) if TRACE_EXPORT else None
+
+
+def _route_name(scope):
+    path = scope.get("path", "")
+    template = getattr(scope.get("route"), "path", None)
+    if template:
+        # Je nach FastAPI-Version fehlt der Präfix aus include_router in route.path
+        extra = path.count("/") - template.count("/")
+        if extra > 0:
+            template = "/".join(path.split("/")[:extra + 1]) + template
+        path = template
+    else:
+        # Unbekannte Pfade zusammenfassen, sonst wächst die Auswertung mit jedem 404
+        path = "<unmatched>"
+    return f"{scope.get('method', '')} {path}"
+
+
+class TracingMiddleware:
+    """ASGI-Middleware: ein Wurzel-Span pro HTTP-Request (ohne /static)."""
+
+    def __init__(self, app, skip_prefixes=("/static",)):
+        self.app = app
+        self.skip_prefixes = skip_prefixes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("path", "").startswith(self.skip_prefixes):
+            await self.app(scope, receive, send)
+            return
+        root = Span(scope.get("path", ""))
+        token = _current_span.set(root)
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            root.duration = time.perf_counter() - t0
+            _current_span.reset(token)
+            # Routen-Vorlage statt konkretem Pfad, damit IDs nicht je eine eigene Route ergeben
+            root.name = _route_name(scope)
+            root.attrs["status"] = status["code"]
+            stats.add(root)
+            if _exporter is not None:
+                _exporter.submit([s.to_dict() for s in root.trace])
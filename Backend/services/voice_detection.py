@@ -0,0 +1,168 @@
+"""
+Stimmenerkennung über alle Seiten eines Tasks.
+
+Für jede Seite werden Titel- und Stimmenbereich (aus den vom Nutzer markierten
+Boxen der Vorlage, etwas vergrößert) gelesen, bevorzugt aus der vorberechneten
+Kopfzeilen-OCR, sonst per Live-OCR. Seiten mit erkanntem Stimmentext beginnen
+eine neue Stimme.
+
+Die Boxen beziehen sich auf die Vorlagenseite; bei beschnittenen Seiten
+(TRIM_MARGINS) werden sie pro Seite um den Unterschied der Ausschnitte verschoben.
+"""
+import logging
+import os
+
+from PIL import Image
+
+from config import HEADER_CUTOFF_RATIO
+from services import storage
+from services.header_ocr import load_page_words, ocr_header_band, words_in_region
+from services.page_meta import load_page_meta, page_offset, shift_box
+from services.ocr_layout import group_words
+from services.storage import task_dir
+from services.tesseract import TesseractTimeout, image_to_string
+from services.tracing import span
+
+
+def _region_text(region, task_id, page):
+    try:
+        return image_to_string(region, lang="deu").strip()
+    except TesseractTimeout:
+        # Eine hängende Seite zählt als Seite ohne Text, die übrigen werden weiter erkannt
+        logging.warning(f"Stimmenerkennung für Task {task_id}, Seite {page}: Zeitlimit überschritten")
+        return ""
+
+
+def detect_voice_starts(task_id, title_box, voice_box, template_page=1):
+    """Liefert [{"page", "title", "voice", "num_pages"}] für jede Seite, auf der eine Stimme beginnt.
+
+    title_box und voice_box sind Koordinaten auf template_page.
+    """
+    pages_dir = os.path.join(task_dir(task_id), "pages")
+    storage.fetch_dir(pages_dir)
+    page_meta = load_page_meta(task_id)
+    template_x, template_y = page_offset(page_meta, template_page)
+    template_boxes = (title_box, voice_box)
+    files = []
+    if os.path.isdir(pages_dir):
+        files = sorted(f for f in os.listdir(pages_dir) if f.endswith(".png"))
+    results = []
+    for idx, fname in enumerate(files):
+        page = idx + 1
+        page_x, page_y = page_offset(page_meta, page)
+        title_box, voice_box = (shift_box(box, template_x - page_x, template_y - page_y)
+                                for box in template_boxes)
+        with span("header_ocr.load", page=page):
+            precomputed = load_page_words(task_id, page)
+        img = None
+        try:
+            if precomputed is not None:
+                img_width, img_height = precomputed["width"], precomputed["height"]
+            else:
+                with span("image.open", page=page):
+                    img = Image.open(os.path.join(pages_dir, fname))
+                img_width, img_height = img.size
+
+            tx = max(0, title_box["x"] - 0.1 * title_box["width"])
+            ty = max(0, title_box["y"] - 0.1 * title_box["height"])
+            tw = title_box["width"] * 1.2
+            th = title_box["height"] * 1.2
+            t_right = min(img_width, tx + tw)
+            t_bottom = min(img_height, ty + th)
+
+            vx = max(0, voice_box["x"] - 0.3 * voice_box["width"])
+            vy = max(0, voice_box["y"] - 0.3 * voice_box["height"])
+            vw = voice_box["width"] * 1.6
+            vh = voice_box["height"] * 1.6
+            min_voice_width = 0.3 * img_width
+            if vw < min_voice_width:
+                vw = min_voice_width
+            v_right = min(img_width, vx + vw)
+            v_bottom = min(img_height, vy + vh)
+
+            title_text = None
+            voice_text = None
+            if precomputed is not None:
+                title_text = words_in_region(
+                    precomputed, tx, ty, t_right, t_bottom)
+                voice_text = words_in_region(
+                    precomputed, vx, vy, v_right, v_bottom)
+
+            # Fallback auf Live-OCR, wenn keine (ausreichenden) Vorberechnungen vorliegen
+            if title_text is None or voice_text is None:
+                if img is None:
+                    with span("image.open", page=page):
+                        img = Image.open(os.path.join(pages_dir, fname))
+                if title_text is None:
+                    title_region = img.crop((tx, ty, t_right, t_bottom))
+                    with span("ocr.tesseract", page=page, region="title"):
+                        title_text = _region_text(title_region, task_id, page)
+                if voice_text is None:
+                    voice_region = img.crop((vx, vy, v_right, v_bottom))
+                    with span("ocr.tesseract", page=page, region="voice"):
+                        voice_text = _region_text(voice_region, task_id, page)
+
+            results.append({
+                "page": page,
+                "title": title_text,
+                "voice": voice_text
+            })
+        finally:
+            if img is not None:
+                img.close()
+
+    voice_indices = [
+        i for i, v in enumerate(results)
+        if v["voice"].strip() != ""
+    ]
+    for i, v in enumerate(results):
+        v["num_pages"] = 0
+
+    for idx, start_idx in enumerate(voice_indices):
+        end_idx = voice_indices[idx + 1] if idx + \
+            1 < len(voice_indices) else len(results)
+        num_pages = end_idx - start_idx
+        results[start_idx]["num_pages"] = num_pages
+
+    voices_with_pages = [
+        {
+            "page": v["page"],
+            "title": v["title"],
+            "voice": v["voice"],
+            "num_pages": v["num_pages"]
+        }
+        for v in results if v["voice"].strip() != ""
+    ]
+    return voices_with_pages
+
+
+def pick_header_boxes(boxes, width):
+    """Wählt Titel- und Stimmenbox aus den gruppierten Kopfzeilen-Boxen einer Seite.
+
+    Gleiche Heuristik wie die Vorschläge in /ocr/: Stimme ganz links, Titel die
+    höchste Box nahe der Seitenmitte.
+    """
+    if not boxes or not width:
+        return None, None
+    voice_box = min(boxes, key=lambda b: b["x"])
+    tolerance = 0.2 * width
+    centered = [b for b in boxes if abs(
+        (b["x"] + b["width"]/2) - width/2) <= tolerance]
+    title_box = max(centered or boxes, key=lambda b: b["height"])
+    return title_box, voice_box
+
+
+def suggest_header_boxes(task_id, page=1):
+    """Titel- und Stimmenbox einer Vorlagenseite ohne Nutzereingabe (z. B. für cli.py)."""
+    result = load_page_words(task_id, page)
+    if result is None:
+        page_num_str = str(int(page)).zfill(5)
+        image_path = os.path.join(
+            task_dir(task_id), "pages", f"{task_id}_page_{page_num_str}.png")
+        if not storage.fetch(image_path):
+            return None, None
+        with Image.open(image_path) as image:
+            result = ocr_header_band(image)
+    boxes = group_words(result["words"],
+                        cutoff_y=HEADER_CUTOFF_RATIO * result["height"])
+    return pick_header_boxes(boxes, result["width"])
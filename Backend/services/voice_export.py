@@ -0,0 +1,522 @@
+"""
+Export von Stimmen als PDF.
+
+Enthält die gemeinsame Logik von /ocr/voices/split und /ocr/voices/split_zip
+(Stimmenbereiche, Dateinamen, NotenIndex.xml) sowie einen PDF-Writer, der die
+Seiten einzeln in die Ausgabe streamt: es ist immer nur eine dekodierte Seite im
+Speicher, unabhängig von der Seitenzahl der Stimme.
+
+Im Modus "auto" werden Seiten, die bei der Verarbeitung weder gedreht noch
+nachträglich bearbeitet wurden, ohne Neukodierung aus original.pdf kopiert.
+
+Die Stimmen eines Exports werden parallel in einem Prozesspool erzeugt
+(EXPORT_WORKERS), die Ergebnisse kommen in Stimmenreihenfolge zurück.
+stream_voices_zip erzeugt das ZIP-Archiv direkt als Byte-Stream, ohne
+Zwischendateien.
+
+Exportprofile (EXPORT_PROFILES) legen die Kodierung der gerasterten Seiten fest:
+color (RGB-JPEG, bisheriges Verhalten), gray (Graustufen-JPEG), bilevel
+(Schwarzweiß, CCITT G4) und lossless (Flate). Optional werden die Seiten auf
+eine Ziel-DPI verkleinert; die Seitengröße im PDF bleibt dabei gleich.
+Seiten werden nie in einen größeren Farbraum gehoben: Graustufenseiten bleiben
+auch im Profil color DeviceGray, als Schwarzweiß abgelegte Seiten (1 Bit, siehe
+services/pipeline.py) werden in jedem Profil als CCITT G4 kodiert.
+"""
+import io
+import multiprocessing
+import os
+import shutil
+import threading
+import time
+import uuid
+import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from xml.etree.ElementTree import Element, SubElement, tostring
+
+from PIL import Image
+from pypdf import PdfReader, PdfWriter
+
+from config import RENDER_DPI, EXPORT_WORKERS
+from services import storage
+from services.page_meta import load_page_meta, is_page_untouched
+from services.storage import task_dir
+
+
+# auto: unveränderte Seiten direkt aus original.pdf übernehmen, raster: alle Seiten neu rendern
+EXPORT_MODES = ("auto", "raster")
+
+EXPORT_PROFILES = ("color", "gray", "bilevel", "lossless")
+DEFAULT_JPEG_QUALITY = 75
+# Grauwert, ab dem ein Pixel im Profil bilevel als weiß gilt
+BILEVEL_THRESHOLD = 128
+
+
+def make_export_profile(name="color", quality=None, target_dpi=None):
+    if name not in EXPORT_PROFILES:
+        raise ValueError(f"Unbekanntes Exportprofil: {name}")
+    if quality is not None and not 1 <= int(quality) <= 95:
+        raise ValueError("JPEG-Qualität muss zwischen 1 und 95 liegen")
+    if target_dpi is not None and int(target_dpi) <= 0:
+        raise ValueError("Ziel-DPI muss positiv sein")
+    return {
+        "name": name,
+        "quality": int(quality) if quality is not None else DEFAULT_JPEG_QUALITY,
+        "target_dpi": int(target_dpi) if target_dpi else None,
+    }
+
+
+def is_default_profile(profile):
+    return profile is None or profile == make_export_profile()
+
+
+def list_page_files(task_id):
+    pages_dir = os.path.join(task_dir(task_id), "pages")
+    storage.fetch_dir(pages_dir)
+    if not os.path.isdir(pages_dir):
+        return []
+    return [os.path.join(pages_dir, f)
+            for f in sorted(f for f in os.listdir(pages_dir) if f.endswith(".png"))]
+
+
+def parse_voice_starts(voices):
+    voice_starts = []
+    for v in voices:
+        try:
+            # Einträge kommen je nach Endpunkt als dict oder als VoiceEntry
+            page = v["page"] if isinstance(v, dict) else v.page
+            voice = v["voice"] if isinstance(v, dict) else v.voice
+            page_index = int(page) - 1
+            voice_text = voice.strip()
+            if voice_text:
+                voice_starts.append((page_index, voice_text))
+        except Exception:
+            continue
+    voice_starts.sort(key=lambda x: x[0])
+    return voice_starts
+
+
+def compute_voice_ranges(voice_starts, num_pages, start_page=None, end_page=None):
+    voices_ranges = []
+    if start_page is not None and end_page is not None and len(voice_starts) == 1:
+        voices_ranges.append(
+            (start_page - 1, end_page - 1, voice_starts[0][1]))
+        return voices_ranges
+    for i, (start_page_idx, voice_text) in enumerate(voice_starts):
+        end_page_idx = voice_starts[i+1][0] - 1 if i + \
+            1 < len(voice_starts) else num_pages - 1
+        voices_ranges.append((start_page_idx, end_page_idx, voice_text))
+    return voices_ranges
+
+
+def voice_pdf_filename(title, voice_text):
+    voice_filename_part = voice_text.replace(".", "")
+    return f"{title} - {voice_filename_part}.pdf"
+
+
+def build_noten_index_xml(title, genre, komponist, arrangeur, voices_ranges):
+    root_elem = Element("NotenIndex")
+    stueck_elem = SubElement(root_elem, "Stueck")
+    for key, value in [("Titel", title), ("Genre", genre), ("Komponist", komponist), ("Arrangeur", arrangeur)]:
+        sub_elem = SubElement(stueck_elem, key)
+        sub_elem.text = value
+    stimmen_container = SubElement(root_elem, "Stimmen")
+    for (start, end, voice_text) in voices_ranges:
+        stimme_elem = SubElement(stimmen_container, "Stimme")
+        designation_elem = SubElement(stimme_elem, "Stimmenbezeichnung")
+        designation_elem.text = voice_text
+        file_elem = SubElement(stimme_elem, "Dateiname")
+        file_elem.text = voice_pdf_filename(title, voice_text)
+        start_elem = SubElement(stimme_elem, "StartSeite")
+        start_elem.text = str(start + 1)
+        end_elem = SubElement(stimme_elem, "EndSeite")
+        end_elem.text = str(end + 1)
+
+    def indent(elem, level=0):
+        i = "\n" + level * "  "
+        if len(elem):
+            if not elem.text or not elem.text.strip():
+                elem.text = i + "  "
+            for child in elem:
+                indent(child, level + 1)
+            if not child.tail or not child.tail.strip():
+                child.tail = i
+        else:
+            if level and (not elem.tail or not elem.tail.strip()):
+                elem.tail = i
+    indent(root_elem)
+    return tostring(root_elem, encoding="unicode")
+
+
+class _CountingWriter:
+    # Zählt geschriebene Bytes, damit auch nicht-seekbare Ziele (ZIP-Eintrag, Response) gehen
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.offset = 0
+
+    def write(self, data):
+        self.fileobj.write(data)
+        self.offset += len(data)
+
+
+class PdfImageWriter:
+    """Schreibt ein PDF mit einem Bild pro Seite direkt in ein Dateiobjekt.
+
+    Jede Seite wird beim Hinzufügen kodiert und geschrieben; übrig bleiben nur
+    Objekt-Offsets für die xref-Tabelle. Seitengröße wie bei Pillows PDF-Export:
+    Pixel * 72 / resolution.
+    """
+
+    def __init__(self, fileobj, resolution=100.0, jpeg_quality=DEFAULT_JPEG_QUALITY,
+                 profile="color", scale=1.0):
+        self.out = _CountingWriter(fileobj)
+        self.resolution = resolution
+        self.jpeg_quality = jpeg_quality
+        self.profile = profile
+        self.scale = scale
+        self.offsets = {}
+        self.page_refs = []
+        self.next_obj = 3  # 1 = Catalog, 2 = Pages (wird am Ende geschrieben)
+        self.out.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        self._write_obj(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+
+    def _write_obj(self, num, body, stream=None):
+        self.offsets[num] = self.out.offset
+        self.out.write(b"%d 0 obj\n" % num)
+        self.out.write(body)
+        if stream is not None:
+            self.out.write(b"\nstream\n")
+            self.out.write(stream)
+            self.out.write(b"\nendstream")
+        self.out.write(b"\nendobj\n")
+
+    def _alloc(self):
+        num = self.next_obj
+        self.next_obj += 1
+        return num
+
+    def _encode(self, image, bilevel=False):
+        if self.profile == "bilevel" or bilevel:
+            return self._encode_bilevel(image)
+        if self.profile == "gray":
+            image = image.convert("L")
+        elif image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        color_space = b"/DeviceRGB" if image.mode == "RGB" else b"/DeviceGray"
+        if self.profile == "lossless":
+            return zlib.compress(image.tobytes(), 6), b"/FlateDecode", color_space, 8, b""
+        buf = io.BytesIO()
+        image.save(buf, "JPEG", quality=self.jpeg_quality)
+        return buf.getvalue(), b"/DCTDecode", color_space, 8, b""
+
+    def _encode_bilevel(self, image):
+        # Pillow/libtiff kodiert G4 nur als TIFF; mit einem einzigen Strip sind dessen
+        # Bytes (StripOffsets/StripByteCounts) direkt ein gültiger CCITTFaxDecode-Stream.
+        bw = image.convert("L").point(
+            lambda p: 255 if p >= BILEVEL_THRESHOLD else 0).convert("1", dither=Image.Dither.NONE)
+        buf = io.BytesIO()
+        bw.save(buf, "TIFF", compression="group4", tiffinfo={278: bw.height})
+        buf.seek(0)
+        with Image.open(buf) as tiff:
+            offset = tiff.tag_v2[273][0]
+            length = tiff.tag_v2[279][0]
+        data = buf.getbuffer()[offset:offset + length].tobytes()
+        # TIFF von Pillow ist BlackIsZero, daher BlackIs1 true für gleiche Darstellung
+        extra = b" /DecodeParms << /K -1 /Columns %d /Rows %d /BlackIs1 true >>" % bw.size
+        return data, b"/CCITTFaxDecode", b"/DeviceGray", 1, extra
+
+    def add_page(self, image):
+        # Seitengröße aus der Originalauflösung, damit Verkleinern nur die Bild-DPI ändert
+        width, height = image.size
+        bilevel = image.mode == "1"
+        if self.scale < 1.0:
+            if bilevel:
+                # 1-Bit-Bilder skaliert Pillow nur mit NEAREST; über Graustufen filtern
+                image = image.convert("L")
+            image = image.resize((max(1, round(width * self.scale)),
+                                  max(1, round(height * self.scale))), Image.LANCZOS)
+        data, filter_name, color_space, bits, extra = self._encode(image, bilevel)
+        image_w, image_h = image.size
+        image_num = self._alloc()
+        content_num = self._alloc()
+        page_num = self._alloc()
+
+        self._write_obj(image_num, b"<< /Type /XObject /Subtype /Image /Width %d /Height %d "
+                        b"/ColorSpace %s /BitsPerComponent %d /Filter %s%s /Length %d >>"
+                        % (image_w, image_h, color_space, bits, filter_name, extra, len(data)),
+                        data)
+        del data
+
+        page_w = width * 72.0 / self.resolution
+        page_h = height * 72.0 / self.resolution
+        content = b"q %.4f 0 0 %.4f 0 0 cm /image Do Q" % (page_w, page_h)
+        self._write_obj(content_num, b"<< /Length %d >>" % len(content), content)
+        self._write_obj(page_num, b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %.4f %.4f] "
+                        b"/Resources << /XObject << /image %d 0 R >> >> /Contents %d 0 R >>"
+                        % (page_w, page_h, image_num, content_num))
+        self.page_refs.append(page_num)
+
+    def close(self):
+        kids = b" ".join(b"%d 0 R" % num for num in self.page_refs)
+        self._write_obj(2, b"<< /Type /Pages /Kids [%s] /Count %d >>"
+                        % (kids, len(self.page_refs)))
+        xref_offset = self.out.offset
+        size = self.next_obj
+        self.out.write(b"xref\n0 %d\n" % size)
+        self.out.write(b"0000000000 65535 f \n")
+        for num in range(1, size):
+            self.out.write(b"%010d 00000 n \n" % self.offsets[num])
+        self.out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+                       % (size, xref_offset))
+
+
+def get_original_pdf_path(task_id):
+    return os.path.join(task_dir(task_id), "original.pdf")
+
+
+def write_voice_pdf(page_paths, fileobj, resolution=100.0, profile=None, source_dpi=RENDER_DPI):
+    if profile is None:
+        profile = make_export_profile()
+    scale = 1.0
+    if profile["target_dpi"]:
+        scale = min(1.0, profile["target_dpi"] / source_dpi)
+    writer = PdfImageWriter(fileobj, resolution=resolution, jpeg_quality=profile["quality"],
+                            profile=profile["name"], scale=scale)
+    for path in page_paths:
+        with Image.open(path) as page:
+            writer.add_page(page)
+    writer.close()
+    return len(page_paths)
+
+
+def write_voice_pdf_sliced(reader, page_paths, first_page, untouched, fileobj, dpi=RENDER_DPI):
+    # Unveränderte Seiten aus dem Original kopieren, übrige aus dem korrigierten Raster
+    # mit Render-DPI einfügen, damit die Seitengröße zum Original passt.
+    writer = PdfWriter()
+    for offset, path in enumerate(page_paths):
+        page_index = first_page + offset
+        if untouched[offset] and page_index < len(reader.pages):
+            writer.add_page(reader.pages[page_index])
+        else:
+            buf = io.BytesIO()
+            write_voice_pdf([path], buf, resolution=dpi)
+            buf.seek(0)
+            writer.add_page(PdfReader(buf).pages[0])
+    writer.write(fileobj)
+    return len(page_paths)
+
+
+def write_voice(task_id, page_files, start, end, fileobj, export_mode="auto", page_meta=None,
+                reader=None, profile=None):
+    selected_pages = page_files[start:end+1]
+    if page_meta is None:
+        page_meta = load_page_meta(task_id)
+    # Originalseiten werden nicht neu kodiert, daher nur mit dem Standardprofil übernehmen
+    if export_mode == "auto" and is_default_profile(profile):
+        original_path = get_original_pdf_path(task_id)
+        untouched = [is_page_untouched(page_meta, start + offset + 1)
+                     for offset in range(len(selected_pages))]
+        if any(untouched) and (reader is not None or storage.fetch(original_path)):
+            if reader is None:
+                reader = PdfReader(original_path)
+            dpi = page_meta.get("dpi", RENDER_DPI)
+            return write_voice_pdf_sliced(reader, selected_pages, start, untouched, fileobj, dpi)
+    return write_voice_pdf(selected_pages, fileobj, profile=profile,
+                           source_dpi=page_meta.get("dpi", RENDER_DPI))
+
+
+def export_voice_pdf(task_id, page_files, start, end, output_path, export_mode="auto", page_meta=None,
+                     reader=None, profile=None):
+    # Eigene temporäre Datei pro Aufruf: gleichzeitige Exporte derselben Stimme (Split,
+    # spekulativer Export, Export-Aufträge) überschreiben sich nicht gegenseitig
+    tmp_path = f"{output_path}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            write_voice(task_id, page_files, start, end, f,
+                        export_mode, page_meta, reader, profile)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_export_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn statt fork: die API hat bereits Threads (Job-Warteschlange, Caches, Tracing),
+            # ein geforkter Worker könnte deren gehaltene Locks erben und hängen bleiben.
+            # Die Worker-Funktionen liegen deshalb auf Modulebene.
+            _pool = ProcessPoolExecutor(max_workers=EXPORT_WORKERS,
+                                        mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def _export_voice_job(task_id, page_files, start, end, output_path, export_mode, page_meta, profile,
+                      prerendered_path=None):
+    t0 = time.perf_counter()
+    if prerendered_path is not None:
+        tmp_path = f"{output_path}.{uuid.uuid4().hex}.tmp"
+        try:
+            shutil.copyfile(prerendered_path, tmp_path)
+            os.replace(tmp_path, output_path)
+            return time.perf_counter() - t0
+        except FileNotFoundError:
+            # Vorgerenderte Datei wurde inzwischen verworfen
+            pass
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    export_voice_pdf(task_id, page_files, start, end,
+                     output_path, export_mode, page_meta, profile=profile)
+    return time.perf_counter() - t0
+
+
+def export_voices(task_id, page_files, voices_ranges, title, export_dir, export_mode="auto", page_meta=None,
+                  profile=None, prerendered=None):
+    """Erzeugt ein PDF pro Stimme, bei mehreren Stimmen parallel.
+
+    Liefert pro exportierter Stimme (in Stimmenreihenfolge) Dateiname, Seitenzahl, Größe und Dauer.
+    prerendered ordnet Bereichen (start, end) bereits erzeugte PDFs zu, die nur kopiert werden.
+    """
+    prerendered = prerendered or {}
+    if page_meta is None:
+        page_meta = load_page_meta(task_id)
+    jobs = []
+    for (start, end, voice_text) in voices_ranges:
+        if not page_files[start:end+1]:
+            continue
+        filename = voice_pdf_filename(title, voice_text)
+        jobs.append((voice_text, filename, len(page_files[start:end+1]),
+                     (task_id, page_files, start, end,
+                      os.path.join(export_dir, filename), export_mode, page_meta, profile,
+                      prerendered.get((start, end)))))
+
+    if len(jobs) > 1 and EXPORT_WORKERS > 1:
+        pool = get_export_pool()
+        futures = [pool.submit(_export_voice_job, *args) for *_, args in jobs]
+        durations = [f.result() for f in futures]
+    else:
+        durations = [_export_voice_job(*args) for *_, args in jobs]
+
+    return [
+        {"voice": voice_text, "filename": filename, "pages": num_pages,
+         "bytes": os.path.getsize(args[4]), "seconds": round(seconds, 3)}
+        for (voice_text, filename, num_pages, args), seconds in zip(jobs, durations)
+    ]
+
+
+def _render_voice_job(task_id, page_files, start, end, export_mode, page_meta, profile,
+                      prerendered_path=None):
+    t0 = time.perf_counter()
+    if prerendered_path is not None:
+        try:
+            with open(prerendered_path, "rb") as f:
+                return f.read(), time.perf_counter() - t0
+        except FileNotFoundError:
+            pass
+    buf = io.BytesIO()
+    write_voice(task_id, page_files, start, end, buf, export_mode, page_meta, profile=profile)
+    return buf.getvalue(), time.perf_counter() - t0
+
+
+def render_voices(task_id, page_files, voices_ranges, title, export_mode="auto", page_meta=None,
+                  profile=None, prerendered=None):
+    """Liefert (Stimme, Dateiname, Seitenzahl, PDF-Bytes, Dauer) in Stimmenreihenfolge.
+
+    Es sind höchstens 2 * EXPORT_WORKERS Stimmen gleichzeitig in Arbeit bzw. im Speicher.
+    Wird der Generator vorzeitig geschlossen (Abbruch eines Export-Auftrags), werden keine
+    weiteren Stimmen eingereiht und noch nicht gestartete abgebrochen.
+    """
+    prerendered = prerendered or {}
+    if page_meta is None:
+        page_meta = load_page_meta(task_id)
+    jobs = []
+    for (start, end, voice_text) in voices_ranges:
+        num_pages = len(page_files[start:end+1])
+        if num_pages:
+            jobs.append((voice_text, voice_pdf_filename(title, voice_text), num_pages,
+                         (task_id, page_files, start, end, export_mode, page_meta, profile,
+                          prerendered.get((start, end)))))
+
+    if len(jobs) <= 1 or EXPORT_WORKERS <= 1:
+        for voice_text, filename, num_pages, args in jobs:
+            data, seconds = _render_voice_job(*args)
+            yield voice_text, filename, num_pages, data, seconds
+        return
+
+    pool = get_export_pool()
+    window = 2 * EXPORT_WORKERS
+    pending = deque()
+    try:
+        for job in jobs:
+            pending.append((job, pool.submit(_render_voice_job, *job[3])))
+            if len(pending) >= window:
+                (voice_text, filename, num_pages, _), future = pending.popleft()
+                yield (voice_text, filename, num_pages) + future.result()
+        while pending:
+            (voice_text, filename, num_pages, _), future = pending.popleft()
+            yield (voice_text, filename, num_pages) + future.result()
+    finally:
+        # Bereits laufende Stimmen lassen sich nicht unterbrechen, wartende schon
+        for _, future in pending:
+            future.cancel()
+
+
+class _ChunkSink:
+    # Nimmt die Ausgabe von ZipFile entgegen; ohne tell/seek schreibt ZipFile im Streaming-Modus
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def stream_voices_zip(task_id, page_files, voices_ranges, title, genre, komponist, arrangeur,
+                      export_mode="auto", page_meta=None, timings=None, profile=None,
+                      prerendered=None):
+    """Generator für ein ZIP mit allen Stimmen-PDFs und NotenIndex.xml.
+
+    PDFs werden unkomprimiert (ZIP_STORED) abgelegt, sie sind bereits komprimiert.
+    Optional wird timings mit Dauer, Größe und Seitenzahl pro Stimme gefüllt.
+    """
+    sink = _ChunkSink()
+    voices = render_voices(task_id, page_files, voices_ranges, title, export_mode, page_meta,
+                           profile, prerendered)
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_STORED) as zipf:
+        try:
+            for voice_text, filename, num_pages, data, seconds in voices:
+                zipf.writestr(filename, data, compress_type=zipfile.ZIP_STORED)
+                if timings is not None:
+                    timings.append({"voice": voice_text, "filename": filename, "pages": num_pages,
+                                    "bytes": len(data), "seconds": round(seconds, 3)})
+                del data
+                yield sink.drain()
+        finally:
+            # Bei Abbruch sofort, nicht erst bei der Garbage Collection
+            voices.close()
+        xml_str = build_noten_index_xml(
+            title, genre, komponist, arrangeur, voices_ranges)
+        zipf.writestr("NotenIndex.xml", xml_str.encode("utf-8"),
+                      compress_type=zipfile.ZIP_DEFLATED)
+    yield sink.drain()
+
+
+def get_zip_filename(title):
+    zip_filename = f"{title}.zip" if title else "stimmen_export.zip"
+    return zip_filename.replace(" ", "_").replace("/", "_")
@@ -0,0 +1,16 @@
+"""
+Gemeinsame Einstellungen der Tests (Aufruf im Verzeichnis Backend: python -m pytest).
+
+STATIC_DIR zeigt auf ein temporäres Verzeichnis, bevor config importiert wird; die
+Ablage (services/storage.py) ist lokal und flach. Tests, die Poppler, Tesseract
+oder sc_base_backend brauchen, gibt es hier nicht.
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ["STATIC_DIR"] = tempfile.mkdtemp(prefix="notenscan-tests-")
+os.environ["STORAGE_BACKEND"] = "local"
+os.environ["STORAGE_LAYOUT"] = "flat"
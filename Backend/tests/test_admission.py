@@ -0,0 +1,122 @@
+import pytest
+from pypdf import PdfWriter
+
+from services.admission import IngestAdmission, Overloaded, estimate_pdf_cost
+
+
+def _cost(memory_mb=100, cpu_seconds=10):
+    return {"memory_mb": memory_mb, "cpu_seconds": cpu_seconds}
+
+
+class _Queue:
+    """Nimmt Aufträge wie JobQueue.submit entgegen und führt sie erst bei run() aus."""
+
+    def __init__(self):
+        self.jobs = []
+
+    def submit(self, fn, *args, kind="job", owner=None):
+        self.jobs.append((fn, args))
+
+    def run(self, index=0):
+        fn, args = self.jobs.pop(index)
+        fn(*args)
+
+
+def _admission(queue, memory_mb=250, cpu_seconds=100, max_waiting=3, max_running=4):
+    return IngestAdmission(memory_mb, cpu_seconds, max_waiting, queue.submit, max_running=max_running)
+
+
+def test_estimate_pdf_cost_scales_with_pages_and_dpi(tmp_path):
+    writer = PdfWriter()
+    for _ in range(2):
+        writer.add_blank_page(width=72 * 8, height=72 * 10)
+    path = str(tmp_path / "a.pdf")
+    writer.write(path)
+    cost = estimate_pdf_cost(path, dpi=100)
+    assert cost["pages"] == 2
+    assert cost["megapixels"] == 1.6
+    assert cost["cpu_seconds"] > 0
+    assert estimate_pdf_cost(path, dpi=200)["memory_mb"] == pytest.approx(4 * cost["memory_mb"], rel=0.01)
+
+
+def test_unreadable_pdf_costs_nothing(tmp_path):
+    path = tmp_path / "kaputt.pdf"
+    path.write_bytes(b"kein pdf")
+    assert estimate_pdf_cost(str(path))["pages"] == 0
+
+
+def test_jobs_wait_until_budget_is_free():
+    queue = _Queue()
+    admission = _admission(queue)
+    done = []
+    assert admission.submit("a", _cost(), done.append, "a") == 0
+    assert admission.submit("b", _cost(), done.append, "b") == 0
+    assert admission.submit("c", _cost(), done.append, "c") == 1
+    assert admission.position("c") == 1
+    queue.run()
+    assert done == ["a"]
+    assert admission.position("c") == 0 and len(queue.jobs) == 2
+    assert admission.position("a") is None
+
+
+def test_admits_at_most_max_running_jobs():
+    # Zugelassen heißt laufend: mehr Aufträge als Worker blockieren nur das Budget
+    queue = _Queue()
+    admission = _admission(queue, memory_mb=10_000, cpu_seconds=10_000, max_running=2)
+    positions = [admission.submit(task_id, _cost(), print) for task_id in "abc"]
+    assert positions == [0, 0, 1] and len(queue.jobs) == 2
+
+
+def test_oversized_job_runs_alone():
+    queue = _Queue()
+    admission = _admission(queue)
+    assert admission.submit("gross", _cost(memory_mb=1000), print) == 0
+    assert admission.submit("klein", _cost(), print) == 1
+
+
+def test_owners_take_turns_while_waiting():
+    queue = _Queue()
+    admission = _admission(queue, max_waiting=10, max_running=1)
+    admission.submit("laufend", _cost(), print, owner="a")
+    for task_id in ("a1", "a2", "a3"):
+        admission.submit(task_id, _cost(), print, owner="a")
+    admission.submit("b1", _cost(), print, owner="b")
+    assert [admission.position(t) for t in ("a1", "b1", "a2", "a3")] == [1, 2, 3, 4]
+
+
+def test_check_rejects_when_too_many_wait():
+    queue = _Queue()
+    admission = _admission(queue, max_waiting=1, max_running=1)
+    admission.submit("a", _cost(), print)
+    admission.check()
+    admission.submit("b", _cost(), print)
+    with pytest.raises(Overloaded) as e:
+        admission.check()
+    assert e.value.waiting == 1 and e.value.retry_after >= 1
+
+
+def test_failing_job_releases_its_budget():
+    queue = _Queue()
+    admission = _admission(queue, max_running=1)
+
+    def fail():
+        raise RuntimeError("kaputt")
+
+    admission.submit("a", _cost(), fail)
+    admission.submit("b", _cost(), print)
+    with pytest.raises(RuntimeError):
+        queue.run()
+    assert admission.position("b") == 0
+
+
+def test_check_counts_all_new_jobs():
+    # Ein Batch-Upload reiht pro PDF einen Auftrag ein
+    queue = _Queue()
+    admission = _admission(queue, max_waiting=3, max_running=1)
+    admission.submit("a", _cost(), print)
+    admission.check(3)
+    with pytest.raises(Overloaded):
+        admission.check(4)
+    admission.submit("b", _cost(), print)
+    with pytest.raises(Overloaded):
+        admission.check(3)
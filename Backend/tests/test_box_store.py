@@ -0,0 +1,111 @@
+"""
+Seitenauflösung in services/box_store.py gegen eine echte PostgreSQL-Datenbank.
+
+Läuft nur mit TEST_DATABASE_URL (z. B. postgresql://postgres@localhost/notenscan_test)
+und installiertem psycopg2 (wie sc_base_backend, Zeilen als dict); das Schema aus
+docs/schema.sql wird angelegt.
+"""
+import os
+import uuid
+
+import pytest
+
+DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+if not DATABASE_URL:
+    pytest.skip("TEST_DATABASE_URL nicht gesetzt", allow_module_level=True)
+psycopg2 = pytest.importorskip("psycopg2")
+from psycopg2.extras import RealDictCursor  # noqa: E402
+
+from services.box_store import get_page, save_page, update_box_texts  # noqa: E402
+from services.page_meta import save_page_meta  # noqa: E402
+
+SCHEMA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                      "docs", "schema.sql")
+
+
+@pytest.fixture
+def conn():
+    connection = psycopg2.connect(DATABASE_URL, cursor_factory=RealDictCursor)
+    with open(SCHEMA, "r", encoding="utf-8") as f, connection.cursor() as cur:
+        cur.execute(f.read())
+    connection.commit()
+    yield connection
+    connection.close()
+
+
+@pytest.fixture
+def task_id(conn):
+    task_id = str(uuid.uuid4())
+    with conn.cursor() as cur:
+        cur.execute("INSERT INTO pdf_tasks (id, user_id, filename, status) "
+                    "VALUES (%s, 1, 't.pdf', 'done')", (task_id,))
+    conn.commit()
+    yield task_id
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM pdf_tasks WHERE id = %s", (task_id,))
+    conn.commit()
+
+
+def _box(x, y, text=""):
+    return {"x": x, "y": y, "width": 100, "height": 30, "text": text, "selected": False}
+
+
+def _texts(boxes):
+    return {"texts": [box.get("text") for box in boxes]}
+
+
+def test_get_page_falls_back_to_template(conn, task_id):
+    save_page(conn, task_id, 1, [_box(10, 10, "Titel")], {"title": "Titel"}, {"Titel": 0})
+    assert get_page(conn, task_id, 1)["boxes"][0]["text"] == "Titel"
+    inherited = get_page(conn, task_id, 3)
+    assert inherited["boxes"] == [_box(10, 10, "Titel")]
+    assert inherited["labels"] == {"Titel": 0}
+    assert get_page(conn, task_id, 3, fallback_to_template=False) is None
+
+
+def test_update_box_texts_own_page(conn, task_id):
+    save_page(conn, task_id, 1, [_box(10, 10)], {})
+    save_page(conn, task_id, 2, [_box(10, 10), _box(300, 10)], {})
+    results = [{**_box(300, 10), "text": "Flöte 1"}]
+    suggestions = update_box_texts(conn, task_id, 2, results, _texts)
+    assert suggestions == {"texts": ["", "Flöte 1"]}
+    assert get_page(conn, task_id, 2)["boxes"][1]["text"] == "Flöte 1"
+    assert get_page(conn, task_id, 1)["boxes"][0]["text"] == ""
+
+
+def test_update_box_texts_inherited_page_updates_template(conn, task_id):
+    save_page(conn, task_id, 1, [_box(10, 10), _box(300, 10)], {})
+    results = [{**_box(10, 10), "text": "Marsch"}]
+    suggestions = update_box_texts(conn, task_id, 4, results, _texts)
+    assert suggestions == {"texts": ["Marsch", ""]}
+    assert get_page(conn, task_id, 1)["boxes"][0]["text"] == "Marsch"
+    assert get_page(conn, task_id, 4, fallback_to_template=False) is None
+
+
+def test_update_box_texts_without_boxes(conn, task_id):
+    assert update_box_texts(conn, task_id, 1, [], _texts) == {"texts": []}
+
+
+def _crops(task_id, **offsets):
+    # Beschnittene Seiten: Seite -> (x, y) des Ausschnitts in der gerasterten Seite
+    save_page_meta(task_id, {"pages": {
+        page.lstrip("p"): {"crop": {"x": x, "y": y, "width": 1000, "height": 1400}}
+        for page, (x, y) in offsets.items()}})
+
+
+def test_inherited_boxes_follow_the_crop_offset(conn, task_id):
+    _crops(task_id, p1=(40, 60), p2=(10, 80))
+    save_page(conn, task_id, 1, [_box(100, 100, "Titel")], {})
+    # Vorlage bei (140, 160) der gerasterten Seite liegt auf Seite 2 bei (130, 80)
+    assert get_page(conn, task_id, 2)["boxes"] == [_box(130, 80, "Titel")]
+    # Seite ohne Beschnitt: volle gerasterte Koordinaten
+    assert get_page(conn, task_id, 3)["boxes"] == [_box(140, 160, "Titel")]
+    assert get_page(conn, task_id, 1)["boxes"] == [_box(100, 100, "Titel")]
+
+
+def test_update_box_texts_maps_inherited_boxes_back_to_the_template(conn, task_id):
+    _crops(task_id, p1=(40, 60), p2=(10, 80))
+    save_page(conn, task_id, 1, [_box(100, 100), _box(400, 100)], {})
+    results = [{**_box(130, 80), "text": "Marsch"}]
+    assert update_box_texts(conn, task_id, 2, results, _texts) == {"texts": ["Marsch", ""]}
+    assert get_page(conn, task_id, 1)["boxes"][0]["text"] == "Marsch"
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from benchmarks.bench_imaging import array_page, legacy_page
+from benchmarks.synthetic_scores import generate_page
+from services.imaging import PageBuffers, rotate
+from services.pipeline import MAX_DESKEW_ANGLE, choose_deskew_angle, deskew_image, prepare_page
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_array_pipeline_keeps_legacy_angles(seed):
+    img, truth = generate_page(seed=seed, dpi=100, max_angle=4)
+    angle, _ = array_page(img, PageBuffers())
+    assert angle == legacy_page(img)[0]
+    if angle:
+        assert angle == pytest.approx(truth["correction"], abs=0.5)
+
+
+def test_gray_input_gives_the_same_angle_as_rgb():
+    img, _ = generate_page(seed=3, dpi=100, max_angle=4, mode="L")
+    assert array_page(img, PageBuffers())[0] == array_page(img.convert("RGB"), PageBuffers())[0]
+
+
+def test_rotate_matches_the_legacy_rotation():
+    # Altes Verfahren: BGR-Bild mit INTER_CUBIC drehen und zurück nach RGB
+    cv2 = pytest.importorskip("cv2")
+    img, _ = generate_page(seed=1, dpi=100, angle=2.5)
+    page = np.asarray(img.convert("RGB"))
+    h, w = page.shape[:2]
+    matrix = cv2.getRotationMatrix2D((w // 2, h // 2), 2.5, 1.0)
+    legacy = cv2.warpAffine(cv2.cvtColor(page, cv2.COLOR_RGB2BGR), matrix, (w, h),
+                            flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE)
+    assert np.array_equal(rotate(page, 2.5, PageBuffers()), cv2.cvtColor(legacy, cv2.COLOR_BGR2RGB))
+
+
+def test_choose_deskew_angle():
+    assert choose_deskew_angle(1.0, 1.4) == pytest.approx(1.2)
+    assert choose_deskew_angle(1.0, 3.0) == 3.0
+    assert choose_deskew_angle(1.0, 2.0) == 0.0
+
+
+def test_large_angles_are_not_applied(monkeypatch):
+    img, _ = generate_page(seed=0, dpi=72, angle=0)
+    page, gray, _ = prepare_page(img)
+    monkeypatch.setattr("services.pipeline.deskew_min_area_rect", lambda *a, **k: MAX_DESKEW_ANGLE + 1)
+    monkeypatch.setattr("services.pipeline.deskew_scikit_orientation", lambda *a, **k: MAX_DESKEW_ANGLE + 1)
+    rotated, meta = deskew_image(page, None, "00001", gray=gray)
+    assert meta == {"rotated": False, "angle": 0.0, "edited": False}
+    assert rotated is page
@@ -0,0 +1,121 @@
+import os
+import time
+import uuid
+
+import pytest
+
+from services import export_cache
+
+
+@pytest.fixture
+def task_id():
+    return str(uuid.uuid4())
+
+
+def _page_files(task_id, count=2):
+    directory = export_cache.task_dir(task_id)
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for i in range(1, count + 1):
+        path = os.path.join(directory, f"{task_id}_page_{i:05d}.png")
+        with open(path, "wb") as f:
+            f.write(b"x" * i)
+        paths.append(path)
+    return paths
+
+
+def _variant(task_id, sig, age=0):
+    key = uuid.uuid4().hex[:24]
+    export_cache.update_manifest(task_id, key, sig, pdf="voices.pdf")
+    manifest = os.path.join(export_cache.get_variant_dir(task_id, key), export_cache.MANIFEST_NAME)
+    mtime = time.time() - age
+    os.utime(manifest, (mtime, mtime))
+    return key
+
+
+def _variants(task_id):
+    return set(os.listdir(export_cache.get_exports_root(task_id)))
+
+
+def test_export_key_is_stable_and_depends_on_all_parts():
+    key = export_cache.export_key([(1, 2)], {"title": "A"}, {"dpi": 300}, "sig")
+    assert key == export_cache.export_key([[1, 2]], {"title": "A"}, {"dpi": 300}, "sig")
+    assert len(key) == 24
+    others = {
+        export_cache.export_key([(1, 3)], {"title": "A"}, {"dpi": 300}, "sig"),
+        export_cache.export_key([(1, 2)], {"title": "B"}, {"dpi": 300}, "sig"),
+        export_cache.export_key([(1, 2)], {"title": "A"}, {"dpi": 150}, "sig"),
+        export_cache.export_key([(1, 2)], {"title": "A"}, {"dpi": 300}, "sig2"),
+    }
+    assert key not in others and len(others) == 4
+
+
+def test_pages_signature_changes_when_a_page_is_rewritten(task_id):
+    pages = _page_files(task_id)
+    sig = export_cache.pages_signature(task_id, pages)
+    assert sig == export_cache.pages_signature(task_id, pages)
+    with open(pages[0], "wb") as f:
+        f.write(b"neu und laenger")
+    assert export_cache.pages_signature(task_id, pages) != sig
+
+
+def test_pages_signature_notices_page_meta(task_id):
+    pages = _page_files(task_id)
+    sig = export_cache.pages_signature(task_id, pages)
+    with open(os.path.join(export_cache.task_dir(task_id), "page_meta.json"), "w") as f:
+        f.write("{}")
+    assert export_cache.pages_signature(task_id, pages) != sig
+
+
+def test_manifest_roundtrip(task_id):
+    manifest = export_cache.update_manifest(task_id, "k1", "sig", pdf="a.pdf")
+    assert manifest["pages_signature"] == "sig"
+    loaded = export_cache.load_manifest(task_id, "k1")
+    assert loaded["pdf"] == "a.pdf" and loaded["created_at"] == manifest["created_at"]
+    assert export_cache.load_manifest(task_id, "fehlt") is None
+
+
+def test_evict_removes_variants_of_outdated_pages(task_id):
+    _variant(task_id, "alt")
+    current = _variant(task_id, "neu")
+    export_cache.evict(task_id, "neu")
+    assert _variants(task_id) == {current}
+
+
+def test_evict_keeps_newest_variants(task_id):
+    keys = [_variant(task_id, "sig", age=age) for age in (40, 30, 20, 10)]
+    export_cache.evict(task_id, "sig", max_variants=2)
+    assert _variants(task_id) == set(keys[2:])
+
+
+def test_evict_counts_the_kept_key(task_id):
+    keys = [_variant(task_id, "sig", age=age) for age in (30, 20, 10)]
+    export_cache.evict(task_id, "sig", keep_key=keys[0], max_variants=2)
+    assert _variants(task_id) == {keys[0], keys[2]}
+
+
+def test_evict_spares_fresh_incomplete_variants(task_id):
+    root = export_cache.get_exports_root(task_id)
+    fresh = os.path.join(root, "fresh")
+    stale = os.path.join(root, "stale")
+    os.makedirs(fresh)
+    os.makedirs(stale)
+    old = time.time() - export_cache.INCOMPLETE_VARIANT_MAX_AGE - 10
+    os.utime(stale, (old, old))
+    export_cache.evict(task_id, "sig")
+    assert _variants(task_id) == {"fresh"}
+
+
+def test_tee_to_cache_publishes_only_complete_artifacts(task_id):
+    done = []
+    chunks = list(export_cache.tee_to_cache(iter([b"ab", b"cd"]), task_id, "k", "a.pdf",
+                                            on_complete=lambda: done.append(True)))
+    assert chunks == [b"ab", b"cd"] and done == [True]
+    with open(export_cache.artifact_path(task_id, "k", "a.pdf"), "rb") as f:
+        assert f.read() == b"abcd"
+
+    stream = export_cache.tee_to_cache(iter([b"ab", b"cd"]), task_id, "k", "b.pdf")
+    next(stream)
+    stream.close()
+    variant_dir = export_cache.get_variant_dir(task_id, "k")
+    assert not any(name.startswith("b.pdf") for name in os.listdir(variant_dir))
@@ -0,0 +1,90 @@
+import threading
+
+from services.job_queue import JobQueue, PRIORITY_HIGH, PRIORITY_LOW, PRIORITY_NORMAL
+
+
+def _blocked_queue(workers=1):
+    """Warteschlange, deren Worker bis release.set() in einem ersten Auftrag hängen."""
+    queue = JobQueue(workers)
+    started = threading.Semaphore(0)
+    release = threading.Event()
+
+    def block():
+        started.release()
+        release.wait(5)
+
+    for _ in range(workers):
+        queue.submit(block)
+    for _ in range(workers):
+        assert started.acquire(timeout=5)
+    return queue, release
+
+
+def test_lower_priority_values_run_first():
+    queue, release = _blocked_queue()
+    order = []
+    queue.submit(order.append, "low", priority=PRIORITY_LOW)
+    queue.submit(order.append, "normal", priority=PRIORITY_NORMAL)
+    queue.submit(order.append, "high", priority=PRIORITY_HIGH)
+    queue.submit(order.append, "normal2", priority=PRIORITY_NORMAL)
+    assert queue.qsize() == 4
+    release.set()
+    queue.join()
+    assert order == ["high", "normal", "normal2", "low"]
+    assert queue.qsize() == 0
+
+
+def test_failing_job_does_not_stop_the_worker():
+    queue = JobQueue(1)
+    done = []
+
+    def fail():
+        raise RuntimeError("kaputt")
+
+    queue.submit(fail)
+    queue.submit(done.append, 1)
+    queue.join()
+    assert done == [1]
+
+
+def test_owners_take_turns_within_a_priority():
+    queue, release = _blocked_queue()
+    order = []
+    for i in range(3):
+        queue.submit(order.append, f"batch{i}", owner="a")
+    queue.submit(order.append, "einzeln", owner="b")
+    release.set()
+    queue.join()
+    assert order == ["batch0", "einzeln", "batch1", "batch2"]
+
+
+def test_join_does_not_swallow_worker_wakeups():
+    # Mit einem gemeinsamen notify() konnte submit einen wartenden join() statt des
+    # freien Workers wecken; der zweite Auftrag wartete dann auf das Ende des ersten
+    queue = JobQueue(2)
+    for _ in range(20):
+        second_ran = threading.Event()
+        results = []
+        queue.submit(lambda: results.append(second_ran.wait(2)))
+        joiners = [threading.Thread(target=queue.join) for _ in range(4)]
+        for thread in joiners:
+            thread.start()
+        queue.submit(second_ran.set)
+        for thread in joiners:
+            thread.join(5)
+            assert not thread.is_alive()
+        assert results == [True]
+
+
+def test_join_waits_for_running_jobs():
+    queue = JobQueue(2)
+    done = []
+    release = threading.Event()
+    queue.submit(lambda: (release.wait(5), done.append(1)))
+    joiner = threading.Thread(target=queue.join)
+    joiner.start()
+    joiner.join(0.1)
+    assert joiner.is_alive()
+    release.set()
+    joiner.join(5)
+    assert not joiner.is_alive() and done == [1]
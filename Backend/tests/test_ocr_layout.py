@@ -0,0 +1,32 @@
+from benchmarks.bench_ocr_layout import legacy_group_words, synthetic_page
+from services.ocr_layout import group_words
+
+
+def test_group_words_matches_legacy_loop():
+    for seed in range(5):
+        data = synthetic_page(2000, seed=seed)
+        cutoff_y = 0.6 * max(data["top"])
+        assert group_words(data, cutoff_y=cutoff_y) == legacy_group_words(data, cutoff_y)
+
+
+def test_group_words_splits_on_gap_and_height():
+    data = {
+        "block_num": [1, 1, 1, 1], "par_num": [1, 1, 1, 1], "line_num": [1, 1, 1, 1],
+        "left": [10, 70, 400, 460], "top": [5, 5, 5, 5],
+        "width": [50, 50, 50, 50], "height": [20, 20, 20, 40],
+        "conf": ["95", "90", "91", "92"], "text": ["Flöte", "1", "Marsch", "B"],
+    }
+    boxes = group_words(data, cutoff_y=100)
+    assert [b["text"] for b in boxes] == ["Flöte 1", "Marsch", "B"]
+    assert boxes[0] == {"x": 10, "y": 5, "width": 110, "height": 20,
+                        "text": "Flöte 1", "selected": False}
+
+
+def test_group_words_filters_confidence_cutoff_and_empty_text():
+    data = {
+        "block_num": [1, 1, 1], "par_num": [1, 1, 1], "line_num": [1, 1, 2],
+        "left": [10, 70, 10], "top": [5, 5, 300],
+        "width": [50, 50, 50], "height": [20, 20, 20],
+        "conf": ["-1", "95", "99"], "text": ["Rauschen", " ", "unten"],
+    }
+    assert group_words(data, cutoff_y=100) == []
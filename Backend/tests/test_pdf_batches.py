@@ -0,0 +1,102 @@
+"""
+/pdf_tasks/upload_batch gegen eine echte PostgreSQL-Datenbank.
+
+Braucht wie tests/test_box_store.py TEST_DATABASE_URL und psycopg2, außerdem
+sc_base_backend (api/v1/pdf_tasks.py importiert es); die Anmeldung wird ersetzt.
+"""
+import io
+import os
+import zipfile
+
+import pytest
+
+DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+if not DATABASE_URL:
+    pytest.skip("TEST_DATABASE_URL nicht gesetzt", allow_module_level=True)
+psycopg2 = pytest.importorskip("psycopg2")
+pytest.importorskip("sc_base_backend")
+from fastapi import FastAPI  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from psycopg2.extras import RealDictCursor  # noqa: E402
+from pypdf import PdfWriter  # noqa: E402
+
+from api.v1 import pdf_tasks  # noqa: E402
+from services.admission import IngestAdmission  # noqa: E402
+
+SCHEMA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                      "docs", "schema.sql")
+USER_ID = 4711
+
+
+@pytest.fixture
+def conn():
+    connection = psycopg2.connect(DATABASE_URL, cursor_factory=RealDictCursor)
+    with open(SCHEMA, "r", encoding="utf-8") as f, connection.cursor() as cur:
+        cur.execute(f.read())
+    connection.commit()
+    yield connection
+    with connection.cursor() as cur:
+        cur.execute("DELETE FROM pdf_tasks WHERE user_id = %s", (USER_ID,))
+        cur.execute("DELETE FROM pdf_batches WHERE user_id = %s", (USER_ID,))
+    connection.commit()
+    connection.close()
+
+
+@pytest.fixture
+def submitted():
+    return []
+
+
+@pytest.fixture
+def client(conn, submitted, monkeypatch):
+    admission = IngestAdmission(10_000, 10_000, 3, lambda *args, **kwargs: submitted.append(args),
+                                max_running=1)
+    monkeypatch.setattr(pdf_tasks, "get_ingest_admission", lambda: admission)
+    monkeypatch.setattr(pdf_tasks, "get_pg_connection", lambda: conn)
+    app = FastAPI()
+    app.include_router(pdf_tasks.router)
+    app.dependency_overrides[pdf_tasks.get_current_user] = lambda: {"user_id": USER_ID}
+    return TestClient(app)
+
+
+def _zip(count):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        for i in range(count):
+            pdf = io.BytesIO()
+            writer = PdfWriter()
+            writer.add_blank_page(width=200, height=300)
+            writer.write(pdf)
+            zf.writestr(f"stueck_{i}.pdf", pdf.getvalue())
+    return {"files": ("noten.zip", buf.getvalue(), "application/zip")}
+
+
+def _statuses(conn):
+    with conn.cursor() as cur:
+        cur.execute("SELECT status, error_message FROM pdf_tasks WHERE user_id = %s", (USER_ID,))
+        rows = cur.fetchall()
+    conn.commit()
+    return rows
+
+
+def test_batch_counts_every_pdf_against_the_waiting_limit(client, conn, submitted):
+    response = client.post("/pdf_tasks/upload_batch", files=_zip(3))
+    assert response.status_code == 200 and response.json()["queued"] == 2
+    # 2 warten bereits, 3 weitere würden das Limit von 3 überschreiten
+    response = client.post("/pdf_tasks/upload_batch", files=_zip(2))
+    assert response.status_code == 429
+    assert client.post("/pdf_tasks/upload_batch", files=_zip(4)).status_code == 400
+    assert len(_statuses(conn)) == 3 and len(submitted) == 1
+
+
+def test_batch_tasks_fail_when_staging_breaks_after_insert(client, conn, submitted, monkeypatch):
+    def broken_publish(*paths):
+        raise OSError("Ablage nicht erreichbar")
+
+    monkeypatch.setattr(pdf_tasks.storage, "publish", broken_publish)
+    with pytest.raises(OSError):
+        client.post("/pdf_tasks/upload_batch", files=_zip(2))
+    rows = _statuses(conn)
+    assert [row["status"] for row in rows] == ["error", "error"]
+    assert "Ablage nicht erreichbar" in rows[0]["error_message"]
+    assert submitted == []
@@ -0,0 +1,99 @@
+import io
+import os
+import threading
+import time
+
+import pytest
+from PIL import Image
+
+from services.renditions import RenditionCache, encode_rendition
+
+
+def _cache(tmp_path, memory_bytes=1000, disk_bytes=1000):
+    return RenditionCache(str(tmp_path / "renditions"), memory_bytes, disk_bytes)
+
+
+def _files(cache):
+    return sorted(os.listdir(cache.directory)) if os.path.isdir(cache.directory) else []
+
+
+def test_concurrent_requests_create_once(tmp_path):
+    cache = _cache(tmp_path)
+    calls = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def create():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return b"seite"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_create("k", create)))
+               for _ in range(8)]
+    threads[0].start()
+    assert started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    # Die übrigen Anfragen sollen auf die laufende warten, nicht den fertigen Eintrag finden
+    time.sleep(0.2)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert calls == [1]
+    assert results == [b"seite"] * 8
+
+
+def test_failed_create_reaches_waiters_and_is_retried(tmp_path):
+    cache = _cache(tmp_path)
+
+    def fail():
+        raise FileNotFoundError("seite.png")
+
+    with pytest.raises(FileNotFoundError):
+        cache.get_or_create("k", fail)
+    assert cache.get_or_create("k", lambda: b"neu") == b"neu"
+
+
+def test_memory_and_disk_hits(tmp_path):
+    cache = _cache(tmp_path)
+    assert cache.get_or_create("k", lambda: b"seite") == b"seite"
+    assert cache.get_or_create("k", lambda: pytest.fail("nicht aus dem Cache")) == b"seite"
+    assert len(_files(cache)) == 1
+
+    # Neuer Prozess: Speicher leer, Platte bleibt
+    restarted = _cache(tmp_path)
+    assert restarted.get_or_create("k", lambda: pytest.fail("nicht von der Platte")) == b"seite"
+
+
+def test_lru_eviction_on_disk(tmp_path):
+    cache = _cache(tmp_path, memory_bytes=0, disk_bytes=250)
+    for key in ("a", "b"):
+        cache.get_or_create(key, lambda: b"x" * 100)
+    # Zugriff auf a: danach ist b am längsten unbenutzt
+    cache.get_or_create("a", lambda: pytest.fail("a fehlt"))
+    cache.get_or_create("c", lambda: b"x" * 100)
+    assert len(_files(cache)) == 2
+    assert cache.get_or_create("a", lambda: b"neu a") == b"x" * 100
+    assert cache.get_or_create("b", lambda: b"neu b") == b"neu b"
+
+
+def test_lru_eviction_in_memory(tmp_path):
+    cache = _cache(tmp_path, memory_bytes=250, disk_bytes=0)
+    for key in ("a", "b", "c"):
+        cache.get_or_create(key, lambda: b"x" * 100)
+    assert _files(cache) == []
+    assert cache.get_or_create("a", lambda: b"neu") == b"neu"
+    assert cache.get_or_create("c", lambda: pytest.fail("c fehlt")) == b"x" * 100
+
+
+def test_encode_rendition_resizes_without_upscaling(tmp_path):
+    path = str(tmp_path / "seite.png")
+    Image.new("1", (400, 600), 1).save(path)
+    with Image.open(io.BytesIO(encode_rendition(path, 100, "webp"))) as image:
+        assert image.format == "WEBP" and image.size == (100, 150)
+    with Image.open(io.BytesIO(encode_rendition(path, 800, "jpeg"))) as image:
+        assert image.format == "JPEG" and image.size == (400, 600) and image.mode == "L"
+    with Image.open(io.BytesIO(encode_rendition(path, None, "png"))) as image:
+        assert image.size == (400, 600)
@@ -0,0 +1,157 @@
+import os
+import uuid
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api.static_files import router
+from config import STATIC_DIR
+from services import storage
+from services.storage import LocalStorage, is_safe_key, parse_range, version
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(router)
+    return TestClient(app)
+
+
+@pytest.fixture
+def task_file():
+    task_id = str(uuid.uuid4())
+    path = os.path.join(storage.task_dir(task_id), "pages", "seite.png")
+    os.makedirs(os.path.dirname(path))
+    with open(path, "wb") as f:
+        f.write(b"0123456789")
+    return storage.storage_key(path), path
+
+
+@pytest.mark.parametrize("key", [
+    "", "../geheim", "a/../../geheim", "..\\..\\geheim", "a\\b.png", "C:/Windows/win.ini",
+    "c:geheim", "/etc/passwd", "//server/share/x",
+])
+def test_unsafe_keys(key):
+    assert not is_safe_key(key)
+
+
+@pytest.mark.parametrize("key", ["a/pages/seite.png", "a/exports/k/Titel: Suite.zip", "a/b..c.pdf"])
+def test_safe_keys(key):
+    assert is_safe_key(key)
+
+
+def test_local_storage_rejects_symlinks_out_of_the_root(tmp_path):
+    root = tmp_path / "ablage"
+    outside = tmp_path / "draussen"
+    root.mkdir()
+    outside.mkdir()
+    (outside / "geheim.txt").write_text("geheim")
+    os.symlink(outside, root / "link")
+    local = LocalStorage(str(root))
+    with pytest.raises(ValueError):
+        local.stat("link/geheim.txt")
+    (root / "da.txt").write_text("da")
+    assert local.stat("da.txt")["size"] == 2
+
+
+def test_sharded_task_dir_finds_flat_tasks(monkeypatch):
+    monkeypatch.setattr(storage, "STORAGE_LAYOUT", "sharded")
+    task_id = str(uuid.uuid4())
+    sharded = storage.task_dir(task_id)
+    assert os.path.relpath(sharded, STATIC_DIR).count(os.sep) == 2
+    os.makedirs(os.path.join(STATIC_DIR, task_id))
+    assert storage.task_dir(task_id) == os.path.join(STATIC_DIR, task_id)
+
+
+def test_parse_range():
+    assert parse_range(None, 10) is None
+    assert parse_range("bytes=2-4", 10) == (2, 4)
+    assert parse_range("bytes=5-", 10) == (5, 9)
+    assert parse_range("bytes=-3", 10) == (7, 9)
+    assert parse_range("bytes=0-99", 10) == (0, 9)
+    assert parse_range("bytes=0-1,4-5", 10) is None
+    for header in ("bytes=10-", "bytes=4-2", "bytes=-0", "bytes=a-"):
+        with pytest.raises(ValueError):
+            parse_range(header, 10)
+
+
+@pytest.mark.parametrize("key", ["..%2F..%2Fetc%2Fpasswd", "..%5C..%5Cgeheim", "C:%2FWindows%2Fwin.ini"])
+def test_static_file_rejects_unsafe_keys(client, key):
+    assert client.get(f"/static/{key}").status_code == 404
+
+
+def test_static_file_range_and_etag(client, task_file):
+    key, path = task_file
+    response = client.get(f"/static/{key}")
+    assert response.status_code == 200 and response.content == b"0123456789"
+    assert response.headers["cache-control"] == "no-cache"
+    etag = response.headers["etag"]
+
+    partial = client.get(f"/static/{key}", headers={"Range": "bytes=2-4"})
+    assert partial.status_code == 206 and partial.content == b"234"
+    assert partial.headers["content-range"] == "bytes 2-4/10"
+    assert client.get(f"/static/{key}", headers={"Range": "bytes=20-"}).status_code == 416
+    assert client.get(f"/static/{key}", headers={"If-None-Match": etag}).status_code == 304
+
+    st = os.stat(path)
+    versioned = client.get(f"/static/{key}?v={version(st.st_size, st.st_mtime)}")
+    assert "immutable" in versioned.headers["cache-control"]
+
+
+class TestS3Storage:
+    """S3Storage gegen moto als lokalen Ersatz für den Objektspeicher."""
+
+    @pytest.fixture
+    def s3(self, monkeypatch):
+        moto = pytest.importorskip("moto")
+        boto3 = pytest.importorskip("boto3")
+        monkeypatch.setenv("AWS_ACCESS_KEY_ID", "test")
+        monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "test")
+        with moto.mock_aws():
+            client = boto3.client("s3", region_name="us-east-1")
+            client.create_bucket(Bucket="notenscan")
+            s3 = storage.S3Storage("notenscan", prefix="/tasks/", client=client)
+            monkeypatch.setattr(storage, "_storage", s3)
+            yield s3
+
+    def test_objects_roundtrip(self, s3, task_file):
+        key, path = task_file
+        s3.upload(key, path)
+        assert s3.stat(key)["size"] == 10
+        assert s3.client.head_object(Bucket="notenscan", Key=f"tasks/{key}")
+        assert b"".join(s3.iter_range(key, 3, 5)) == b"345"
+        assert list(s3.list(key.rsplit("/", 1)[0] + "/")) == [key]
+        assert s3.stat("fehlt/x.png") is None
+
+        os.remove(path)
+        assert s3.download(key, path)
+        with open(path, "rb") as f:
+            assert f.read() == b"0123456789"
+        assert not s3.download("fehlt/x.png", path + ".fehlt")
+        assert not [name for name in os.listdir(os.path.dirname(path)) if name.endswith(".tmp")]
+
+        s3.delete_prefix(key.split("/")[0] + "/")
+        assert s3.stat(key) is None
+
+    def test_publish_and_fetch_share_files_between_nodes(self, s3, task_file):
+        key, path = task_file
+        storage.publish(path)
+        assert storage.list_dir(os.path.dirname(path)) == {
+            "seite.png": version(10, s3.stat(key)["mtime"])}
+
+        # Anderer Knoten: lokale Kopie fehlt bzw. ist veraltet
+        os.remove(path)
+        assert storage.exists(path)
+        assert storage.fetch(path)
+        with open(path, "rb") as f:
+            assert f.read() == b"0123456789"
+        with open(path, "wb") as f:
+            f.write(b"alt")
+        os.utime(path, (0, 0))
+        storage.fetch_dir(os.path.dirname(os.path.dirname(path)))
+        with open(path, "rb") as f:
+            assert f.read() == b"0123456789"
+
+        storage.remove(path)
+        assert not storage.exists(path)
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from services.imaging import ink_bbox
+from services.page_meta import is_page_untouched, page_offset, shift_box
+from services.pipeline import trim_margins
+
+
+def _page(shape=(300, 200), ink=(40, 50, 120, 260)):
+    page = np.full(shape, 255, np.uint8)
+    left, top, right, bottom = ink
+    page[top:bottom, left:right] = 0
+    return page
+
+
+def test_ink_bbox():
+    assert ink_bbox(_page()) == (40, 50, 120, 260)
+    assert ink_bbox(_page(ink=(0, 0, 0, 0))) is None
+
+
+def test_ink_bbox_ignores_dust():
+    page = _page()
+    page[5, 5] = 0
+    page[290, 190] = 0
+    assert ink_bbox(page) == (40, 50, 120, 260)
+
+
+def test_trim_margins_keeps_margin():
+    page = _page()
+    trimmed, crop = trim_margins(page, margin=10)
+    assert crop == {"x": 30, "y": 40, "width": 100, "height": 230}
+    assert trimmed.shape == (230, 100)
+    assert np.shares_memory(trimmed, page)
+
+
+def test_trim_margins_clamps_to_the_page():
+    trimmed, crop = trim_margins(_page(ink=(5, 5, 195, 290)), margin=10)
+    assert crop is None
+    assert trimmed.shape == (300, 200)
+
+    trimmed, crop = trim_margins(_page(ink=(5, 50, 120, 260)), margin=10)
+    assert crop == {"x": 0, "y": 40, "width": 130, "height": 230}
+
+
+def test_trim_margins_on_empty_and_color_pages():
+    page = _page(ink=(0, 0, 0, 0))
+    assert trim_margins(page) == (page, None)
+
+    color = np.repeat(_page()[:, :, None], 3, axis=2)
+    trimmed, crop = trim_margins(color, margin=0)
+    assert crop == {"x": 40, "y": 50, "width": 80, "height": 210}
+    assert trimmed.shape == (210, 80, 3)
+
+
+def test_page_offset_and_shift():
+    meta = {"pages": {"2": {"crop": {"x": 30, "y": 40, "width": 100, "height": 230}}, "3": {}}}
+    assert page_offset(meta, 2) == (30, 40)
+    assert page_offset(meta, 3) == (0, 0)
+    assert page_offset({"pages": {}}, 1) == (0, 0)
+    assert shift_box({"x": 10, "y": "20.0", "text": "A"}, 5, -5) == {"x": 15, "y": 15, "text": "A"}
+
+
+@pytest.mark.parametrize("entry, untouched", [
+    ({"rotated": False, "angle": 0.0, "edited": False}, True),
+    ({"rotated": True, "angle": 1.2, "edited": False}, False),
+    ({"rotated": False, "edited": True}, False),
+    ({"rotated": False, "edited": False, "crop": {"x": 1, "y": 1, "width": 9, "height": 9}}, False),
+    ({"rotated": False, "edited": False, "failed": "timeout"}, True),
+    (None, False),
+])
+def test_is_page_untouched(entry, untouched):
+    meta = {"pages": {"1": entry} if entry is not None else {}}
+    assert is_page_untouched(meta, 1) is untouched
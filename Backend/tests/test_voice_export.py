@@ -0,0 +1,167 @@
+import io
+import os
+import threading
+from concurrent.futures import Future
+
+import numpy as np
+from PIL import Image
+from pypdf import PdfReader, PdfWriter
+
+from services import voice_export
+from services.voice_export import (
+    PdfImageWriter, _export_voice_job, export_voice_pdf, make_export_profile, write_voice, write_voice_pdf,
+)
+
+
+def _page(path, size=(200, 300), mode="L"):
+    image = Image.new(mode, size, "white")
+    # schwarzes Rechteck oben links
+    image.paste(0 if mode != "RGB" else (0, 0, 0), (10, 10, 60, 40))
+    image.save(path, "PNG")
+    return path
+
+
+def _pages(tmp_path, count, **kwargs):
+    return [_page(str(tmp_path / f"t_page_{i:05d}.png"), **kwargs) for i in range(1, count + 1)]
+
+
+def _decoded(pdf_bytes, index=0):
+    page = PdfReader(io.BytesIO(pdf_bytes)).pages[index]
+    return page, np.asarray(page.images[0].image.convert("L"))
+
+
+def test_write_voice_pdf_page_count_and_size(tmp_path):
+    paths = _pages(tmp_path, 3)
+    buf = io.BytesIO()
+    assert write_voice_pdf(paths, buf, resolution=100.0) == 3
+    reader = PdfReader(io.BytesIO(buf.getvalue()))
+    assert len(reader.pages) == 3
+    box = reader.pages[0].mediabox
+    assert (round(float(box.width), 2), round(float(box.height), 2)) == (144.0, 216.0)
+
+
+def test_bilevel_profile_keeps_polarity(tmp_path):
+    path = _page(str(tmp_path / "p.png"), mode="RGB")
+    buf = io.BytesIO()
+    write_voice_pdf([path], buf, profile=make_export_profile("bilevel"))
+    page, pixels = _decoded(buf.getvalue())
+    assert "/CCITTFaxDecode" in str(page.images[0].indirect_reference.get_object()["/Filter"])
+    assert pixels[20, 20] == 0
+    assert pixels[200, 150] == 255
+
+
+def test_one_bit_pages_stay_g4_with_target_dpi(tmp_path):
+    path = str(tmp_path / "bw.png")
+    with Image.open(_page(str(tmp_path / "g.png"))) as gray:
+        gray.convert("1", dither=Image.Dither.NONE).save(path)
+    buf = io.BytesIO()
+    writer = PdfImageWriter(buf, profile="color", scale=0.5)
+    with Image.open(path) as image:
+        writer.add_page(image)
+    writer.close()
+    page, pixels = _decoded(buf.getvalue())
+    assert pixels.shape == (150, 100)
+    assert pixels[10, 10] == 0
+    assert pixels[100, 80] == 255
+
+
+def test_concurrent_exports_to_same_output(tmp_path):
+    paths = _pages(tmp_path, 4)
+    output_path = str(tmp_path / "Stimme.pdf")
+    errors = []
+
+    def run():
+        try:
+            export_voice_pdf("t", paths, 0, 3, output_path, export_mode="raster", page_meta={})
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert len(PdfReader(output_path).pages) == 4
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+
+def test_prerendered_voice_is_copied_and_missing_one_rendered(tmp_path):
+    paths = _pages(tmp_path, 2)
+    prerendered = tmp_path / "vorab.pdf"
+    prerendered.write_bytes(b"%PDF vorab")
+    output_path = str(tmp_path / "Stimme.pdf")
+    _export_voice_job("t", paths, 0, 1, output_path, "raster", {}, None, str(prerendered))
+    with open(output_path, "rb") as f:
+        assert f.read() == b"%PDF vorab"
+
+    _export_voice_job("t", paths, 0, 1, output_path, "raster", {}, None, str(tmp_path / "weg.pdf"))
+    assert len(PdfReader(output_path).pages) == 2
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+
+def test_auto_export_copies_failed_pages_from_the_original(tmp_path):
+    # Seite 2 wurde nicht gerastert (leere Ersatzseite), Seite 3 gedreht
+    paths = _pages(tmp_path, 3)
+    original = PdfWriter()
+    for _ in paths:
+        original.add_blank_page(width=72 * 8, height=72 * 10)
+    buf = io.BytesIO()
+    original.write(buf)
+    buf.seek(0)
+    meta = {"pages": {
+        "1": {"rotated": False, "angle": 0.0, "edited": False},
+        "2": {"rotated": False, "angle": 0.0, "edited": False, "color_mode": "gray", "failed": "timeout"},
+        "3": {"rotated": True, "angle": 1.5, "edited": False},
+    }}
+    out = io.BytesIO()
+    assert write_voice("t", paths, 0, 2, out, "auto", meta, reader=PdfReader(buf)) == 3
+    pages = PdfReader(io.BytesIO(out.getvalue())).pages
+    assert [len(page.images) for page in pages] == [0, 0, 1]
+    assert float(pages[1].mediabox.width) == 72 * 8
+
+
+def test_export_pool_spawns_workers(tmp_path, monkeypatch):
+    monkeypatch.setattr(voice_export, "EXPORT_WORKERS", 2)
+    monkeypatch.setattr(voice_export, "_pool", None)
+    pool = voice_export.get_export_pool()
+    try:
+        assert pool._mp_context.get_start_method() == "spawn"
+        paths = _pages(tmp_path, 3)
+        voices = list(voice_export.render_voices(
+            "t", paths, [(0, 1, "Flöte"), (2, 2, "Tuba")], "Marsch", export_mode="raster",
+            page_meta={}))
+        assert [(v[0], v[2]) for v in voices] == [("Flöte", 2), ("Tuba", 1)]
+        assert len(PdfReader(io.BytesIO(voices[0][3])).pages) == 2
+    finally:
+        pool.shutdown()
+
+
+class _FakePool:
+    # Führt nur die ersten beiden Aufträge aus, die übrigen bleiben wartend
+    def __init__(self):
+        self.futures = []
+
+    def submit(self, fn, *args):
+        future = Future()
+        if len(self.futures) < 2:
+            future.set_result(fn(*args))
+        self.futures.append(future)
+        return future
+
+
+def test_closing_the_zip_stream_cancels_waiting_voices(tmp_path, monkeypatch):
+    pool = _FakePool()
+    monkeypatch.setattr(voice_export, "EXPORT_WORKERS", 2)
+    monkeypatch.setattr(voice_export, "get_export_pool", lambda: pool)
+    paths = _pages(tmp_path, 6)
+    ranges = [(i, i, f"Stimme {i}") for i in range(6)]
+    timings = []
+    stream = voice_export.stream_voices_zip("t", paths, ranges, "Marsch", "", "", "",
+                                            export_mode="raster", page_meta={}, timings=timings)
+    next(stream)
+    stream.close()
+    assert len(timings) == 1
+    # Fenster von 2 * EXPORT_WORKERS: danach wurde nichts mehr eingereiht
+    assert len(pool.futures) == 4
+    assert [f.cancelled() for f in pool.futures] == [False, False, True, True]
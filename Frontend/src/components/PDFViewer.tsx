@@ -36,6 +36,8 @@ export interface PDFViewerProps {
   onRecognizeText?: () => void | Promise<void> | Promise<boolean>;
   onAssignLabel?: (label: LabelKeys, boxIdx: number) => void;
   onRemoveBox?: (boxIdx: number) => void;
+  // Neue (versionierte) Bild-URL einer Seite, z. B. nach dem Ausrichten
+  onPageUpdated?: (pageIdx: number, url: string) => void;
   token: string;
 }
 
@@ -46,6 +48,7 @@ export interface PDFViewerHandle {
   getCurrentBoxesAndLabels: () => {
     boxes: Box[];
     labels: Partial<Record<LabelKeys, string>>;
+    page: number;
   };
 }
 
@@ -130,7 +133,7 @@ const PDFViewer = React.forwardRef<
           labelsText[k] = boxes[idx].text;
         }
       });
-      return { boxes, labels: labelsText };
+      return { boxes, labels: labelsText, page: currentPage + 1 };
     },
   }));
 
@@ -185,8 +188,8 @@ const PDFViewer = React.forwardRef<
   const handleDeskewSave = async () => {
     if (!pages || !pages[currentPage]) return;
     // Extrahiere task_id aus Bild-URL
-    // Beispiel: .../static/{task_id}/pages/{task_id}_page_00001.png
-    const match = pages[currentPage].match(/\/static\/(.*?)\/pages\//);
+    // Beispiel: .../static/[aa/bb/]{task_id}/pages/{task_id}_page_00001.png?v=...
+    const match = pages[currentPage].match(/\/static\/(?:.*\/)?([^/]+)\/pages\//);
     const taskId = match ? match[1] : null;
     // Token kommt jetzt als Prop
     if (!taskId) {
@@ -195,7 +198,7 @@ const PDFViewer = React.forwardRef<
     }
     setSavingDeskew(true);
     try {
-      await fetch(
+      const res = await fetch(
         `${import.meta.env.VITE_SERVER_URL || ""}/api/v1/pdf_tasks/deskew`,
         {
           method: "POST",
@@ -210,15 +213,13 @@ const PDFViewer = React.forwardRef<
           }),
         }
       );
-      // Nach erfolgreichem Speichern: Bild neu laden (Cache-Buster)
+      if (!res.ok) throw new Error("Fehler beim Speichern der Ausrichtung");
+      const data = await res.json();
       setShowDeskewDialog(false);
       setDeskewAngle(0);
-      // Bild-URL aktualisieren
-      const newPages = [...pages];
-      newPages[currentPage] = `${pages[currentPage]}?t=${Date.now()}`;
-      // setPages gibt es hier nicht, aber Parent kann per Prop reagieren
-      // Workaround: force reload über Zoom-Key
-      setZoomKey((k) => k + 1);
+      // Die Antwort enthält die neue versionierte URL; die alte bleibt im Browser-Cache
+      // (immutable) und zeigt weiter das ungedrehte Bild
+      rest.onPageUpdated?.(currentPage, data.url);
     } catch (err) {
       alert("Fehler beim Speichern der Ausrichtung.");
     } finally {
@@ -68,6 +68,7 @@ const DocumentDetailCard = React.forwardRef<
           },
           body: JSON.stringify({
             task_id: row.id,
+            page: currentPage + 1,
             boxes: boxesOverride !== undefined ? boxesOverride : boxes,
             suggestions:
               newSuggestions !== undefined ? newSuggestions : suggestions,
@@ -78,7 +79,7 @@ const DocumentDetailCard = React.forwardRef<
         // Fehler beim Speichern ignorieren
       }
     },
-    [row, token, boxes, suggestions]
+    [row, token, boxes, suggestions, currentPage]
   );
 
   // setLabels, das auch speichert
@@ -218,6 +219,7 @@ const DocumentDetailCard = React.forwardRef<
         },
         body: JSON.stringify({
           task_id: row.id,
+          page: currentPage + 1,
           boxes: newBoxes,
           suggestions: suggestions,
           labels: labels,
@@ -286,6 +288,7 @@ const DocumentDetailCard = React.forwardRef<
               },
               body: JSON.stringify({
                 task_id: row.id,
+                page: currentPage + 1,
                 boxes: updatedBoxes,
                 suggestions: suggestions,
                 labels: labels,
@@ -309,6 +312,7 @@ const DocumentDetailCard = React.forwardRef<
         },
         body: JSON.stringify({
           task_id: row.id,
+          page: currentPage + 1,
           boxes: newBoxes,
           suggestions: suggestions,
           labels: labels,
@@ -349,6 +353,7 @@ const DocumentDetailCard = React.forwardRef<
       },
       body: JSON.stringify({
         task_id: row.id,
+        page: currentPage + 1,
         boxes: newBoxes,
         suggestions: suggestions,
         labels: newLabels,
@@ -409,6 +414,7 @@ const DocumentDetailCard = React.forwardRef<
         },
         body: JSON.stringify({
           task_id: row.id,
+          page: currentPage + 1,
           boxes: newBoxes,
           suggestions: newSuggestions,
           labels:
@@ -484,6 +490,11 @@ const DocumentDetailCard = React.forwardRef<
                   onRecognizeText={recognizeText}
                   onAssignLabel={undefined}
                   onRemoveBox={handleRemoveBox}
+                  onPageUpdated={(pageIdx, url) =>
+                    setPages((prev) =>
+                      prev.map((p, i) => (i === pageIdx ? url : p))
+                    )
+                  }
                   fitToContainerTrigger={fitToContainerTrigger}
                   token={token}
                 />
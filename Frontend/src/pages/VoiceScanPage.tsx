@@ -178,7 +178,8 @@ export default function VoiceScanPage({
         );
         return;
       }
-      const { boxes, labels } = pdfViewerRef.current.getCurrentBoxesAndLabels();
+      const { boxes, labels, page } =
+        pdfViewerRef.current.getCurrentBoxesAndLabels();
       if (!boxes || !labels) {
         console.warn("Keine Boxen oder Labels vorhanden");
         return;
@@ -215,6 +216,7 @@ export default function VoiceScanPage({
               width: voiceBox.width,
               height: voiceBox.height,
             },
+            page,
           }),
         });
         if (!res.ok) {
@@ -314,13 +316,14 @@ export default function VoiceScanPage({
       const arrangeur = labels?.Arrangeur || "";
 
       setStatus(t("export_zip_in_progress"));
-      const res = await fetch(`${API_BASE}/ocr/voices/split_zip`, {
+      const res = await fetch(`${API_BASE}/ocr/voices/split_zip/stream`, {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
           Authorization: `Bearer ${token}`,
         },
         body: JSON.stringify({
+          task_id: taskId,
           voices: voices.map((v) => ({ page: v.page, voice: v.voice })),
           title,
           genre,
@@ -332,23 +335,24 @@ export default function VoiceScanPage({
         setStatus(t("export_zip_failed"));
         return;
       }
-      // Backend liefert: {zip_url: "..."}
-      const data = await res.json();
-      if (data.zip_url) {
-        let downloadUrl = data.zip_url;
-        if (downloadUrl.startsWith("/")) {
-          downloadUrl = SERVER_URL + downloadUrl;
-        }
-        const link = document.createElement("a");
-        link.href = downloadUrl;
-        link.download = "";
-        document.body.appendChild(link);
-        link.click();
-        document.body.removeChild(link);
-        setStatus(t("export_zip_success"));
-      } else {
-        setStatus(t("export_zip_failed"));
-      }
+      // Backend streamt das ZIP-Archiv direkt in der Antwort
+      const blob = await res.blob();
+      const disposition = res.headers.get("Content-Disposition") || "";
+      const match = disposition.match(/filename\*=UTF-8''([^;]+)/);
+      const zipName = match
+        ? decodeURIComponent(match[1])
+        : title
+        ? `${title}.zip`
+        : "stimmen_export.zip";
+      const objectUrl = URL.createObjectURL(blob);
+      const link = document.createElement("a");
+      link.href = objectUrl;
+      link.download = zipName;
+      document.body.appendChild(link);
+      link.click();
+      document.body.removeChild(link);
+      URL.revokeObjectURL(objectUrl);
+      setStatus(t("export_zip_success"));
     } catch (err) {
       setStatus(t("export_zip_failed"));
     } finally {
@@ -401,11 +405,8 @@ export default function VoiceScanPage({
         data.pdf_files &&
         data.pdf_files.length > 0
       ) {
-        // Download-Link erzeugen und im neuen Tab öffnen:
-        const filename = data.pdf_files[0];
-        const downloadUrl = `${SERVER_URL}/static/voices_export/${encodeURIComponent(
-          filename
-        )}`;
+        // Download-Link erzeugen und im neuen Tab öffnen (Export liegt pro Task im Cache):
+        const downloadUrl = `${SERVER_URL}${data.pdf_urls[0]}`;
         window.open(downloadUrl, "_blank"); // Im neuen Tab öffnen
         setStatus(t("save_voice_success", { voice: voiceText }));
       } else {
@@ -496,7 +497,14 @@ export default function VoiceScanPage({
     <div className="flex h-screen">
       <LoadingOverlay show={loading} />
       <div className="w-2/3 bg-white border-r overflow-hidden">
-        <PDFViewer token={token} ref={pdfViewerRef} pages={pages} />
+        <PDFViewer
+          token={token}
+          ref={pdfViewerRef}
+          pages={pages}
+          onPageUpdated={(pageIdx, url) =>
+            setPages((prev) => prev.map((p, i) => (i === pageIdx ? url : p)))
+          }
+        />
       </div>
       <div className="w-1/3 p-6 overflow-y-auto">
         <h2 className="text-lg font-semibold mb-4">{t("upload_title")}</h2>